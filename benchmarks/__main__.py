@@ -0,0 +1,168 @@
+"""
+Time the endpoints of deltalink against local Delta tables, without Azure.
+
+    python -m benchmarks --rows 100000 --output results.json
+    python -m benchmarks --baseline results.json
+
+With a baseline, the cases whose median got slower than the allowed
+regression are listed and the exit status is 1.
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+from datetime import UTC, datetime
+from pathlib import Path
+from typing import Any
+
+# The settings are required to import the application, none of them is used
+for name in ("CLIENT_ID", "CLIENT_SECRET", "TENANT_ID"):
+    os.environ.setdefault(name, "benchmark")
+os.environ.setdefault("UNITY_ENDPOINT", "http://localhost")
+
+import daft  # noqa: E402
+import deltalake  # noqa: E402
+import pyarrow as pa  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+
+import deltalink.dependencies  # noqa: E402
+from benchmarks.suite import Suite, run_case, summarize  # noqa: E402
+from deltalink.main import app  # noqa: E402
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks", description="Benchmark the deltalink endpoints"
+    )
+    parser.add_argument("--rows", type=int, default=100_000, help="Rows per table")
+    parser.add_argument(
+        "--days", type=int, default=30, help="Partitions of the sensors table"
+    )
+    parser.add_argument(
+        "--files", type=int, default=10, help="Appends each table is written with"
+    )
+    parser.add_argument(
+        "--batch-rows", type=int, default=1_000, help="Rows sent by each write"
+    )
+    parser.add_argument("--repeat", type=int, default=5, help="Timed runs per case")
+    parser.add_argument("--warmup", type=int, default=1, help="Untimed runs per case")
+    parser.add_argument(
+        "--case", action="append", dest="cases", help="Only run these cases"
+    )
+    parser.add_argument("--workdir", type=Path, help="Where the tables are written")
+    parser.add_argument("--output", type=Path, help="Write the results as JSON")
+    parser.add_argument("--baseline", type=Path, help="Results to compare with")
+    parser.add_argument(
+        "--max-regression",
+        type=float,
+        default=0.25,
+        help="Slowdown of the median allowed against the baseline",
+    )
+    return parser.parse_args()
+
+
+def environment() -> dict[str, Any]:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+            cwd=Path(__file__).parent,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+
+    return {
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "daft": daft.__version__,
+        "deltalake": deltalake.__version__,
+        "pyarrow": pa.__version__,
+    }
+
+
+def compare(
+    results: dict[str, Any], baseline: dict[str, Any], max_regression: float
+) -> list[str]:
+    """
+    Cases slower than the baseline by more than the allowed regression.
+    """
+
+    regressions = []
+    for name, result in results.items():
+        previous = baseline.get("results", {}).get(name)
+        if previous is None:
+            continue
+        ratio = result["median"] / previous["median"]
+        print(
+            f"{name:<24} {previous['median']:>10.4f}s {result['median']:>10.4f}s"
+            f" {ratio:>7.2f}x",
+            file=sys.stderr,
+        )
+        if ratio > 1 + max_regression:
+            regressions.append(name)
+    return regressions
+
+
+def main() -> int:
+    args = parse_args()
+
+    with tempfile.TemporaryDirectory(dir=args.workdir) as workdir:
+        suite = Suite(Path(workdir), args.rows, args.days, args.files, args.batch_rows)
+        print(f"Writing the tables in {workdir}", file=sys.stderr)
+        suite.generate()
+        deltalink.dependencies._catalog = suite.catalog
+
+        results: dict[str, Any] = {}
+        with TestClient(app) as client:
+            for case in suite.cases():
+                if args.cases and case.name not in args.cases:
+                    continue
+                timings = run_case(client, case, args.repeat, args.warmup)
+                results[case.name] = summarize(timings)
+                print(
+                    f"{case.name:<24} median {results[case.name]['median']:.4f}s",
+                    file=sys.stderr,
+                )
+
+    report = {
+        "created_at": datetime.now(UTC).isoformat(),
+        "environment": environment(),
+        "parameters": {
+            "rows": args.rows,
+            "days": args.days,
+            "files": args.files,
+            "batch_rows": args.batch_rows,
+            "repeat": args.repeat,
+            "warmup": args.warmup,
+        },
+        "results": results,
+    }
+
+    document = json.dumps(report, indent=2)
+    if args.output:
+        args.output.write_text(document + "\n")
+    else:
+        print(document)
+
+    if args.baseline:
+        baseline = json.loads(args.baseline.read_text())
+        if baseline.get("parameters") != report["parameters"]:
+            print("The baseline was run with other parameters", file=sys.stderr)
+        regressions = compare(results, baseline, args.max_regression)
+        if regressions:
+            print(f"Regressions: {', '.join(regressions)}", file=sys.stderr)
+            return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,51 @@
+from pathlib import Path
+from types import SimpleNamespace
+
+from daft.unity_catalog import UnityCatalogTable
+
+
+class LocalUnityCatalog:
+    """
+    Stands in for `daft.unity_catalog.UnityCatalog` over a local directory,
+    the tables are stored in `<root>/<catalog>/<schema>/<table>` and are
+    returned with `file://` URIs and without credentials.
+    """
+
+    def __init__(self, root: Path):
+        self.root = root
+
+    def _children(self, path: Path) -> list[str]:
+        return sorted(p.name for p in path.iterdir() if p.is_dir())
+
+    def list_catalogs(self) -> list[str]:
+        return self._children(self.root)
+
+    def list_schemas(self, catalog_name: str) -> list[str]:
+        return [
+            f"{catalog_name}.{schema}"
+            for schema in self._children(self.root / catalog_name)
+        ]
+
+    def list_tables(self, schema_name: str) -> list[str]:
+        catalog, schema = schema_name.split(".")
+        return [
+            f"{schema_name}.{table}"
+            for table in self._children(self.root / catalog / schema)
+        ]
+
+    def table_path(self, table_name: str) -> Path:
+        return self.root.joinpath(*table_name.split("."))
+
+    def load_table(self, table_name: str, **kwargs) -> UnityCatalogTable:
+        path = self.table_path(table_name)
+        if not (path / "_delta_log").is_dir():
+            raise ValueError(f"Table {table_name} not found")
+
+        catalog, schema, name = table_name.split(".")
+        return UnityCatalogTable(
+            table_info=SimpleNamespace(
+                catalog_name=catalog, schema_name=schema, name=name
+            ),
+            table_uri=path.as_uri(),
+            io_config=None,
+        )
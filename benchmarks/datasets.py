@@ -0,0 +1,66 @@
+import csv
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+import numpy as np
+import pyarrow as pa
+from deltalake import write_deltalake
+
+SUPPLIERS_CSV = Path(__file__).parent.parent / "data" / "sales_suppliers.csv"
+
+
+def suppliers(rows: int, start: int = 0) -> pa.Table:
+    """
+    Rows patterned on `data/sales_suppliers.csv`, the sample rows are
+    repeated with new supplier ids from `start`.
+    """
+
+    with open(SUPPLIERS_CSV, newline="", encoding="utf-8") as f:
+        sample = list(csv.DictReader(f))
+
+    picks = [sample[i % len(sample)] for i in range(rows)]
+    columns = {name: [row[name] for row in picks] for name in sample[0]}
+    columns["supplierID"] = [str(4_000_000 + start + i) for i in range(rows)]
+    return pa.table(columns)
+
+
+def sensors(rows: int, days: int, sensor_count: int = 100, seed: int = 0) -> pa.Table:
+    """
+    Readings patterned on the sensors dataset, spread over `days` days.
+    """
+
+    rng = np.random.default_rng(seed)
+    first = date.today() - timedelta(days=days)
+    offsets = np.sort(rng.integers(0, days * 86_400, rows))
+    midnight = datetime.combine(first, datetime.min.time())
+
+    return pa.table(
+        {
+            "sensor_id": pa.array(rng.integers(0, sensor_count, rows), pa.int32()),
+            "day": [first + timedelta(seconds=int(s)) for s in offsets],
+            "Time": pa.array(
+                [midnight + timedelta(seconds=int(s)) for s in offsets],
+                pa.timestamp("us"),
+            ),
+            "temperature": rng.normal(21, 4, rows),
+            "humidity": rng.uniform(20, 80, rows),
+        }
+    )
+
+
+def write_table(
+    uri: str, table: pa.Table, partition_by: list[str] | None, files: int
+) -> None:
+    """
+    Write the table as `files` appends, to get as many commits and data files
+    per partition as a table fed by regular loads.
+    """
+
+    step = max(1, -(-table.num_rows // files))
+    for offset in range(0, table.num_rows, step):
+        write_deltalake(
+            uri,
+            table.slice(offset, step),
+            partition_by=partition_by,
+            mode="append",
+        )
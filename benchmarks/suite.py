@@ -0,0 +1,254 @@
+import io
+import statistics
+import time
+from collections.abc import Callable
+from datetime import timedelta
+from pathlib import Path
+from typing import Any, NamedTuple
+
+import pyarrow as pa
+from deltalake import write_deltalake
+from fastapi.testclient import TestClient
+
+from benchmarks import datasets
+from benchmarks.catalog import LocalUnityCatalog
+from deltalink.core.catalog_cache import catalog_cache
+
+API = "/api/v1"
+CATALOG = "bench"
+SUPPLIERS = f"{CATALOG}.sales.suppliers"
+SENSORS = f"{CATALOG}.iot.sensors"
+
+
+class Case(NamedTuple):
+    name: str
+    method: str
+    path: str
+    request: Callable[[], dict[str, Any]]
+    """Arguments of the request, built again for every run."""
+
+    setup: Callable[[], None] | None = None
+    """Untimed preparation, run before every run."""
+
+
+def coordinates(table: str) -> dict[str, str]:
+    catalog, schema, name = table.split(".")
+    return {"catalog_name": catalog, "schema_name": schema, "table_name": name}
+
+
+def arrow_stream(table: pa.Table) -> bytes:
+    sink = io.BytesIO()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue()
+
+
+class Suite:
+    """
+    Local Delta tables behind a stubbed Unity Catalog, and the requests timed
+    against them. The read cases run first, the writes change the tables.
+    """
+
+    def __init__(self, root: Path, rows: int, days: int, files: int, batch_rows: int):
+        self.catalog = LocalUnityCatalog(root)
+        self.rows = rows
+        self.days = days
+        self.files = files
+        self.batch_rows = batch_rows
+        self._next_id = rows
+
+    def generate(self) -> None:
+        self._sensors = datasets.sensors(self.rows, self.days)
+        datasets.write_table(
+            str(self.catalog.table_path(SENSORS)), self._sensors, ["day"], self.files
+        )
+        datasets.write_table(
+            str(self.catalog.table_path(SUPPLIERS)),
+            datasets.suppliers(self.rows),
+            ["continent"],
+            self.files,
+        )
+
+    def new_suppliers(self) -> pa.Table:
+        table = datasets.suppliers(self.batch_rows, start=self._next_id)
+        self._next_id += self.batch_rows
+        return table
+
+    def cases(self) -> list[Case]:
+        last_day = self._sensors["day"][-1].as_py()
+        sensors_query = (
+            f"select sensor_id, avg(temperature) as temperature from {SENSORS} "
+            f"where day >= '{last_day - timedelta(days=1)}' group by sensor_id"
+        )
+        suppliers_query = (
+            f"select continent, count(*) as suppliers from {SUPPLIERS} "
+            "group by continent"
+        )
+        match = "target.supplierID = source.supplierID"
+        no_cache = {"Cache-Control": "no-cache"}
+        to_delete: list[pa.Table] = []
+
+        def insert_rows_to_delete() -> None:
+            table = self.new_suppliers()
+            write_deltalake(
+                str(self.catalog.table_path(SUPPLIERS)),
+                table,
+                partition_by=["continent"],
+                mode="append",
+            )
+            to_delete.append(table)
+
+        def delete_request() -> dict[str, Any]:
+            rows = to_delete.pop()
+            values = [
+                {"supplierID": supplier, "deleted": True}
+                for supplier in rows["supplierID"].to_pylist()
+            ]
+            return {
+                "json": coordinates(SUPPLIERS) | {"values": values, "predicate": match}
+            }
+
+        def add_small_files() -> None:
+            datasets.write_table(
+                str(self.catalog.table_path(SUPPLIERS)),
+                self.new_suppliers(),
+                ["continent"],
+                self.files,
+            )
+
+        def merge_request() -> dict[str, Any]:
+            rows = datasets.suppliers(self.batch_rows).to_pylist()
+            for row in rows:
+                row["name"] = row["name"].upper()
+            return {
+                "json": coordinates(SUPPLIERS)
+                | {
+                    "values": rows,
+                    "predicate": match,
+                    "updates": {"name": "source.name"},
+                }
+            }
+
+        return [
+            Case("catalog_list", "GET", "/catalogs", dict, catalog_cache.clear),
+            Case("catalog_tree", "GET", "/catalogs/tree", dict, catalog_cache.clear),
+            Case("catalog_tree_cached", "GET", "/catalogs/tree", dict),
+            Case(
+                "sql_aggregate",
+                "POST",
+                "/sql/query",
+                lambda: {"json": {"query": suppliers_query}, "headers": no_cache},
+            ),
+            Case(
+                "sql_partition_filter",
+                "POST",
+                "/sql/query",
+                lambda: {"json": {"query": sensors_query}, "headers": no_cache},
+            ),
+            Case(
+                "sql_cached",
+                "POST",
+                "/sql/query",
+                lambda: {"json": {"query": suppliers_query}},
+            ),
+            Case(
+                "sql_arrow_stream",
+                "POST",
+                "/sql/query",
+                lambda: {
+                    "json": {"query": f"select * from {SENSORS}"},
+                    "headers": no_cache
+                    | {"Accept": "application/vnd.apache.arrow.stream"},
+                },
+            ),
+            Case(
+                "data_read",
+                "POST",
+                "/data/read",
+                lambda: {
+                    "json": coordinates(SENSORS)
+                    | {
+                        "columns": ["Time", "temperature"],
+                        "predicates": [
+                            {"column": "day", "operator": "=", "value": str(last_day)},
+                            {"column": "sensor_id", "operator": "=", "value": "7"},
+                        ],
+                    }
+                },
+            ),
+            Case(
+                "append_json",
+                "POST",
+                "/data",
+                lambda: {
+                    "json": coordinates(SUPPLIERS)
+                    | {
+                        "values": self.new_suppliers().to_pylist(),
+                        "partition_by": ["continent"],
+                    }
+                },
+            ),
+            Case(
+                "append_arrow",
+                "POST",
+                "/data",
+                lambda: {
+                    "params": coordinates(SUPPLIERS) | {"partition_by": ["continent"]},
+                    "content": arrow_stream(self.new_suppliers()),
+                    "headers": {"Content-Type": "application/vnd.apache.arrow.stream"},
+                },
+            ),
+            Case("merge", "PATCH", "/data", merge_request),
+            Case("delete", "DELETE", "/data", delete_request, insert_rows_to_delete),
+            Case(
+                "compact",
+                "POST",
+                "/data/compact",
+                lambda: {"json": coordinates(SUPPLIERS)},
+                add_small_files,
+            ),
+            Case(
+                "vacuum",
+                "POST",
+                "/data/vacuum",
+                lambda: {"json": coordinates(SENSORS) | {"dry_run": True}},
+            ),
+        ]
+
+
+def summarize(timings: list[float]) -> dict[str, Any]:
+    ordered = sorted(timings)
+    return {
+        "runs": len(ordered),
+        "min": ordered[0],
+        "median": statistics.median(ordered),
+        "mean": statistics.fmean(ordered),
+        "p95": ordered[min(len(ordered) - 1, round(0.95 * (len(ordered) - 1)))],
+        "max": ordered[-1],
+        "stdev": statistics.stdev(ordered) if len(ordered) > 1 else 0.0,
+    }
+
+
+def run_case(client: TestClient, case: Case, repeat: int, warmup: int) -> list[float]:
+    """
+    Seconds taken by each timed run of a case, the warmup runs are dropped.
+    """
+
+    timings = []
+    for i in range(warmup + repeat):
+        if case.setup is not None:
+            case.setup()
+        request = case.request()
+
+        started = time.perf_counter()
+        response = client.request(case.method, API + case.path, **request)
+        elapsed = time.perf_counter() - started
+
+        if response.status_code >= 400:
+            raise RuntimeError(
+                f"{case.name} failed with {response.status_code}: {response.text}"
+            )
+        if i >= warmup:
+            timings.append(elapsed)
+
+    return timings
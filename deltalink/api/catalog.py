@@ -1,8 +1,23 @@
+import asyncio
+import hashlib
+import json
+from typing import Any
+
 import unitycatalog
-from fastapi import APIRouter, Depends, HTTPException
+from daft.unity_catalog import UnityCatalog
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from fastapi.responses import JSONResponse
 
 from deltalink.core.auth import get_auth
+from deltalink.core.catalog_cache import catalog_cache
 from deltalink.core.config import settings
+from deltalink.core.executor import (
+    BoundedExecutor,
+    catalog_executor,
+    read_executor,
+    write_executor,
+)
+from deltalink.core.metrics import span
 from deltalink.dependencies import get_unity
 from deltalink.types.delta_table import DeltaTable, DeltaTableInfo
 
@@ -10,6 +25,48 @@ router = APIRouter()
 auth = get_auth()
 
 
+async def list_catalogs(
+    unity: UnityCatalog, executor: BoundedExecutor = read_executor
+) -> list[str]:
+    with span("catalog"):
+        return await executor.run(catalog_cache.get, ("catalogs",), unity.list_catalogs)
+
+
+async def list_schemas(
+    unity: UnityCatalog, catalog: str, executor: BoundedExecutor = read_executor
+) -> list[str]:
+    with span("catalog"):
+        return await executor.run(
+            catalog_cache.get,
+            ("schemas", catalog),
+            lambda: unity.list_schemas(catalog),
+        )
+
+
+async def list_tables(
+    unity: UnityCatalog,
+    catalog: str,
+    schema: str,
+    executor: BoundedExecutor = read_executor,
+) -> list[str]:
+    with span("catalog"):
+        return await executor.run(
+            catalog_cache.get,
+            ("tables", catalog, schema),
+            lambda: unity.list_tables(f"{catalog}.{schema}"),
+        )
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return etag in tags
+
+
 @router.get(
     "/catalogs",
     summary="List all catalogs",
@@ -28,7 +85,75 @@ auth = get_auth()
 )
 async def get_catalogs():
     unity = await get_unity()
-    return unity.list_catalogs()
+    return await list_catalogs(unity)
+
+
+@router.get(
+    "/catalogs/tree",
+    summary="Tree of the catalogs, schemas and tables",
+    description="""Retrieve every catalog with its schemas and their tables in
+                   one response. The response has an ETag, send it back in
+                   `If-None-Match` to get a 304 when nothing changed.""",
+    response_description="The catalogs with their schemas and tables.",
+    responses={
+        200: {
+            "content": {
+                "application/json": {
+                    "example": {
+                        "catalogs": [
+                            {
+                                "name": "catalog1",
+                                "schemas": [
+                                    {
+                                        "name": "catalog1.schema1",
+                                        "tables": ["catalog1.schema1.table1"],
+                                    }
+                                ],
+                            }
+                        ]
+                    }
+                }
+            },
+        },
+        304: {"description": "The tree didn't change since the given ETag."},
+    },
+    tags=["Catalog"],
+)
+async def get_tree(request: Request):
+    unity = await get_unity()
+
+    async def schema_node(catalog: str, full_name: str) -> dict[str, Any]:
+        schema = full_name.split(".")[-1]
+        return {
+            "name": full_name,
+            "tables": await list_tables(unity, catalog, schema, catalog_executor),
+        }
+
+    async def catalog_node(catalog: str) -> dict[str, Any]:
+        schemas = await list_schemas(unity, catalog, catalog_executor)
+        return {
+            "name": catalog,
+            "schemas": await asyncio.gather(
+                *(schema_node(catalog, schema) for schema in schemas)
+            ),
+        }
+
+    # One UC call per catalog and schema, run on a pool of their own
+    catalogs = await list_catalogs(unity, catalog_executor)
+    tree = {
+        "catalogs": await asyncio.gather(
+            *(catalog_node(catalog) for catalog in catalogs)
+        )
+    }
+
+    body = json.dumps(tree, separators=(",", ":")).encode()
+    etag = f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+    if etag_matches(request, etag):
+        return Response(
+            status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag}
+        )
+
+    return JSONResponse(content=tree, headers={"ETag": etag})
 
 
 @router.get(
@@ -48,7 +173,7 @@ async def get_catalogs():
 )
 async def get_schemas(catalog: str) -> list[str]:
     unity = await get_unity()
-    return unity.list_schemas(catalog)
+    return await list_schemas(unity, catalog)
 
 
 @router.post(
@@ -64,9 +189,16 @@ async def get_schemas(catalog: str) -> list[str]:
 )
 async def create_schema(catalog: str, name: str, comments: str) -> None:
     unity = await get_unity()
-    return unity._client.schemas.create(
-        catalog_name=catalog, name=name, comment=comments
-    )
+    try:
+        with span("catalog"):
+            return await write_executor.run(
+                unity._client.schemas.create,
+                catalog_name=catalog,
+                name=name,
+                comment=comments,
+            )
+    finally:
+        catalog_cache.invalidate("schemas", catalog)
 
 
 @router.get(
@@ -86,7 +218,7 @@ async def create_schema(catalog: str, name: str, comments: str) -> None:
 )
 async def get_tables(catalog: str, schema: str) -> list[str]:
     unity = await get_unity()
-    return unity.list_tables(f"{catalog}.{schema}")
+    return await list_tables(unity, catalog, schema)
 
 
 @router.post(
@@ -103,17 +235,23 @@ async def get_tables(catalog: str, schema: str) -> list[str]:
 )
 async def create_table(catalog: str, schema: str, table: DeltaTable) -> DeltaTableInfo:
     unity = await get_unity()
-    return unity._client.tables.create(
-        catalog_name=catalog,
-        schema_name=schema,
-        name=table.name,
-        comment=table.comment,
-        data_source_format="DELTA",
-        properties=table.properties,
-        table_type="EXTERNAL",
-        columns=table.columns,
-        storage_location=f"{settings.STORAGE_LOCATION}/{catalog}/{schema}/{table.name}/",
-    )
+    try:
+        with span("catalog"):
+            return await write_executor.run(
+                unity._client.tables.create,
+                catalog_name=catalog,
+                schema_name=schema,
+                name=table.name,
+                comment=table.comment,
+                data_source_format="DELTA",
+                properties=table.properties,
+                table_type="EXTERNAL",
+                columns=table.columns,
+                storage_location=f"{settings.STORAGE_LOCATION}/{catalog}/{schema}/{table.name}/",
+            )
+    finally:
+        catalog_cache.invalidate("tables", catalog, schema)
+        catalog_cache.invalidate("table", catalog, schema, table.name)
 
 
 @router.get(
@@ -139,9 +277,14 @@ async def get_table_info(
     unity = await get_unity()
 
     try:
-        uc_table = unity._client.tables.retrieve(
-            f"{catalog_name}.{schema_name}.{table_name}"
-        )
+        with span("catalog"):
+            uc_table = await read_executor.run(
+                catalog_cache.get,
+                ("table", catalog_name, schema_name, table_name),
+                lambda: unity._client.tables.retrieve(
+                    f"{catalog_name}.{schema_name}.{table_name}"
+                ),
+            )
 
         return uc_table
     except unitycatalog.NotFoundError as e:
@@ -1,18 +1,70 @@
-from typing import Any
+import json
+from collections.abc import AsyncIterator, Iterator
+from datetime import datetime
+from typing import Annotated, Any
 
+import daft
 import pandas as pd
-from deltalake import DeltaTable as DeltaLakeTable
+import pyarrow as pa
+from daft.unity_catalog import UnityCatalog
 from deltalake import write_deltalake
-from fastapi import APIRouter, HTTPException, status
+from deltalake.exceptions import DeltaError, DeltaProtocolError
+from fastapi import APIRouter, HTTPException, Query, Request, status
+from fastapi.encoders import jsonable_encoder
+from fastapi.exceptions import RequestValidationError
+from fastapi.logger import logger
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import ValidationError
 
+from deltalink.core.admission import AdmittedResponse, admission
+from deltalink.core.arrow import (
+    ARROW_STREAM_MEDIA_TYPE,
+    NDJSON_MEDIA_TYPE,
+    accepted_media_type,
+    iter_arrow_stream,
+    iter_ndjson,
+    read_table_payload,
+    table_request_body,
+)
 from deltalink.core.auth import get_auth
-from deltalink.core.util import ensure_io_from_tables
+from deltalink.core.coalescer import append_coalescer
+from deltalink.core.config import settings
+from deltalink.core.executor import (
+    maintenance_executor,
+    read_executor,
+    write_executor,
+)
+from deltalink.core.maintenance import maintenance
+from deltalink.core.merge import merge_in_batches
+from deltalink.core.metrics import (
+    delta_commits_total,
+    metered,
+    record_rows,
+    span,
+)
+from deltalink.core.pruning import (
+    keys_sql,
+    lookup_files,
+    predicate_expression,
+    predicate_sql,
+)
+from deltalink.core.tables import (
+    DeltaSnapshot,
+    load_snapshot,
+    storage_options,
+    table_cache,
+)
+from deltalink.core.util import ensure_io_from_tables, forget_denied
+from deltalink.core.writes import write_scheduler
 from deltalink.dependencies import get_unity
 from deltalink.types.delta_table import (
     DeltaTableDelete,
     DeltaTableInsert,
     DeltaTableMerge,
     DeltaTableOptimization,
+    DeltaTablePredicate,
+    DeltaTablePredicateDelete,
+    DeltaTableRead,
     DeltaTableVacuum,
 )
 
@@ -20,11 +72,19 @@ router = APIRouter()
 auth = get_auth()
 
 
+def payload_bytes(df: pd.DataFrame | pa.Table) -> int:
+    if isinstance(df, pa.Table):
+        return df.nbytes
+    return int(df.memory_usage(index=False).sum())
+
+
 @router.post(
     "/data",
     summary="Append data to a Delta table",
     description="""Simulare to SQL INSERT new data to an existing 
-                   Delta table in Unity Catalog.""",
+                   Delta table in Unity Catalog. The rows can be sent as JSON, 
+                   or as an Arrow IPC stream or Parquet body with the table 
+                   coordinates in the query string.""",
     response_description="Data appended successfully.",
     responses={
         204: {"description": "Data appended successfully."},
@@ -33,74 +93,170 @@ auth = get_auth()
     response_model=None,
     status_code=status.HTTP_204_NO_CONTENT,
     tags=["Data"],
+    openapi_extra=table_request_body(DeltaTableInsert),
 )
-async def load_table(input: DeltaTableInsert) -> None:
+async def load_table(request: Request) -> None:
     unity = await get_unity()
 
-    df = pd.DataFrame(input.values)
-    if df.empty:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="No data provided to append to the table.",
-        )
-    cache = ensure_io_from_tables(
-        unity,
-        [f"{input.catalog_name}.{input.schema_name}.{input.table_name}"],
-        operation="READ_WRITE",
-    )
-    table_config = next(iter(cache))
-    storage_options = {"SAS_TOKEN": table_config.io_config.azure.sas_token}
+    async with admission.admit("write", admission.body_cost(request)):
+        input, df = await read_table_payload(request, DeltaTableInsert)
+        if len(df) == 0:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="No data provided to append to the table.",
+            )
+        table_name = f"{input.catalog_name}.{input.schema_name}.{input.table_name}"
+        cache = ensure_io_from_tables(unity, [table_name], operation="READ_WRITE")
+        with span("credentials"):
+            table_config = await read_executor.run(next, iter(cache))
+        options = storage_options(table_config)
+        record_rows("append", len(df), payload_bytes(df))
 
-    write_deltalake(
-        table_config.table_uri,
-        df,
-        mode="append",
-        storage_options=storage_options,
-        partition_by=input.partition_by if input.partition_by else None,
-    )
+        if settings.COALESCE_APPENDS:
+            # Counts the commit of the group
+            with span("commit"), forget_denied(table_name, table_config.table_uri):
+                await append_coalescer.append(
+                    table_config.table_uri,
+                    df,
+                    options,
+                    partition_by=input.partition_by,
+                    table_name=table_name,
+                )
+            maintenance.notify(unity, table_name, table_config.table_uri)
+            return None
 
-    return None
+        with span("commit"), forget_denied(table_name, table_config.table_uri):
+            await write_executor.run(
+                write_deltalake,
+                table_config.table_uri,
+                df,
+                mode="append",
+                storage_options=options,
+                partition_by=input.partition_by if input.partition_by else None,
+            )
+        delta_commits_total.labels(table=table_name, operation="append").inc()
+        maintenance.notify(unity, table_name, table_config.table_uri)
+
+        return None
 
 
 @router.patch(
     "/data",
     summary="Merge data into a Delta table, similar to SQL MERGE",
     description="""Similar to SQL UPDATE, it takes the given dataset and updates 
-                    existing rows based on a predicateDelta table in Unity Catalog.""",
+                    existing rows based on a predicateDelta table in Unity Catalog.
+                    With `batch_rows`, large upserts are merged in batches grouped
+                    by the partitions of the table, an Arrow stream or Parquet body
+                    is spooled to disk, and the progress of each commit is
+                    streamed back as NDJSON.""",
     response_description="Data merged successfully.",
+    responses={
+        200: {
+            "description": "Progress of a batched merge, one line per commit.",
+            "content": {NDJSON_MEDIA_TYPE: {}},
+        },
+        204: {"description": "Data merged successfully."},
+    },
+    response_model=None,
     status_code=status.HTTP_204_NO_CONTENT,
     tags=["Data"],
+    openapi_extra=table_request_body(DeltaTableMerge),
 )
-async def merge_table(input: DeltaTableMerge) -> None:
+async def merge_table(request: Request) -> StreamingResponse | None:
     unity = await get_unity()
 
-    df = pd.DataFrame(input.values)
-    if df.empty:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="No data provided to append to the table.",
-        )
+    # A batched merge holds its slot until the last commit is reported
+    async with admission.admit("write", admission.body_cost(request)) as ticket:
+        spool = "batch_rows" in request.query_params
+        input, df = await read_table_payload(request, DeltaTableMerge, spool=spool)
+        if len(df) == 0:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="No data provided to append to the table.",
+            )
+
+        table_name = f"{input.catalog_name}.{input.schema_name}.{input.table_name}"
+        cache = ensure_io_from_tables(unity, [table_name], operation="READ_WRITE")
+        with span("credentials"):
+            table_config = await read_executor.run(next, iter(cache))
+        options = storage_options(table_config)
+
+        if input.batch_rows is not None:
+            source = df
+            if not isinstance(df, pa.Table):
+                source = await read_executor.run(
+                    pa.Table.from_pandas, df, preserve_index=False
+                )
+            batches = merge_in_batches(
+                table_config.table_uri,
+                table_name,
+                options,
+                source,
+                input.predicate,
+                input.updates,
+                input.batch_rows,
+            )
+            progress = merge_progress(
+                batches, unity, table_name, table_config.table_uri
+            )
+            return AdmittedResponse(
+                ticket,
+                progress,
+                media_type=NDJSON_MEDIA_TYPE,
+            )
 
-    cache = ensure_io_from_tables(
-        unity,
-        [f"{input.catalog_name}.{input.schema_name}.{input.table_name}"],
-        operation="READ_WRITE",
-    )
+        def merge() -> None:
+            with table_cache.acquire(table_config.table_uri, options) as dt:
+                dt.merge(  # target data
+                    source=df,  # source data
+                    predicate=input.predicate,  # condition for matching rows
+                    source_alias="source",
+                    target_alias="target",
+                ).when_matched_update(  # conditional statement
+                    updates=input.updates
+                ).execute()
 
-    table_config = next(iter(cache))
-    storage_options = {"SAS_TOKEN": table_config.io_config.azure.sas_token}
+        record_rows("merge", len(df), payload_bytes(df))
+        with span("commit"), forget_denied(table_name, table_config.table_uri):
+            await write_scheduler.run(
+                table_config.table_uri, table_name, "merge", merge
+            )
+        delta_commits_total.labels(table=table_name, operation="merge").inc()
+        maintenance.notify(unity, table_name, table_config.table_uri)
 
-    dt = DeltaLakeTable(table_config.table_uri, storage_options=storage_options)
-    dt.merge(  # target data
-        source=df,  # source data
-        predicate=input.predicate,  # condition for matching rows
-        source_alias="source",
-        target_alias="target",
-    ).when_matched_update(  # conditional statement
-        updates=input.updates
-    ).execute()
+        return None
 
-    return None
+
+async def merge_progress(
+    batches: Iterator[dict[str, Any]],
+    unity: UnityCatalog,
+    table_name: str,
+    table_uri: str,
+) -> AsyncIterator[bytes]:
+    """
+    Run the commits of a batched merge and report each of them as a line.
+    A failure is reported as the last line, after the commits already made.
+    """
+
+    commits = 0
+    try:
+        while True:
+            # Other writes to the table may run between two batches
+            async with write_scheduler.serialize(table_uri):
+                with span("commit"), forget_denied(table_name, table_uri):
+                    progress = await write_executor.run(next, batches, None)
+            if progress is None:
+                break
+            commits += 1
+            record_rows("merge", progress["rows"], progress.pop("bytes"))
+            delta_commits_total.labels(table=table_name, operation="merge").inc()
+            yield (json.dumps(progress) + "\n").encode()
+    except Exception as e:
+        logger.error(f"Batched merge into {table_name} failed: {e!s}")
+        yield (json.dumps({"error": str(e), "commits": commits}) + "\n").encode()
+    finally:
+        if commits:
+            maintenance.notify(unity, table_name, table_uri)
 
 
 @router.delete(
@@ -118,65 +274,177 @@ async def merge_table(input: DeltaTableMerge) -> None:
     },
     status_code=status.HTTP_204_NO_CONTENT,
     tags=["Data"],
+    openapi_extra=table_request_body(DeltaTableDelete),
 )
-async def merge_delete_table(input: DeltaTableDelete) -> None:
+async def merge_delete_table(request: Request) -> None:
     unity = await get_unity()
 
-    df = pd.DataFrame(input.values)
-    if df.empty:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="No data provided to append to the table.",
-        )
-    cache = ensure_io_from_tables(
-        unity,
-        [f"{input.catalog_name}.{input.schema_name}.{input.table_name}"],
-        operation="READ_WRITE",
-    )
-    table_config = next(iter(cache))
-    storage_options = {"SAS_TOKEN": table_config.io_config.azure.sas_token}
+    async with admission.admit("write", admission.body_cost(request)):
+        input, df = await read_table_payload(request, DeltaTableDelete)
+        if len(df) == 0:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="No data provided to append to the table.",
+            )
+        table_name = f"{input.catalog_name}.{input.schema_name}.{input.table_name}"
+        cache = ensure_io_from_tables(unity, [table_name], operation="READ_WRITE")
+        with span("credentials"):
+            table_config = await read_executor.run(next, iter(cache))
+        options = storage_options(table_config)
+
+        def merge_delete() -> None:
+            with table_cache.acquire(table_config.table_uri, options) as dt:
+                dt.merge(
+                    source=df,
+                    predicate=input.predicate,
+                    source_alias="source",
+                    target_alias="target",
+                ).when_matched_delete(predicate="source.deleted = true").execute()
+
+        record_rows("delete", len(df), payload_bytes(df))
+        with span("commit"), forget_denied(table_name, table_config.table_uri):
+            await write_scheduler.run(
+                table_config.table_uri, table_name, "delete", merge_delete
+            )
+        delta_commits_total.labels(table=table_name, operation="delete").inc()
+        maintenance.notify(unity, table_name, table_config.table_uri)
+
+        return None
+
+
+@router.post(
+    "/data/delete",
+    summary="Delete the rows of a Delta table matching keys or predicates",
+    description="""Delete the rows whose key column holds one of the given keys,
+                   or the rows matching all the predicates, with a Delta predicate
+                   delete. No rows are uploaded or joined: the files are skipped
+                   from their statistics and only the files holding deleted rows
+                   are rewritten.""",
+    response_description="Metrics of the delete.",
+    responses={
+        200: {"description": "Rows deleted, files removed and added."},
+        400: {"description": "Bad Request - Unknown column or invalid value."},
+    },
+    tags=["Data"],
+)
+async def delete_rows(input: DeltaTablePredicateDelete) -> dict[str, Any]:
+    unity = await get_unity()
+
+    table_name = f"{input.catalog_name}.{input.schema_name}.{input.table_name}"
+    cache = ensure_io_from_tables(unity, [table_name], operation="READ_WRITE")
+    with span("credentials"):
+        table_config = await read_executor.run(next, iter(cache))
+    options = storage_options(table_config)
 
-    dt = DeltaLakeTable(table_config.table_uri, storage_options=storage_options)
-    dt.merge(
-        source=df,
-        predicate=input.predicate,
-        source_alias="source",
-        target_alias="target",
-    ).when_matched_delete(predicate="source.deleted = true").execute()
+    def delete() -> dict[str, Any]:
+        with table_cache.acquire(table_config.table_uri, options) as dt:
+            schema = dt.schema().to_pyarrow()
+            if input.predicates:
+                filters = [(p.column, p.operator, p.value) for p in input.predicates]
+                predicate = predicate_sql(filters, schema)
+            else:
+                predicate = keys_sql(input.key_column, input.keys, schema)
+            return dt.delete(predicate)
 
-    return None
+    # Only the predicate is sent, the delete counts in the concurrency
+    async with admission.admit("write", 0):
+        try:
+            with span("commit"), forget_denied(table_name, table_config.table_uri):
+                res = await write_scheduler.run(
+                    table_config.table_uri, table_name, "delete", delete
+                )
+        except (ValueError, DeltaProtocolError) as e:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST, detail=str(e)
+            ) from e
+        if res.get("num_removed_files") or res.get("num_added_files"):
+            delta_commits_total.labels(table=table_name, operation="delete").inc()
+            maintenance.notify(unity, table_name, table_config.table_uri)
+        return res
 
 
 @router.post(
     "/data/compact",
     summary="Optimize and compact the Delta table",
-    description="""Optimize and compact the 
-                   Delta table in Unity Catalog.""",
+    description="""Optimize the Delta table in Unity Catalog: bin-pack its small
+                   files, or cluster its rows by Z-order so the min/max statistics
+                   of the files skip more of them. The Z-order response tells how
+                   many files a lookup on each clustering column is expected to
+                   read, before and after.""",
     response_description="Data compacted successfully.",
     responses={
         200: {"description": "Data compaction details."},
-        400: {"description": "Bad Request - No data provided to compact the table."},
+        400: {"description": "Bad Request - Unknown or partition clustering column."},
     },
     tags=["Data"],
 )
 async def compact_table(input: DeltaTableOptimization) -> dict[str, Any]:
     unity = await get_unity()
 
-    cache = ensure_io_from_tables(
-        unity,
-        [f"{input.catalog_name}.{input.schema_name}.{input.table_name}"],
-        operation="READ_WRITE",
-    )
-    table_config = next(iter(cache))
-    storage_options = {"SAS_TOKEN": table_config.io_config.azure.sas_token}
+    table_name = f"{input.catalog_name}.{input.schema_name}.{input.table_name}"
+    cache = ensure_io_from_tables(unity, [table_name], operation="READ_WRITE")
+    with span("credentials"):
+        table_config = await read_executor.run(next, iter(cache))
+    options = storage_options(table_config)
 
-    dt = DeltaLakeTable(table_config.table_uri, storage_options=storage_options)
     filters: list[tuple[str, str, str]] | None = None
 
     if input.partition_filters:
         filters = [(f.column, f.operator, f.value) for f in input.partition_filters]
 
-    res = dt.optimize.compact(partition_filters=filters)
+    tuning = {
+        "target_size": input.target_size,
+        "max_concurrent_tasks": input.max_concurrent_tasks,
+    }
+
+    def compact() -> dict[str, Any]:
+        with table_cache.acquire(table_config.table_uri, options) as dt:
+            if input.mode == "compact":
+                return dt.optimize.compact(partition_filters=filters, **tuning)
+
+            columns = input.z_order_columns
+            schema = dt.schema().to_pyarrow().names
+            partitions = dt.metadata().partition_columns
+            for column in columns:
+                if column not in schema:
+                    raise ValueError(f"Unknown column {column!r}")
+                if column in partitions:
+                    raise ValueError(
+                        f"Can't Z-order by the partition column {column!r}"
+                    )
+
+            before = dt.get_add_actions()
+            if input.max_spill_size is not None:
+                tuning["max_spill_size"] = input.max_spill_size
+            res = dt.optimize.z_order(columns, partition_filters=filters, **tuning)
+            after = dt.get_add_actions()
+
+        res["skipping"] = {
+            column: {
+                "files_before": before.num_rows,
+                "files_after": after.num_rows,
+                "lookup_files_before": lookup_files(before, column),
+                "lookup_files_after": lookup_files(after, column),
+            }
+            for column in columns
+        }
+        return res
+
+    try:
+        with span("commit"), forget_denied(table_name, table_config.table_uri):
+            res = await write_scheduler.run(
+                table_config.table_uri,
+                table_name,
+                input.mode,
+                compact,
+                executor=maintenance_executor,
+            )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail=str(e)
+        ) from e
+    if res.get("numFilesAdded") or res.get("numFilesRemoved"):
+        delta_commits_total.labels(table=table_name, operation=input.mode).inc()
     return res
 
 
@@ -197,18 +465,185 @@ async def compact_table(input: DeltaTableOptimization) -> dict[str, Any]:
 async def vacuum_table(input: DeltaTableVacuum) -> list[str]:
     unity = await get_unity()
 
-    cache = ensure_io_from_tables(
-        unity,
-        [f"{input.catalog_name}.{input.schema_name}.{input.table_name}"],
-        operation="READ_WRITE",
-    )
-    table_config = next(iter(cache))
-    storage_options = {"SAS_TOKEN": table_config.io_config.azure.sas_token}
-
-    dt = DeltaLakeTable(table_config.table_uri, storage_options=storage_options)
-    res = dt.vacuum(
-        retention_hours=input.retention_hours,
-        dry_run=input.dry_run,
-        enforce_retention_duration=input.enforce_retention_duration,
-    )
+    table_name = f"{input.catalog_name}.{input.schema_name}.{input.table_name}"
+    cache = ensure_io_from_tables(unity, [table_name], operation="READ_WRITE")
+    with span("credentials"):
+        table_config = await read_executor.run(next, iter(cache))
+    options = storage_options(table_config)
+
+    def vacuum() -> list[str]:
+        with table_cache.acquire(table_config.table_uri, options) as dt:
+            return dt.vacuum(
+                retention_hours=input.retention_hours,
+                dry_run=input.dry_run,
+                enforce_retention_duration=input.enforce_retention_duration,
+            )
+
+    with span("commit"), forget_denied(table_name, table_config.table_uri):
+        res = await maintenance_executor.run(vacuum)
     return res
+
+
+READ_DESCRIPTION = """Read the rows of a Delta table matching all the predicates,
+                   without going through SQL. Only the files that may hold
+                   matching rows are read, skipped by their partition values
+                   and their min/max statistics, and only the given columns.
+                   Set `version` or `timestamp` to read the table as it was,
+                   its version is sent in the `X-Table-Version` header.
+                   Send `Accept: application/x-ndjson` or
+                   `Accept: application/vnd.apache.arrow.stream` to have the rows
+                   streamed batch by batch."""
+
+READ_RESPONSES: dict[int | str, dict[str, Any]] = {
+    200: {
+        "content": {
+            NDJSON_MEDIA_TYPE: {"schema": {"type": "string"}},
+            ARROW_STREAM_MEDIA_TYPE: {"schema": {"type": "string", "format": "binary"}},
+        }
+    },
+    400: {"description": "Bad Request - Unknown column or invalid predicate."},
+}
+
+
+@router.get(
+    "/data/read",
+    summary="Read rows from a Delta table",
+    description=READ_DESCRIPTION,
+    responses=READ_RESPONSES,
+    tags=["Data"],
+)
+async def read_table_query(
+    request: Request,
+    catalog_name: str,
+    schema_name: str,
+    table_name: str,
+    columns: Annotated[list[str] | None, Query()] = None,
+    predicates: Annotated[
+        list[str] | None,
+        Query(
+            description="JSON encoded predicates, such as "
+            '`{"column": "continent", "operator": "=", "value": "Europe"}`.'
+        ),
+    ] = None,
+    limit: int | None = None,
+    version: int | None = None,
+    timestamp: datetime | None = None,
+):
+    try:
+        input = DeltaTableRead(
+            catalog_name=catalog_name,
+            schema_name=schema_name,
+            table_name=table_name,
+            columns=columns,
+            predicates=[DeltaTablePredicate.model_validate_json(p) for p in predicates]
+            if predicates
+            else None,
+            limit=limit,
+            version=version,
+            timestamp=timestamp,
+        )
+    except ValidationError as e:
+        raise RequestValidationError(e.errors(include_url=False)) from e
+
+    return await read_table(input, request)
+
+
+@router.post(
+    "/data/read",
+    summary="Read rows from a Delta table",
+    description=READ_DESCRIPTION,
+    responses=READ_RESPONSES,
+    tags=["Data"],
+)
+async def read_table_body(input: DeltaTableRead, request: Request):
+    return await read_table(input, request)
+
+
+async def read_table(input: DeltaTableRead, request: Request):
+    """
+    Scan a table with the predicates and the columns pushed down, the files
+    are pruned before daft plans the scan.
+    """
+
+    start = datetime.now()
+    unity = await get_unity()
+
+    table_name = f"{input.catalog_name}.{input.schema_name}.{input.table_name}"
+    cache = ensure_io_from_tables(unity, [table_name])
+    with span("credentials"):
+        table_config = await read_executor.run(next, iter(cache))
+
+    def scan() -> tuple[daft.DataFrame, DeltaSnapshot, DeltaSnapshot]:
+        with span("load"), forget_denied(table_name, table_config.table_uri):
+            pin = input.version if input.version is not None else input.timestamp
+            snapshot = load_snapshot(table_config, pin)
+
+        with span("plan"):
+            predicate = predicate_expression(
+                [(p.column, p.operator, p.value) for p in input.predicates or []],
+                snapshot.schema().to_pyarrow(),
+            )
+
+            pruned = snapshot if predicate is None else snapshot.prune(predicate)
+            df = pruned.to_daft(table_config.io_config, table_name)
+            if predicate is not None:
+                df = df.where(predicate)
+            if input.columns:
+                df = df.select(*input.columns)
+            if input.limit is not None:
+                df = df.limit(input.limit)
+        return df, snapshot, pruned
+
+    try:
+        df, snapshot, pruned = await read_executor.run(scan)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail=str(e)
+        ) from e
+    except DeltaError as e:
+        if input.version is None and input.timestamp is None:
+            raise
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"The table can't be read at the requested version: {e!s}",
+        ) from e
+
+    def response_headers() -> dict[str, str]:
+        return {
+            "X-Processing-Time": str((datetime.now() - start).total_seconds()),
+            "X-Table-Version": str(snapshot.version),
+            "X-Scanned-Files": f"{pruned.get_add_actions().num_rows}"
+            f"/{snapshot.get_add_actions().num_rows}",
+        }
+
+    # The files left after pruning, their columns may not all be read
+    cost = admission.scan_cost(pruned.size_bytes)
+
+    async with admission.admit("read", cost) as ticket:
+        media_type = accepted_media_type(
+            request, NDJSON_MEDIA_TYPE, ARROW_STREAM_MEDIA_TYPE
+        )
+        if media_type is not None:
+            # Only one partition is buffered ahead of the client
+            batches = metered(df.to_arrow_iter(results_buffer_size=1), "read")
+            if media_type == NDJSON_MEDIA_TYPE:
+                content = iter_ndjson(batches)
+            else:
+                content = iter_arrow_stream(batches, df.schema().to_pyarrow_schema())
+
+            return AdmittedResponse(
+                ticket,
+                read_executor.iterate(content),
+                media_type=media_type,
+                headers=response_headers(),
+            )
+
+        def collect() -> dict[str, Any]:
+            with span("execute"):
+                result = df.to_arrow()
+            record_rows("read", result.num_rows, result.nbytes)
+            with span("serialize"):
+                return jsonable_encoder({"data": result.to_pylist()})
+
+        content = await read_executor.run(collect)
+        return JSONResponse(content=content, headers=response_headers())
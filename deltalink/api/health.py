@@ -1,11 +1,86 @@
+from collections.abc import Iterator
+from typing import Any
+
 from fastapi import APIRouter
+from fastapi.responses import Response
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily, Metric
+from prometheus_client.registry import Collector
 
+from deltalink.core.admission import admission
 from deltalink.core.auth import get_auth
+from deltalink.core.catalog_cache import catalog_cache
+from deltalink.core.coalescer import append_coalescer
+from deltalink.core.credentials import credentials
+from deltalink.core.executor import executor_stats
+from deltalink.core.jobs import query_jobs
+from deltalink.core.maintenance import maintenance
+from deltalink.core.metrics import metrics
+from deltalink.core.plan_cache import plan_cache
+from deltalink.core.result_cache import result_cache
+from deltalink.core.runners import query_runner
+from deltalink.core.spill import result_spill
+from deltalink.core.tables import pinned_snapshots, table_cache
+from deltalink.core.writes import write_scheduler
 
 router = APIRouter()
 auth = get_auth()
 
 
+def cache_lookups() -> dict[str, tuple[int, int]]:
+    """
+    Hits and misses of each cache of the service.
+    """
+
+    tables = table_cache.stats()
+    plans = plan_cache.stats()
+    lookups = {
+        "credentials": credentials.stats(),
+        "catalog": catalog_cache.stats(),
+        "result": result_cache.stats(),
+    }
+    return {
+        **{name: (stats["hits"], stats["misses"]) for name, stats in lookups.items()},
+        # A refresh reads the new commits of a cached table, a load reads it all
+        "table": (tables["hits"] + tables["refreshes"], tables["loads"]),
+        "query_parse": (plans["parse_hits"], plans["parse_misses"]),
+        "query_plan": (plans["plan_hits"], plans["plan_misses"]),
+    }
+
+
+class CacheCollector(Collector):
+    """
+    Hits, misses and hit ratio of each cache, read when the metrics are
+    scraped.
+    """
+
+    def collect(self) -> Iterator[Metric]:
+        hits = CounterMetricFamily(
+            "deltalink_cache_hits_total",
+            "Lookups served by each cache.",
+            labels=["cache"],
+        )
+        misses = CounterMetricFamily(
+            "deltalink_cache_misses_total",
+            "Lookups missed by each cache.",
+            labels=["cache"],
+        )
+        ratio = GaugeMetricFamily(
+            "deltalink_cache_hit_ratio",
+            "Share of the lookups served by each cache since the start.",
+            labels=["cache"],
+        )
+        for cache, (hit, missed) in cache_lookups().items():
+            hits.add_metric([cache], hit)
+            misses.add_metric([cache], missed)
+            if hit + missed:
+                ratio.add_metric([cache], hit / (hit + missed))
+        yield from (hits, misses, ratio)
+
+
+metrics.register(CacheCollector())
+
+
 @router.get(
     "/health",
     summary="Health Check",
@@ -17,3 +92,46 @@ auth = get_auth()
 )
 async def health() -> None:
     return {"status": "healthy", "message": "Service is running smoothly."}
+
+
+@router.get(
+    "/health/stats",
+    summary="Runtime statistics",
+    description="""Statistics of the service internals, such as the queue depth 
+                   of the executors running the blocking Delta and UC calls, 
+                   or the group commits of the appends.""",
+    response_description="Statistics per component of the service",
+    tags=["Health"],
+)
+async def stats() -> dict[str, Any]:
+    return {
+        "executors": executor_stats(),
+        "admission": admission.stats(),
+        "append_coalescer": append_coalescer.stats(),
+        "write_scheduler": write_scheduler.stats(),
+        "table_cache": table_cache.stats(),
+        "pinned_snapshots": pinned_snapshots.stats(),
+        "credentials": credentials.stats(),
+        "catalog_cache": catalog_cache.stats(),
+        "result_cache": result_cache.stats(),
+        "result_spill": result_spill.stats(),
+        "plan_cache": plan_cache.stats(),
+        "query_runner": query_runner.stats(),
+        "query_jobs": query_jobs.stats(),
+        "maintenance": maintenance.stats(),
+    }
+
+
+@router.get(
+    "/metrics",
+    summary="Prometheus metrics",
+    description="""Latency histograms of the requests and of their stages
+                   (credentials, load, plan, execute, serialize, commit, catalog),
+                   cache hit ratios, rows and bytes processed and Delta commits
+                   per table, in the Prometheus text format.""",
+    response_class=Response,
+    responses={200: {"content": {CONTENT_TYPE_LATEST: {}}}},
+    tags=["Health"],
+)
+async def prometheus_metrics() -> Response:
+    return Response(content=generate_latest(metrics), media_type=CONTENT_TYPE_LATEST)
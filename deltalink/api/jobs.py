@@ -0,0 +1,150 @@
+from typing import Annotated
+
+from fastapi import APIRouter, Body, HTTPException, Request, Response, status
+from fastapi.responses import StreamingResponse
+
+from deltalink.api.sql import PinnedQuery
+from deltalink.core.arrow import (
+    ARROW_STREAM_MEDIA_TYPE,
+    JSON_MEDIA_TYPE,
+    NDJSON_MEDIA_TYPE,
+    accepted_media_type,
+    iter_arrow_stream,
+    iter_json,
+    iter_ndjson,
+)
+from deltalink.core.auth import get_auth
+from deltalink.core.config import settings
+from deltalink.core.executor import read_executor
+from deltalink.core.jobs import QueryJob, TooManyJobs, query_jobs
+from deltalink.core.plan_cache import plan_cache
+from deltalink.core.util import pinned_versions
+from deltalink.dependencies import get_unity
+from deltalink.types.query_job import QueryJobInfo
+
+router = APIRouter()
+auth = get_auth()
+
+
+def get_job(job_id: str) -> QueryJob:
+    job = query_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Query job {job_id} not found, it may have expired.",
+        )
+    return job
+
+
+@router.post(
+    "/sql/jobs",
+    summary="Submit a SQL query as a job",
+    description="""Run a SQL query in the background and return its job right
+                   away. Poll the job until it succeeded, then fetch its result.
+                   Set `versions` or `timestamp` to read the tables as they
+                   were, like /sql/query.
+                   Finished jobs and their results are removed after a while.
+                   A job submitted while too many are pending gets a 429.""",
+    status_code=status.HTTP_202_ACCEPTED,
+    response_model=QueryJobInfo,
+    tags=["Query"],
+)
+async def submit_job(
+    query: Annotated[
+        PinnedQuery,
+        Body(examples=[{"query": "select * from main.bakehouse.sales_suppliers"}]),
+    ],
+    request: Request,
+    response: Response,
+    # user: UserInfo = Depends(auth.scheme),
+):
+    uc_catalog = await get_unity()
+
+    if query.versions:
+        try:
+            pinned_versions(plan_cache.tables(query.query), query.versions)
+        except ValueError as e:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST, detail=str(e)
+            ) from e
+
+    try:
+        job = query_jobs.submit(
+            query.query, uc_catalog, query.versions, query.timestamp
+        )
+    except TooManyJobs as e:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=f"{e!s}, retry later",
+            headers={"Retry-After": str(settings.ADMISSION_RETRY_AFTER_SECONDS)},
+        ) from e
+
+    response.headers["Location"] = str(request.url_for("job_status", job_id=job.id))
+    return job.info(query_jobs.ttl)
+
+
+@router.get(
+    "/sql/jobs/{job_id}",
+    summary="Status of a SQL query job",
+    description="Status, progress and timings of a query job.",
+    response_model=QueryJobInfo,
+    tags=["Query"],
+)
+async def job_status(job_id: str):
+    return get_job(job_id).info(query_jobs.ttl)
+
+
+@router.get(
+    "/sql/jobs/{job_id}/result",
+    summary="Result of a SQL query job",
+    description="""Rows of a succeeded query job, streamed as JSON. Send
+                   `Accept: application/x-ndjson` or
+                   `Accept: application/vnd.apache.arrow.stream` to have them
+                   streamed batch by batch.""",
+    responses={
+        200: {
+            "content": {
+                NDJSON_MEDIA_TYPE: {"schema": {"type": "string"}},
+                ARROW_STREAM_MEDIA_TYPE: {
+                    "schema": {"type": "string", "format": "binary"}
+                },
+            }
+        }
+    },
+    tags=["Query"],
+)
+async def job_result(job_id: str, request: Request):
+    job = get_job(job_id)
+    if job.status != "succeeded":
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Query job {job_id} is {job.status}, it has no result.",
+        )
+
+    media_type = accepted_media_type(
+        request, NDJSON_MEDIA_TYPE, ARROW_STREAM_MEDIA_TYPE
+    )
+    if media_type == NDJSON_MEDIA_TYPE:
+        content = iter_ndjson(job.iter_batches())
+    elif media_type == ARROW_STREAM_MEDIA_TYPE:
+        content = iter_arrow_stream(job.iter_batches(), job.schema)
+    else:
+        # Streamed too, a spilled result can be far larger than the memory
+        media_type = JSON_MEDIA_TYPE
+        content = iter_json(job.iter_batches())
+
+    return StreamingResponse(read_executor.iterate(content), media_type=media_type)
+
+
+@router.delete(
+    "/sql/jobs/{job_id}",
+    summary="Cancel a SQL query job",
+    description="""Cancel a queued or running job, or remove a finished job
+                   along with its result.""",
+    response_model=QueryJobInfo,
+    tags=["Query"],
+)
+async def cancel_job(job_id: str):
+    job = get_job(job_id)
+    query_jobs.cancel(job.id)
+    return job.info(query_jobs.ttl)
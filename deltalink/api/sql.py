@@ -1,29 +1,115 @@
+import time
+from collections.abc import Callable
 from datetime import datetime
 from io import StringIO
-from typing import Annotated
+from typing import Annotated, Any
 
 import daft
-from daft.sql import SQLCatalog
+import pyarrow as pa
 from daft.unity_catalog import UnityCatalog
-from fastapi import APIRouter, Body, Request
+from deltalake.exceptions import DeltaError
+from fastapi import APIRouter, Body, HTTPException, Request, status
 from fastapi.encoders import jsonable_encoder
-from fastapi.responses import JSONResponse
-from pydantic import BaseModel
-from sql_metadata import Parser
+from fastapi.responses import FileResponse, JSONResponse, Response, StreamingResponse
+from pydantic import BaseModel, Field
 
+from deltalink.core.admission import AdmittedResponse, admission
+from deltalink.core.arrow import (
+    ARROW_FILE_MEDIA_TYPE,
+    ARROW_STREAM_MEDIA_TYPE,
+    NDJSON_MEDIA_TYPE,
+    PARQUET_MEDIA_TYPE,
+    accepted_media_type,
+    iter_arrow_stream,
+    iter_ndjson,
+)
 from deltalink.core.auth import get_auth
-from deltalink.core.util import table_config
+from deltalink.core.config import settings
+from deltalink.core.executor import read_executor
+from deltalink.core.metrics import metered, record_rows, span
+from deltalink.core.paging import PageCursor, query_digest, read_page
+from deltalink.core.plan_cache import plan_cache
+from deltalink.core.pruning import collect_scan_reports
+from deltalink.core.result_cache import CachedResult, result_cache
+from deltalink.core.runners import query_runner
+from deltalink.core.spill import SpilledResult, SpillQuotaExceeded, result_spill
+from deltalink.core.util import ResolvedTable, pinned_versions, resolve_tables
 from deltalink.dependencies import get_unity
 
 router = APIRouter()
 auth = get_auth()
 
 
-class Query(BaseModel):
+class PinnedQuery(BaseModel):
     query: str
+    versions: dict[str, Annotated[int, Field(ge=0)]] | None = None
+    timestamp: datetime | None = None
 
 
-@router.post("/sql/query", tags=["Query"])
+class Query(PinnedQuery):
+    include_plan: bool = False
+    page_size: int | None = Field(default=None, gt=0, le=settings.SQL_MAX_PAGE_SIZE)
+    cursor: str | None = None
+
+
+def explain_plan(df: daft.DataFrame) -> str:
+    """
+    Optimized logical plan and physical plan of a DataFrame, as text.
+    """
+
+    plan_io = StringIO()
+    df.explain(True, file=plan_io)
+    return plan_io.getvalue()
+
+
+def table_timings(timings: dict[str, float]) -> str:
+    """
+    Time spent resolving each table of the query, as a header value.
+    """
+
+    return ", ".join(f"{name}={elapsed:.6f}" for name, elapsed in timings.items())
+
+
+def table_versions(tables: list[ResolvedTable]) -> str:
+    """
+    Version of each table the query read, as a header value.
+    """
+
+    return ", ".join(f"{table.name}={table.version}" for table in tables)
+
+
+@router.post(
+    "/sql/query",
+    summary="Run a SQL query over Unity Catalog tables",
+    description="""Run a SQL query and return the rows as JSON, with the query
+                   plan when `include_plan` is set.
+                   Send `Accept: application/x-ndjson` or
+                   `Accept: application/vnd.apache.arrow.stream` to have the rows
+                   streamed batch by batch while the query runs.
+                   Set `page_size` to get the rows one page at a time, each page
+                   comes with a `next_cursor` to send back for the next one, until
+                   it is null. Later pages read the table versions of the first.
+                   A JSON result larger than the spill threshold is written to a
+                   Parquet or Arrow file instead: `data` is null and `result`
+                   holds the row count and the `url` to download it from.
+                   Set `versions` to read tables at a version, by full name, or
+                   `timestamp` to read them as of a time. The versions read are
+                   sent in the `X-Table-Versions` header.
+                   Results are cached until one of the tables gets a new commit,
+                   the `X-Cache` header tells whether the cache was used.
+                   Send `Cache-Control: no-cache` to run the query anyway.""",
+    responses={
+        200: {
+            "content": {
+                NDJSON_MEDIA_TYPE: {"schema": {"type": "string"}},
+                ARROW_STREAM_MEDIA_TYPE: {
+                    "schema": {"type": "string", "format": "binary"}
+                },
+            }
+        }
+    },
+    tags=["Query"],
+)
 async def send_query(
     query: Annotated[
         Query,
@@ -46,22 +132,367 @@ async def send_query(
     #     token.access_token, ["https://azuredatabricks.net//user_impersonation"]
     # )
     start = datetime.now()
-    parser = Parser(query.query)
-    tables = parser.tables
     q = query.query
 
+    page_size = query.page_size
+    offset, versions = 0, None
+    if query.cursor is not None:
+        try:
+            cursor = PageCursor.decode(query.cursor, q)
+        except ValueError as e:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST, detail=str(e)
+            ) from e
+        offset, versions = cursor.offset, cursor.versions
+        page_size = page_size or cursor.page_size
+
     uc_catalog: UnityCatalog = await get_unity()
-    catalog_config = table_config(uc_catalog, tables)
-    sql_catalog = SQLCatalog(catalog_config)
 
-    df = daft.sql(q, catalog=sql_catalog)
-    plan_io = StringIO()
-    df.explain(True, file=plan_io)
+    # Seconds spent parsing and planning the query
+    planning = 0.0
+
+    def resolve() -> list[ResolvedTable]:
+        nonlocal planning
+        started = time.perf_counter()
+        with span("plan"):
+            names = plan_cache.tables(q)
+        planning += time.perf_counter() - started
+        if versions is not None:
+            return resolve_tables(uc_catalog, names, versions)
+        return resolve_tables(
+            uc_catalog, names, pinned_versions(names, query.versions, query.timestamp)
+        )
+
+    def plan() -> daft.DataFrame:
+        nonlocal planning
+        started = time.perf_counter()
+        with span("plan"):
+            df = plan_cache.plan(q, tables)
+        planning += time.perf_counter() - started
+        return df
+
+    try:
+        tables = await read_executor.run(resolve)
+    except (ValueError, DeltaError) as e:
+        if versions is not None:
+            # The cursor is stale, its versions were cleaned from the table log
+            raise HTTPException(
+                status_code=status.HTTP_410_GONE,
+                detail=f"The table versions of the cursor can't be read: {e!s}",
+            ) from e
+        if query.versions or query.timestamp is not None:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"The tables can't be read at the requested versions: {e!s}",
+            ) from e
+        raise
+
+    # Any new commit to one of the tables changes the key
+    cache_key = result_cache.key(q, {table.name: table.version for table in tables})
+    cached = None
+    if settings.RESULT_CACHE_ENABLED and "no-cache" not in request.headers.get(
+        "cache-control", ""
+    ):
+        cached = result_cache.get(cache_key)
+
+    def response_headers(hit: bool) -> dict[str, str]:
+        return {
+            "X-Processing-Time": str((datetime.now() - start).total_seconds()),
+            "X-Planning-Time": f"{planning:.6f}",
+            "X-Table-Timings": table_timings(
+                {table.name: table.elapsed for table in tables}
+            ),
+            "X-Table-Versions": table_versions(tables),
+            "X-Cache": "HIT" if hit else "MISS",
+        }
+
+    media_type = accepted_media_type(
+        request, NDJSON_MEDIA_TYPE, ARROW_STREAM_MEDIA_TYPE
+    )
+
+    # Results cached from a stream or without the plan are run again
+    hit = cached is not None and (
+        media_type is not None or not query.include_plan or cached.plan is not None
+    )
+
+    # The filters are only known once daft plans the scans, the versions
+    # read bound them. Cached results and pages only count in the concurrency
+    cost = 0
+    if not hit and page_size is None:
+        cost = admission.scan_cost(sum(table.size_bytes for table in tables))
+
+    async with admission.admit("query", cost) as ticket:
+        if page_size is not None:
+            return await send_page(
+                q,
+                tables,
+                cached,
+                plan,
+                offset,
+                page_size,
+                query.include_plan,
+                media_type,
+                response_headers,
+            )
+
+        if media_type is not None:
+            if cached is not None:
+                result = await read_executor.run(cached.load)
+                batches = iter(result.to_batches())
+                schema = result.schema
+            else:
+                # Only one partition is buffered ahead of the client
+                schema, batches = await read_executor.run(
+                    query_runner.run, q, tables, plan
+                )
+                batches = metered(batches, "query")
+                if settings.RESULT_CACHE_ENABLED:
+                    batches = result_cache.tee(cache_key, batches)
+
+            if media_type == NDJSON_MEDIA_TYPE:
+                content = iter_ndjson(batches)
+            else:
+                content = iter_arrow_stream(batches, schema)
+
+            return AdmittedResponse(
+                ticket,
+                read_executor.iterate(content),
+                media_type=media_type,
+                headers=response_headers(cached is not None),
+            )
+
+        def collect() -> tuple[dict[str, Any], SpilledResult | None]:
+            if hit:
+                cached_result, plan_text = cached.load(), cached.plan
+                result = result_spill.collect(
+                    cached_result.schema, cached_result.to_batches()
+                )
+            else:
+                plan_text = None
+                if query.include_plan:
+                    df = plan()
+                    with span("plan"):
+                        plan_text = explain_plan(df)
+                schema, batches = query_runner.run(q, tables, plan)
+                with span("execute"):
+                    result = result_spill.collect(schema, batches)
+                if settings.RESULT_CACHE_ENABLED and isinstance(result, pa.Table):
+                    result_cache.put(cache_key, result, plan_text)
+
+            # Too large to be sent as JSON, the client downloads the file
+            if isinstance(result, SpilledResult):
+                record_rows("query", result.rows, result.nbytes)
+                content = {"data": None, "result": result.info()}
+                if query.include_plan:
+                    content["plan"] = plan_text
+                return jsonable_encoder(content), result
+
+            record_rows("query", result.num_rows, result.nbytes)
+            with span("serialize"):
+                content = {"data": result.to_pylist()}
+                if query.include_plan:
+                    content["plan"] = plan_text
+                return jsonable_encoder(content), None
+
+        try:
+            content, spilled = await read_executor.run(collect)
+        except SpillQuotaExceeded as e:
+            raise HTTPException(
+                status_code=status.HTTP_507_INSUFFICIENT_STORAGE, detail=str(e)
+            ) from e
 
-    content = {"data": df.to_pylist(), "plan": plan_io.getvalue()}
-    headers = {"X-Processing-Time": str((datetime.now() - start).total_seconds())}
+        headers = response_headers(hit)
+        if spilled is not None:
+            url = str(request.url_for("download_result", result_id=spilled.id))
+            content["result"]["url"] = url
+            headers["Location"] = url
+        return JSONResponse(content=content, headers=headers)
+
+
+async def send_page(
+    q: str,
+    tables: list[ResolvedTable],
+    cached: CachedResult | None,
+    plan: Callable[[], daft.DataFrame],
+    offset: int,
+    page_size: int,
+    include_plan: bool,
+    media_type: str | None,
+    response_headers: Callable[[bool], dict[str, str]],
+):
+    """
+    One page of the result of a query. The limit is pushed into the plan,
+    and only the rows of the page are kept while the earlier ones are skipped.
+    """
+
+    def fetch() -> tuple[pa.Table, str | None, str | None]:
+        plan_text = None
+        if cached is not None:
+            result = cached.load()
+            schema = result.schema
+            batches = result.slice(offset, page_size + 1).to_batches()
+            offset_in_batches = 0
+        else:
+            # One more row tells whether there is a next page
+            df = plan().limit(offset + page_size + 1)
+            if include_plan:
+                with span("plan"):
+                    plan_text = explain_plan(df)
+            schema = df.schema().to_pyarrow_schema()
+            batches = df.to_arrow_iter(results_buffer_size=1)
+            offset_in_batches = offset
+
+        with span("execute"):
+            page, more = read_page(batches, offset_in_batches, page_size)
+            table = pa.Table.from_batches(page, schema)
+        record_rows("query", table.num_rows, table.nbytes)
+
+        next_cursor = None
+        if more:
+            next_cursor = PageCursor(
+                query_digest(q),
+                offset + table.num_rows,
+                page_size,
+                [table.version for table in tables],
+            ).encode()
+        return table, next_cursor, plan_text
+
+    table, next_cursor, plan_text = await read_executor.run(fetch)
+
+    headers = response_headers(cached is not None)
+    if next_cursor is not None:
+        headers["X-Next-Cursor"] = next_cursor
+
+    if media_type is not None:
+        batches = iter(table.to_batches())
+        if media_type == NDJSON_MEDIA_TYPE:
+            content = iter_ndjson(batches)
+        else:
+            content = iter_arrow_stream(batches, table.schema)
+        return StreamingResponse(content, media_type=media_type, headers=headers)
+
+    with span("serialize"):
+        content = {"data": table.to_pylist(), "next_cursor": next_cursor}
+        if include_plan:
+            content["plan"] = plan_text
+        content = jsonable_encoder(content)
+    return JSONResponse(content=content, headers=headers)
+
+
+@router.post(
+    "/sql/explain",
+    summary="Explain a SQL query over Unity Catalog tables",
+    description="""Plan a SQL query without running it. Return the plan and,
+                   for each Delta table scanned, the files and bytes left to read
+                   after the partition filters and the file statistics.
+                   `versions` and `timestamp` pin the tables like /sql/query.""",
+    tags=["Query"],
+)
+async def explain_query(
+    query: Annotated[
+        PinnedQuery,
+        Body(examples=[{"query": "select * from main.bakehouse.sales_suppliers"}]),
+    ],
+    # user: UserInfo = Depends(auth.scheme),
+):
+    start = datetime.now()
+    q = query.query
+
+    uc_catalog: UnityCatalog = await get_unity()
+
+    def resolve() -> list[ResolvedTable]:
+        names = plan_cache.tables(q)
+        return resolve_tables(
+            uc_catalog, names, pinned_versions(names, query.versions, query.timestamp)
+        )
+
+    try:
+        tables = await read_executor.run(resolve)
+    except (ValueError, DeltaError) as e:
+        if query.versions or query.timestamp is not None:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"The tables can't be read at the requested versions: {e!s}",
+            ) from e
+        raise
+
+    def explain() -> dict[str, Any]:
+        df = plan_cache.plan(q, tables)
+
+        # Scans are planned along with the physical plan
+        with collect_scan_reports() as reports, span("plan"):
+            plan_text = explain_plan(df)
+
+        scans = [report._asdict() for report in reports]
+        return {"plan": plan_text, "scans": scans}
+
+    content = await read_executor.run(explain)
 
     return JSONResponse(
         content=jsonable_encoder(content),
-        headers=headers,
+        headers={
+            "X-Processing-Time": str((datetime.now() - start).total_seconds()),
+            "X-Table-Versions": table_versions(tables),
+        },
+    )
+
+
+def get_spilled_result(result_id: str) -> SpilledResult:
+    result = result_spill.get(result_id)
+    if result is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Query result {result_id} not found, it may have expired.",
+        )
+    return result
+
+
+@router.get(
+    "/sql/results/{result_id}",
+    summary="Download a spilled query result",
+    description="""Download the file of a query result too large to be sent as
+                   JSON, as Parquet or as an Arrow IPC file. Send a `Range`
+                   header to download part of it, or to resume an interrupted
+                   download. The result is removed after a while without
+                   downloads. It is kept by the worker that ran the query,
+                   behind several workers the downloads need sticky sessions.""",
+    responses={
+        200: {
+            "content": {
+                PARQUET_MEDIA_TYPE: {"schema": {"type": "string", "format": "binary"}},
+                ARROW_FILE_MEDIA_TYPE: {
+                    "schema": {"type": "string", "format": "binary"}
+                },
+            }
+        },
+        206: {"description": "The requested range of the file."},
+        404: {"description": "The result doesn't exist or has expired."},
+    },
+    response_class=FileResponse,
+    tags=["Query"],
+)
+async def download_result(result_id: str):
+    result = get_spilled_result(result_id)
+    # Sent from the file by the server, with the ranges handled by Starlette
+    return FileResponse(
+        result.path,
+        media_type=result.media_type,
+        filename=result.filename,
+        headers={"X-Result-Rows": str(result.rows)},
     )
+
+
+@router.delete(
+    "/sql/results/{result_id}",
+    summary="Remove a spilled query result",
+    description="Remove the file of a query result once it is downloaded.",
+    status_code=status.HTTP_204_NO_CONTENT,
+    tags=["Query"],
+)
+async def delete_result(result_id: str) -> Response:
+    if not result_spill.delete(result_id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Query result {result_id} not found, it may have expired.",
+        )
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
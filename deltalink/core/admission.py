@@ -0,0 +1,252 @@
+import asyncio
+import threading
+from collections import deque
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from typing import Any, Literal
+
+from fastapi import HTTPException, Request, status
+from fastapi.responses import StreamingResponse
+from starlette.types import Receive, Scope, Send
+
+from deltalink.core.config import settings
+from deltalink.core.metrics import admission_rejections_total
+
+Endpoint = Literal["query", "read", "write"]
+
+
+class Ticket:
+    """
+    The memory and the slot of an admitted request, until it is released.
+    """
+
+    def __init__(self, controller: "AdmissionController", endpoint: str, cost: int):
+        self.controller = controller
+        self.endpoint = endpoint
+        self.cost = cost
+        self.released = False
+        self.transferred = False
+
+    def release(self) -> None:
+        if not self.released:
+            self.released = True
+            self.controller._release(self)
+
+
+class AdmittedResponse(StreamingResponse):
+    """
+    A streamed response holding the ticket of its request until it is sent.
+    The ticket is released when the response ends, or when the client goes
+    away, even before the stream was started.
+    """
+
+    def __init__(self, ticket: Ticket, *args: Any, **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        self.ticket = ticket
+        ticket.transferred = True
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            self.ticket.release()
+
+
+class _Waiter:
+    def __init__(self, cost: int, future: asyncio.Future):
+        self.cost = cost
+        self.future = future
+
+
+class AdmissionController:
+    """
+    Admit the queries, reads and writes within a global memory budget and a
+    number of requests running at once per endpoint. The memory of a request
+    is estimated before it runs: from the Delta log for the files a scan
+    reads after pruning, from the body size for a write.
+
+    A request that doesn't fit waits in the queue of its endpoint, in order,
+    up to the queue timeout, then it is rejected with 429 and Retry-After.
+    A request larger than the whole budget runs alone.
+    """
+
+    def __init__(
+        self,
+        enabled: bool,
+        memory_bytes: int,
+        concurrency: dict[str, int],
+        queue_timeout: float,
+        max_queued: int,
+        retry_after: int,
+        scan_factor: float,
+        body_factor: float,
+    ):
+        self.enabled = enabled
+        self.memory_bytes = memory_bytes
+        self.concurrency = concurrency
+        self.queue_timeout = queue_timeout
+        self.max_queued = max_queued
+        self.retry_after = retry_after
+        self.scan_factor = scan_factor
+        self.body_factor = body_factor
+
+        self._lock = threading.Lock()
+        self._used = 0
+        self._running = dict.fromkeys(concurrency, 0)
+        self._queues: dict[str, deque[_Waiter]] = {e: deque() for e in concurrency}
+
+        self._admitted = dict.fromkeys(concurrency, 0)
+        self._queued = dict.fromkeys(concurrency, 0)
+        self._rejected = dict.fromkeys(concurrency, 0)
+
+    def scan_cost(self, scanned_bytes: int) -> int:
+        """
+        Memory a scan is expected to use, from the Parquet bytes it reads.
+        """
+
+        return int(scanned_bytes * self.scan_factor)
+
+    def body_cost(self, request: Request) -> int:
+        """
+        Memory a write is expected to use, from the size of its body.
+        A body sent without Content-Length only counts in the concurrency.
+        """
+
+        try:
+            length = int(request.headers.get("content-length", 0))
+        except ValueError:
+            length = 0
+        return int(length * self.body_factor)
+
+    def _fits(self, endpoint: str, cost: int) -> bool:
+        if self._running[endpoint] >= self.concurrency[endpoint]:
+            return False
+        return self._used == 0 or self._used + cost <= self.memory_bytes
+
+    def _take(self, endpoint: str, cost: int) -> Ticket:
+        self._used += cost
+        self._running[endpoint] += 1
+        self._admitted[endpoint] += 1
+        return Ticket(self, endpoint, cost)
+
+    def _reject(self, endpoint: str, reason: str) -> HTTPException:
+        with self._lock:
+            self._rejected[endpoint] += 1
+        admission_rejections_total.labels(endpoint=endpoint, reason=reason).inc()
+        return HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=f"Too many {endpoint} requests running, retry later",
+            headers={"Retry-After": str(self.retry_after)},
+        )
+
+    async def acquire(self, endpoint: Endpoint, cost: int) -> Ticket:
+        """
+        Wait for the request to fit in the limits, or raise a 429 error.
+        """
+
+        if not self.enabled:
+            return Ticket(self, endpoint, 0)
+        cost = min(max(cost, 0), self.memory_bytes)
+
+        with self._lock:
+            queue = self._queues[endpoint]
+            if not queue and self._fits(endpoint, cost):
+                return self._take(endpoint, cost)
+            if self.queue_timeout <= 0 or len(queue) >= self.max_queued:
+                full = True
+            else:
+                full = False
+                waiter = _Waiter(cost, asyncio.get_running_loop().create_future())
+                queue.append(waiter)
+                self._queued[endpoint] += 1
+        if full:
+            raise self._reject(endpoint, "queue_full")
+
+        try:
+            return await asyncio.wait_for(waiter.future, self.queue_timeout)
+        except TimeoutError:
+            with self._lock:
+                if waiter in queue:
+                    queue.remove(waiter)
+            raise self._reject(endpoint, "timeout") from None
+
+    @asynccontextmanager
+    async def admit(self, endpoint: Endpoint, cost: int) -> AsyncIterator[Ticket]:
+        """
+        Hold a ticket while the block runs, unless an AdmittedResponse
+        streams the result afterwards.
+        """
+
+        ticket = await self.acquire(endpoint, cost)
+        try:
+            yield ticket
+        finally:
+            if not ticket.transferred:
+                ticket.release()
+
+    def _release(self, ticket: Ticket) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            self._used -= ticket.cost
+            self._running[ticket.endpoint] -= 1
+            self._wake()
+
+    def _wake(self) -> None:
+        for endpoint, queue in self._queues.items():
+            while queue:
+                waiter = queue[0]
+                if waiter.future.done():
+                    # Timed out or cancelled while waiting
+                    queue.popleft()
+                    continue
+                if not self._fits(endpoint, waiter.cost):
+                    break
+                queue.popleft()
+                ticket = self._take(endpoint, waiter.cost)
+                waiter.future.get_loop().call_soon_threadsafe(
+                    self._grant, waiter.future, ticket
+                )
+
+    @staticmethod
+    def _grant(future: asyncio.Future, ticket: Ticket) -> None:
+        if future.done():
+            # The waiter gave up meanwhile, its slot is given back
+            ticket.release()
+        else:
+            future.set_result(ticket)
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "memory_bytes": self.memory_bytes,
+                "used_bytes": self._used,
+                "endpoints": {
+                    endpoint: {
+                        "concurrency": self.concurrency[endpoint],
+                        "running": self._running[endpoint],
+                        "waiting": len(self._queues[endpoint]),
+                        "admitted": self._admitted[endpoint],
+                        "queued": self._queued[endpoint],
+                        "rejected": self._rejected[endpoint],
+                    }
+                    for endpoint in self.concurrency
+                },
+            }
+
+
+admission = AdmissionController(
+    enabled=settings.ADMISSION_ENABLED,
+    memory_bytes=settings.ADMISSION_MEMORY_BYTES,
+    concurrency={
+        "query": settings.ADMISSION_QUERY_CONCURRENCY,
+        "read": settings.ADMISSION_READ_CONCURRENCY,
+        "write": settings.ADMISSION_WRITE_CONCURRENCY,
+    },
+    queue_timeout=settings.ADMISSION_QUEUE_TIMEOUT_SECONDS,
+    max_queued=settings.ADMISSION_MAX_QUEUED,
+    retry_after=settings.ADMISSION_RETRY_AFTER_SECONDS,
+    scan_factor=settings.ADMISSION_SCAN_MEMORY_FACTOR,
+    body_factor=settings.ADMISSION_BODY_MEMORY_FACTOR,
+)
@@ -0,0 +1,235 @@
+import io
+import json
+import tempfile
+from collections.abc import Iterable, Iterator
+from typing import Any, TypeVar, get_args, get_origin
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from fastapi import HTTPException, Request, status
+from fastapi.encoders import jsonable_encoder
+from fastapi.exceptions import RequestValidationError
+from pydantic import BaseModel, ValidationError
+
+from deltalink.core.executor import read_executor
+
+JSON_MEDIA_TYPE = "application/json"
+ARROW_STREAM_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+ARROW_FILE_MEDIA_TYPE = "application/vnd.apache.arrow.file"
+PARQUET_MEDIA_TYPE = "application/x-parquet"
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+BINARY_MEDIA_TYPES = (ARROW_STREAM_MEDIA_TYPE, PARQUET_MEDIA_TYPE)
+# Request bodies are written to their spool file by chunks of this size
+SPOOL_CHUNK_BYTES = 1024 * 1024
+
+M = TypeVar("M", bound=BaseModel)
+
+
+def request_media_type(request: Request) -> str:
+    """
+    Return the media type of the request body, without parameters.
+    A missing Content-Type is treated as JSON, like FastAPI does.
+    """
+
+    content_type = request.headers.get("content-type") or JSON_MEDIA_TYPE
+    return content_type.split(";")[0].strip().lower()
+
+
+def accepted_media_type(request: Request, *media_types: str) -> str | None:
+    """
+    Return the first of the given media types listed in the Accept header.
+    """
+
+    accept = request.headers.get("accept", "")
+    accepted = {value.split(";")[0].strip().lower() for value in accept.split(",")}
+    return next((m for m in media_types if m in accepted), None)
+
+
+def read_arrow_table(body: bytes | pa.NativeFile, media_type: str) -> pa.Table:
+    """
+    Decode an Arrow IPC stream or a Parquet file into an Arrow table.
+    The record batches reference the request buffer, or the mapped file,
+    nothing is copied.
+    """
+
+    source = body if isinstance(body, pa.NativeFile) else pa.py_buffer(body)
+    if media_type == PARQUET_MEDIA_TYPE:
+        if not isinstance(source, pa.NativeFile):
+            source = pa.BufferReader(source)
+        return pq.read_table(source)
+
+    with pa.ipc.open_stream(source) as reader:
+        return reader.read_all()
+
+
+async def spool_body(request: Request) -> pa.MemoryMappedFile:
+    """
+    Write the request body to a temporary file as it is received and map it,
+    so a large body is paged from disk instead of being held in memory.
+    The file is removed right away, its space is freed once the map is closed.
+    The writes run in the read executor, by chunks of SPOOL_CHUNK_BYTES.
+    """
+
+    chunks: list[bytes] = []
+    pending = 0
+    with tempfile.NamedTemporaryFile(prefix="deltalink-body-") as spool:
+        async for chunk in request.stream():
+            chunks.append(chunk)
+            pending += len(chunk)
+            if pending >= SPOOL_CHUNK_BYTES:
+                await read_executor.run(spool.writelines, chunks)
+                chunks, pending = [], 0
+        await read_executor.run(spool.writelines, chunks)
+        await read_executor.run(spool.flush)
+        return await read_executor.run(pa.memory_map, spool.name)
+
+
+def _query_fields(request: Request, model: type[BaseModel]) -> dict[str, Any]:
+    """
+    Collect the fields of the model, except the values, from the query string.
+    List fields are repeated parameters, dict fields are JSON encoded.
+    """
+
+    fields: dict[str, Any] = {"values": []}
+    for name, field in model.model_fields.items():
+        params = request.query_params.getlist(name)
+        if name == "values" or not params:
+            continue
+
+        annotations = (field.annotation, *get_args(field.annotation))
+        kinds = {get_origin(a) or a for a in annotations}
+        if list in kinds:
+            fields[name] = params
+        elif dict in kinds:
+            fields[name] = json.loads(params[0])
+        else:
+            fields[name] = params[0]
+
+    return fields
+
+
+async def read_table_payload(
+    request: Request, model: type[M], spool: bool = False
+) -> tuple[M, pd.DataFrame | pa.Table]:
+    """
+    Read a data request either as a JSON document holding the rows in `values`,
+    or as an Arrow IPC stream / Parquet body with the table coordinates in the
+    query string. Binary bodies are returned as an Arrow table, without any
+    pandas conversion, and are spooled to disk first when asked to.
+    """
+
+    media_type = request_media_type(request)
+    if spool and media_type in BINARY_MEDIA_TYPES:
+        body = await spool_body(request)
+    else:
+        body = await request.body()
+
+    def decode() -> tuple[M, pd.DataFrame | pa.Table]:
+        if media_type in BINARY_MEDIA_TYPES:
+            payload = model.model_validate(_query_fields(request, model))
+            return payload, read_arrow_table(body, media_type)
+
+        payload = model.model_validate_json(body)
+        return payload, pd.DataFrame(payload.values)
+
+    try:
+        # Decoding a large body would hold the event loop for as long
+        return await read_executor.run(decode)
+    except ValidationError as e:
+        raise RequestValidationError(e.errors(include_url=False)) from e
+    except (pa.ArrowInvalid, ValueError) as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unable to decode the {media_type} body: {e!s}",
+        ) from e
+
+
+def table_request_body(model: type[BaseModel]) -> dict[str, Any]:
+    """
+    OpenAPI description of a body read with `read_table_payload`.
+    """
+
+    schema = model.model_json_schema()
+    binary = {"schema": {"type": "string", "format": "binary"}}
+
+    return {
+        "parameters": [
+            {
+                "name": name,
+                "in": "query",
+                "required": False,
+                "description": f"Only used with {' or '.join(BINARY_MEDIA_TYPES)}.",
+                "schema": field,
+            }
+            for name, field in schema["properties"].items()
+            if name != "values"
+        ],
+        "requestBody": {
+            "required": True,
+            "content": {
+                JSON_MEDIA_TYPE: {"schema": schema},
+                **dict.fromkeys(BINARY_MEDIA_TYPES, binary),
+            },
+        },
+    }
+
+
+def iter_ndjson(batches: Iterable[pa.RecordBatch]) -> Iterator[bytes]:
+    """
+    Encode record batches as newline delimited JSON, one chunk per batch.
+    """
+
+    for batch in batches:
+        rows = jsonable_encoder(batch.to_pylist())
+        if rows:
+            yield "".join(json.dumps(row) + "\n" for row in rows).encode()
+
+
+def iter_json(batches: Iterable[pa.RecordBatch], key: str = "data") -> Iterator[bytes]:
+    """
+    Encode record batches as a JSON object holding the rows in an array,
+    one chunk per batch, so the whole result is never held in memory.
+    """
+
+    separator = ""
+    yield f'{{"{key}": ['.encode()
+    for batch in batches:
+        rows = jsonable_encoder(batch.to_pylist())
+        if rows:
+            yield (separator + ", ".join(json.dumps(row) for row in rows)).encode()
+            separator = ", "
+    yield b"]}"
+
+
+def iter_arrow_stream(
+    batches: Iterable[pa.RecordBatch], schema: pa.Schema
+) -> Iterator[bytes]:
+    """
+    Encode record batches as an Arrow IPC stream, one chunk per batch.
+    The stream schema is taken from the first batch, so it matches what
+    the engine really produced, or the given schema for an empty result.
+    """
+
+    sink = io.BytesIO()
+    writer: pa.ipc.RecordBatchStreamWriter | None = None
+
+    def flush() -> bytes:
+        chunk = sink.getvalue()
+        sink.seek(0)
+        sink.truncate()
+        return chunk
+
+    for batch in batches:
+        if writer is None:
+            schema = batch.schema
+            writer = pa.ipc.new_stream(sink, schema)
+        if not batch.schema.equals(schema):
+            batch = batch.cast(schema)
+        writer.write_batch(batch)
+        yield flush()
+
+    if writer is None:
+        writer = pa.ipc.new_stream(sink, schema)
+    writer.close()
+    yield flush()
@@ -0,0 +1,105 @@
+import threading
+import time
+from collections.abc import Callable
+from concurrent.futures import Future
+from typing import Any, TypeVar
+
+from fastapi.logger import logger
+
+from deltalink.core.config import settings
+
+T = TypeVar("T")
+
+CacheKey = tuple[str, ...]
+
+
+class CatalogMetadataCache:
+    """
+    Cache of the Unity Catalog metadata: the catalogs, the schemas of a
+    catalog, the tables of a schema and the information of a table.
+    Entries expire after the TTL, and the writes going through this service
+    invalidate what they change. Concurrent misses of a key share one call.
+    """
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._entries: dict[CacheKey, tuple[float, Any]] = {}
+        self._inflight: dict[CacheKey, Future] = {}
+        self._lock = threading.Lock()
+
+        self._hits = 0
+        self._misses = 0
+        self._coalesced = 0
+        self._invalidations = 0
+
+    def get(self, key: CacheKey, load: Callable[[], T]) -> T:
+        """
+        The cached value of the key, or the value loaded by `load`.
+        """
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self._hits += 1
+                return entry[1]
+            self._misses += 1
+
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = self._inflight[key] = Future()
+            else:
+                self._coalesced += 1
+
+        if not leader:
+            return future.result()
+
+        try:
+            logger.debug(f"Loading catalog metadata {'.'.join(key)}")
+            value = load()
+            with self._lock:
+                if self.ttl > 0 and self._inflight.get(key) is future:
+                    self._entries[key] = (time.monotonic() + self.ttl, value)
+            future.set_result(value)
+            return value
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                if self._inflight.get(key) is future:
+                    del self._inflight[key]
+
+    def invalidate(self, *prefix: str) -> None:
+        """
+        Drop the entries whose key starts with the prefix, a load still
+        running for one of them is not cached either.
+        """
+
+        with self._lock:
+            for key in list(self._entries):
+                if key[: len(prefix)] == prefix:
+                    del self._entries[key]
+            for key in list(self._inflight):
+                if key[: len(prefix)] == prefix:
+                    del self._inflight[key]
+            self._invalidations += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._inflight.clear()
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "ttl_seconds": self.ttl,
+                "entries": len(self._entries),
+                "hits": self._hits,
+                "misses": self._misses,
+                "coalesced": self._coalesced,
+                "invalidations": self._invalidations,
+            }
+
+
+catalog_cache = CatalogMetadataCache(ttl=settings.CATALOG_CACHE_TTL_SECONDS)
@@ -0,0 +1,185 @@
+import asyncio
+import time
+from typing import Any
+
+import pandas as pd
+import pyarrow as pa
+from deltalake import write_deltalake
+from fastapi.logger import logger
+
+from deltalink.core.config import settings
+from deltalink.core.executor import write_executor
+from deltalink.core.metrics import delta_commits_total
+
+
+class _AppendBuffer:
+    """
+    Appends waiting to be committed together to the same table.
+    """
+
+    def __init__(self, table_uri: str, partition_by: list[str] | None, table_name: str):
+        self.table_uri = table_uri
+        self.table_name = table_name
+        self.partition_by = partition_by
+        self.storage_options: dict[str, str] = {}
+        self.tables: list[pa.Table] = []
+        self.futures: list[asyncio.Future] = []
+        self.rows = 0
+        self.nbytes = 0
+        self.timer: asyncio.TimerHandle | None = None
+
+
+class AppendCoalescer:
+    """
+    Group commit of the appends to a Delta table.
+    The appends received for a table during the window, or until the size
+    threshold is reached, are written with a single `write_deltalake` commit.
+    Each caller waits until the commit holding its rows succeeded or failed.
+    """
+
+    def __init__(self, window_ms: int, max_rows: int, max_bytes: int):
+        self.window = window_ms / 1000
+        self.max_rows = max_rows
+        self.max_bytes = max_bytes
+        self._buffers: dict[tuple[str, tuple[str, ...]], _AppendBuffer] = {}
+        self._commits: set[asyncio.Task] = set()
+
+        self._flushes = 0
+        self._commit_count = 0
+        self._failed_commits = 0
+        self._requests = 0
+        self._rows = 0
+        self._commit_time = 0.0
+        self._max_commit_time = 0.0
+
+    async def append(
+        self,
+        table_uri: str,
+        data: pd.DataFrame | pa.Table,
+        storage_options: dict[str, str],
+        partition_by: list[str] | None = None,
+        table_name: str | None = None,
+    ) -> None:
+        if isinstance(data, pd.DataFrame):
+            data = await write_executor.run(
+                pa.Table.from_pandas, data, preserve_index=False
+            )
+
+        key = (table_uri, tuple(partition_by or ()))
+        buffer = self._buffers.get(key)
+        if buffer is None:
+            buffer = self._buffers[key] = _AppendBuffer(
+                table_uri, partition_by, table_name or table_uri
+            )
+            buffer.timer = asyncio.get_running_loop().call_later(
+                self.window, self._flush, key
+            )
+
+        future = asyncio.get_running_loop().create_future()
+        # The most recent credentials are used for the commit
+        buffer.storage_options = storage_options
+        buffer.tables.append(data)
+        buffer.futures.append(future)
+        buffer.rows += data.num_rows
+        buffer.nbytes += data.nbytes
+
+        if buffer.rows >= self.max_rows or buffer.nbytes >= self.max_bytes:
+            self._flush(key)
+
+        # A disconnected client must not cancel the commit of the others
+        await asyncio.shield(future)
+
+    def _flush(self, key: tuple[str, tuple[str, ...]]) -> None:
+        buffer = self._buffers.pop(key, None)
+        if buffer is None:
+            return
+
+        if buffer.timer is not None:
+            buffer.timer.cancel()
+
+        self._flushes += 1
+        task = asyncio.ensure_future(self._commit(buffer))
+        self._commits.add(task)
+        task.add_done_callback(self._commits.discard)
+
+    async def _commit(self, buffer: _AppendBuffer) -> None:
+        # Appends with different schemas are committed separately, so one
+        # producer sending a bad batch doesn't fail the others
+        groups: list[tuple[list[pa.Table], list[asyncio.Future]]] = []
+        for table, future in zip(buffer.tables, buffer.futures, strict=True):
+            group = next(
+                (g for g in groups if g[0][0].schema.equals(table.schema)), None
+            )
+            if group is None:
+                groups.append(([table], [future]))
+            else:
+                group[0].append(table)
+                group[1].append(future)
+
+        for tables, futures in groups:
+            start = time.perf_counter()
+            try:
+                await write_executor.run(
+                    write_deltalake,
+                    buffer.table_uri,
+                    pa.concat_tables(tables),
+                    mode="append",
+                    storage_options=buffer.storage_options,
+                    partition_by=buffer.partition_by if buffer.partition_by else None,
+                )
+            except Exception as e:
+                logger.error(f"Group commit to {buffer.table_uri} failed: {e!s}")
+                self._failed_commits += 1
+                for future in futures:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            finally:
+                elapsed = time.perf_counter() - start
+                self._commit_time += elapsed
+                self._max_commit_time = max(self._max_commit_time, elapsed)
+
+            self._commit_count += 1
+            delta_commits_total.labels(
+                table=buffer.table_name, operation="append"
+            ).inc()
+            self._requests += len(tables)
+            self._rows += sum(t.num_rows for t in tables)
+            for future in futures:
+                if not future.done():
+                    future.set_result(None)
+
+    async def close(self) -> None:
+        """
+        Commit everything still buffered, used at shutdown.
+        """
+
+        for key in list(self._buffers):
+            self._flush(key)
+        if self._commits:
+            await asyncio.gather(*self._commits, return_exceptions=True)
+
+    def stats(self) -> dict[str, Any]:
+        committed = self._commit_count or 1
+        commits = (self._commit_count + self._failed_commits) or 1
+        return {
+            "enabled": settings.COALESCE_APPENDS,
+            "pending_requests": sum(len(b.futures) for b in self._buffers.values()),
+            "pending_rows": sum(b.rows for b in self._buffers.values()),
+            "flushes": self._flushes,
+            "commits": self._commit_count,
+            "failed_commits": self._failed_commits,
+            "requests": self._requests,
+            "rows": self._rows,
+            "avg_requests_per_commit": self._requests / committed,
+            "avg_rows_per_commit": self._rows / committed,
+            "avg_commit_seconds": self._commit_time / commits,
+            "max_commit_seconds": self._max_commit_time,
+        }
+
+
+append_coalescer = AppendCoalescer(
+    window_ms=settings.COALESCE_WINDOW_MS,
+    max_rows=settings.COALESCE_MAX_ROWS,
+    max_bytes=settings.COALESCE_MAX_BYTES,
+)
@@ -35,5 +35,116 @@ class Settings(BaseSettings):
     # This is used to store the External Delta Tables in a specific location
     STORAGE_LOCATION: str | None = None
 
+    # Thread pools running the blocking Delta, daft and UC calls
+    READ_EXECUTOR_WORKERS: int = 8
+    WRITE_EXECUTOR_WORKERS: int = 4
+    MAINTENANCE_EXECUTOR_WORKERS: int = 1
+    JOB_EXECUTOR_WORKERS: int = 2
+    # UC listings of the catalog tree, a large metastore fans out widely
+    CATALOG_EXECUTOR_WORKERS: int = 2
+    # Tables of a query resolved concurrently, across all the queries
+    TABLE_RESOLUTION_WORKERS: int = 8
+
+    # Where the SQL queries run, see QueryRunner
+    QUERY_RUNNER: Literal["native", "process", "ray"] = "native"
+    QUERY_PROCESS_WORKERS: int = 2
+    # Results of the worker processes, the temporary directory when not set.
+    # A result is written whole before it is served, so the directory must
+    # hold the largest results. /dev/shm keeps them in memory, in Docker it
+    # is 64 MB unless the container runs with a larger --shm-size.
+    QUERY_RESULT_DIR: str | None = None
+
+    # Memory budget and concurrency of the requests, see AdmissionController
+    ADMISSION_ENABLED: bool = True
+    ADMISSION_MEMORY_BYTES: int = 4 * 1024 * 1024 * 1024
+    ADMISSION_QUERY_CONCURRENCY: int = 8
+    ADMISSION_READ_CONCURRENCY: int = 16
+    ADMISSION_WRITE_CONCURRENCY: int = 8
+    # Time a request waits for its turn, it is rejected right away when 0
+    ADMISSION_QUEUE_TIMEOUT_SECONDS: float = 10
+    ADMISSION_MAX_QUEUED: int = 64
+    ADMISSION_RETRY_AFTER_SECONDS: int = 5
+    # Memory per byte of Parquet scanned, and per byte of request body
+    ADMISSION_SCAN_MEMORY_FACTOR: float = 3.0
+    ADMISSION_BODY_MEMORY_FACTOR: float = 4.0
+
+    # Group commit of the appends to the same table, see AppendCoalescer
+    COALESCE_APPENDS: bool = False
+    COALESCE_WINDOW_MS: int = 200
+    COALESCE_MAX_ROWS: int = 1_000_000
+    COALESCE_MAX_BYTES: int = 256 * 1024 * 1024
+
+    # Writes to the same table run one at a time, see TableWriteScheduler
+    # Runs of a write whose commit conflicts with a concurrent one
+    WRITE_MAX_ATTEMPTS: int = 5
+    WRITE_RETRY_BACKOFF_MS: int = 100
+    WRITE_RETRY_MAX_BACKOFF_MS: int = 5_000
+
+    # Catalogs, schemas and tables listed from UC, see CatalogMetadataCache
+    CATALOG_CACHE_TTL_SECONDS: int = 60
+
+    # Temporary table credentials vended by UC, see CredentialManager
+    CREDENTIALS_REFRESH_AHEAD_SECONDS: int = 5 * 60
+    # Used when the expiry can't be read from the credentials
+    CREDENTIALS_DEFAULT_TTL_SECONDS: int = 60 * 60
+
+    # Query results keyed by SQL and table versions, see ResultCache
+    RESULT_CACHE_ENABLED: bool = True
+    RESULT_CACHE_MAX_BYTES: int = 256 * 1024 * 1024
+    RESULT_CACHE_MAX_ENTRY_BYTES: int = 32 * 1024 * 1024
+    # Larger results are written as Arrow files, when a directory is set
+    RESULT_CACHE_DIR: str | None = None
+    RESULT_CACHE_DISK_MAX_BYTES: int = 10 * 1024 * 1024 * 1024
+
+    # Query results too large to be sent as JSON, see ResultSpill
+    RESULT_SPILL_ENABLED: bool = True
+    RESULT_SPILL_BYTES: int = 256 * 1024 * 1024
+    RESULT_SPILL_FORMAT: Literal["parquet", "arrow"] = "parquet"
+    RESULT_SPILL_DIR: str | None = None
+    RESULT_SPILL_MAX_DISK_BYTES: int = 20 * 1024 * 1024 * 1024
+    # Counted from the last download, so an interrupted one can resume
+    RESULT_SPILL_TTL_SECONDS: int = 60 * 60
+
+    # Asynchronous query jobs, see JobManager
+    JOB_TTL_SECONDS: int = 60 * 60
+    # Results larger than this are written to disk while the job runs
+    JOB_SPILL_BYTES: int = 64 * 1024 * 1024
+    JOB_RESULT_DIR: str | None = None
+    # How often the expired jobs are removed, even when no request comes
+    JOB_SWEEP_INTERVAL_SECONDS: int = 60
+    # Jobs queued or running at once, more are rejected with 429
+    JOB_MAX_PENDING: int = 32
+    # Jobs kept along with their results, the oldest finished ones make room
+    JOB_MAX_JOBS: int = 1000
+
+    # Largest page of rows a paginated query can ask for
+    SQL_MAX_PAGE_SIZE: int = 100_000
+
+    # Parsed queries and their daft plans, see QueryPlanCache
+    PLAN_CACHE_MAX_QUERIES: int = 1024
+    PLAN_CACHE_MAX_PLANS: int = 256
+
+    # Background compaction and vacuum of the written tables, see MaintenanceScheduler
+    MAINTENANCE_ENABLED: bool = False
+    # Files smaller than this are small files
+    MAINTENANCE_SMALL_FILE_BYTES: int = 32 * 1024 * 1024
+    # Small files a partition holds before it is compacted
+    MAINTENANCE_MIN_SMALL_FILES: int = 32
+    # Size of the compacted files, the default of delta-rs when not set
+    MAINTENANCE_TARGET_FILE_BYTES: int | None = None
+    # Time between two vacuums of a table, 0 disables vacuum
+    MAINTENANCE_VACUUM_INTERVAL_SECONDS: int = 24 * 60 * 60
+    # Off-peak window in UTC, such as "22:00-06:00", any time when not set
+    MAINTENANCE_WINDOW: str | None = None
+    MAINTENANCE_MAX_CONCURRENT: int = 1
+    MAINTENANCE_CHECK_INTERVAL_SECONDS: int = 60
+
+    # Loaded Delta tables kept in memory, see DeltaTableCache
+    TABLE_CACHE_MAX_TABLES: int = 256
+    TABLE_CACHE_MAX_BYTES: int = 512 * 1024 * 1024
+    # Snapshots of past versions read with time travel, see PinnedSnapshotCache
+    PINNED_SNAPSHOT_MAX_SNAPSHOTS: int = 64
+    PINNED_SNAPSHOT_MAX_BYTES: int = 256 * 1024 * 1024
+
 
 settings = Settings()
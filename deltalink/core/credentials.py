@@ -0,0 +1,227 @@
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Literal
+from urllib.parse import parse_qs
+
+from daft.unity_catalog import UnityCatalog, UnityCatalogTable
+from fastapi.logger import logger
+
+from deltalink.core.config import settings
+
+Operation = Literal["READ", "READ_WRITE"]
+
+# Credentials are never used during their last seconds, a request could
+# still be running with them when they expire
+EXPIRY_MARGIN = 30
+
+
+def credential_expiry(uc_table: UnityCatalogTable) -> float | None:
+    """
+    Expiry of the credentials vended by UC, as a timestamp.
+    It is read from the `se` field of an Azure SAS token.
+    """
+
+    io_config = getattr(uc_table, "io_config", None)
+    if io_config is None or not io_config.azure.sas_token:
+        return None
+
+    try:
+        expiry = parse_qs(io_config.azure.sas_token.lstrip("?"))["se"][0]
+        return datetime.fromisoformat(expiry).timestamp()
+    except (KeyError, ValueError):
+        return None
+
+
+# Raised by the storage for a credential it doesn't accept anymore, such as a
+# SAS token revoked before its expiry
+ACCESS_DENIED_ERRORS = (
+    "403 Forbidden",
+    "AuthorizationFailure",
+    "AuthenticationFailed",
+    "AuthorizationPermissionMismatch",
+    "AccessDenied",
+)
+
+
+def access_denied(error: BaseException) -> bool:
+    """
+    Whether the storage denied the credential an operation ran with.
+    """
+
+    message = str(error)
+    return any(code in message for code in ACCESS_DENIED_ERRORS)
+
+
+class _Credential:
+    def __init__(
+        self, uc_table: UnityCatalogTable, expires_at: float, catalog: UnityCatalog
+    ):
+        self.uc_table = uc_table
+        self.expires_at = expires_at
+        self.catalog = catalog
+
+
+class CredentialManager:
+    """
+    Cache of the UC tables and their temporary credentials, keyed by table
+    and operation. A READ_WRITE credential can serve a READ, and is
+    preferred for it, never the other way around. Credentials are refreshed
+    in the background before they expire, and concurrent misses of a key
+    share a single UC call.
+    """
+
+    def __init__(self, refresh_ahead: float, default_ttl: float):
+        self.refresh_ahead = refresh_ahead
+        self.default_ttl = default_ttl
+        self._entries: dict[tuple[str, Operation], _Credential] = {}
+        self._inflight: dict[tuple[str, Operation], Future] = {}
+        self._refreshing: set[tuple[str, Operation]] = set()
+        self._lock = threading.Lock()
+        self._refresher: ThreadPoolExecutor | None = None
+
+        self._hits = 0
+        self._misses = 0
+        self._coalesced = 0
+        self._refreshes = 0
+        self._failures = 0
+
+    def _expires_at(self, uc_table: UnityCatalogTable) -> float:
+        expiry = credential_expiry(uc_table)
+        if expiry is None:
+            expiry = time.time() + self.default_ttl
+        return expiry - EXPIRY_MARGIN
+
+    def _load(
+        self, catalog: UnityCatalog, table: str, operation: Operation
+    ) -> _Credential:
+        key = (table, operation)
+        with self._lock:
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = self._inflight[key] = Future()
+            else:
+                self._coalesced += 1
+
+        if not leader:
+            return future.result()
+
+        try:
+            logger.debug(f"Loading credentials for {table}")
+            uc_table: UnityCatalogTable = catalog.load_table(
+                table, operation=operation, table_type="MANAGED"
+            )
+            credential = _Credential(uc_table, self._expires_at(uc_table), catalog)
+            with self._lock:
+                self._entries[key] = credential
+            future.set_result(credential)
+            return credential
+        except BaseException as e:
+            with self._lock:
+                self._failures += 1
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def _refresh(self, table: str, operation: Operation) -> None:
+        key = (table, operation)
+        try:
+            with self._lock:
+                credential = self._entries.get(key)
+            if credential is not None:
+                self._load(credential.catalog, table, operation)
+                with self._lock:
+                    self._refreshes += 1
+        except Exception as e:
+            logger.warning(f"Background refresh of {table} credentials failed: {e!s}")
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    def _schedule_refresh(self, table: str, operation: Operation) -> None:
+        """
+        Refresh a key in the background, its lock must be held.
+        """
+
+        key = (table, operation)
+        if key in self._inflight or key in self._refreshing:
+            return
+        self._refreshing.add(key)
+        if self._refresher is None:
+            self._refresher = ThreadPoolExecutor(
+                max_workers=2, thread_name_prefix="deltalink-credentials"
+            )
+        self._refresher.submit(self._refresh, table, operation)
+
+    def _cached(self, table: str, operation: Operation) -> _Credential | None:
+        """
+        A valid credential for the operation, its lock must be held.
+        """
+
+        now = time.time()
+        # Reads of a written table share the credential of its writes, so the
+        # cached Delta handle keeps the same storage options for both
+        operations: tuple[Operation, ...] = (
+            ("READ_WRITE", "READ") if operation == "READ" else ("READ_WRITE",)
+        )
+        for candidate in operations:
+            credential = self._entries.get((table, candidate))
+            if credential is None:
+                continue
+            if now >= credential.expires_at:
+                del self._entries[(table, candidate)]
+                continue
+            if now >= credential.expires_at - self.refresh_ahead:
+                self._schedule_refresh(table, candidate)
+            return credential
+
+        return None
+
+    def get(
+        self, catalog: UnityCatalog, table: str, operation: Operation = "READ"
+    ) -> UnityCatalogTable:
+        with self._lock:
+            credential = self._cached(table, operation)
+            if credential is not None:
+                self._hits += 1
+                logger.debug(f"Using cached table for {table}")
+                return credential.uc_table
+            self._misses += 1
+
+        return self._load(catalog, table, operation).uc_table
+
+    def invalidate(self, table: str) -> None:
+        """
+        Forget the credentials of a table, the next request loads new ones.
+        """
+
+        with self._lock:
+            for operation in ("READ", "READ_WRITE"):
+                self._entries.pop((table, operation), None)
+
+    def shutdown(self) -> None:
+        with self._lock:
+            refresher, self._refresher = self._refresher, None
+        if refresher is not None:
+            refresher.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "hits": self._hits,
+                "misses": self._misses,
+                "coalesced": self._coalesced,
+                "refreshes": self._refreshes,
+                "failures": self._failures,
+            }
+
+
+credentials = CredentialManager(
+    refresh_ahead=settings.CREDENTIALS_REFRESH_AHEAD_SECONDS,
+    default_ttl=settings.CREDENTIALS_DEFAULT_TTL_SECONDS,
+)
@@ -0,0 +1,133 @@
+import asyncio
+import contextvars
+import functools
+import threading
+import time
+from collections.abc import AsyncIterator, Callable, Iterator
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, TypeVar
+
+from deltalink.core.config import settings
+
+T = TypeVar("T")
+
+_DONE = object()
+
+
+class BoundedExecutor:
+    """
+    A named thread pool for blocking Delta, daft and Unity Catalog calls.
+    Handlers await `run` so the event loop keeps serving other requests,
+    and the pool size bounds how many of those calls run at once.
+    """
+
+    def __init__(self, name: str, max_workers: int):
+        self.name = name
+        self.max_workers = max_workers
+        self._pool: ThreadPoolExecutor | None = None
+        self._lock = threading.Lock()
+        self._queued = 0
+        self._running = 0
+        self._completed = 0
+        self._failed = 0
+        self._wait_time = 0.0
+        self._run_time = 0.0
+
+    def _call(self, submitted: float, func: Callable[[], T]) -> T:
+        started = time.perf_counter()
+        with self._lock:
+            self._queued -= 1
+            self._running += 1
+            self._wait_time += started - submitted
+
+        failed = False
+        try:
+            return func()
+        except BaseException:
+            failed = True
+            raise
+        finally:
+            with self._lock:
+                self._running -= 1
+                self._completed += 1
+                self._failed += failed
+                self._run_time += time.perf_counter() - started
+
+    async def run(self, func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """
+        Run the function in the pool and wait for its result.
+        The context variables of the caller are propagated, like asyncio.to_thread.
+        """
+
+        loop = asyncio.get_running_loop()
+        context = contextvars.copy_context()
+        call = functools.partial(context.run, func, *args, **kwargs)
+
+        with self._lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(
+                    max_workers=self.max_workers,
+                    thread_name_prefix=f"deltalink-{self.name}",
+                )
+            self._queued += 1
+            pool = self._pool
+        return await loop.run_in_executor(pool, self._call, time.perf_counter(), call)
+
+    async def iterate(self, iterator: Iterator[T]) -> AsyncIterator[T]:
+        """
+        Pull the items of a blocking iterator in the pool, one at a time.
+        """
+
+        while (item := await self.run(next, iterator, _DONE)) is not _DONE:
+            yield item
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "max_workers": self.max_workers,
+                "queued": self._queued,
+                "running": self._running,
+                "completed": self._completed,
+                "failed": self._failed,
+                "wait_seconds": round(self._wait_time, 6),
+                "run_seconds": round(self._run_time, 6),
+            }
+
+    def shutdown(self) -> None:
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=True, cancel_futures=True)
+
+
+# Queries, table loads and Unity Catalog lookups
+read_executor = BoundedExecutor("read", settings.READ_EXECUTOR_WORKERS)
+# Appends, merges and deletes
+write_executor = BoundedExecutor("write", settings.WRITE_EXECUTOR_WORKERS)
+# Compaction and vacuum, kept apart so they never starve the foreground traffic
+maintenance_executor = BoundedExecutor(
+    "maintenance", settings.MAINTENANCE_EXECUTOR_WORKERS
+)
+
+# Queries submitted as jobs, apart from the interactive ones
+job_executor = BoundedExecutor("jobs", settings.JOB_EXECUTOR_WORKERS)
+
+# Listings of the whole catalog tree, so they never fill the read pool
+catalog_executor = BoundedExecutor("catalog", settings.CATALOG_EXECUTOR_WORKERS)
+
+executors = (
+    read_executor,
+    write_executor,
+    maintenance_executor,
+    job_executor,
+    catalog_executor,
+)
+
+
+def executor_stats() -> dict[str, dict[str, Any]]:
+    return {executor.name: executor.stats() for executor in executors}
+
+
+def shutdown_executors() -> None:
+    for executor in executors:
+        executor.shutdown()
@@ -0,0 +1,373 @@
+import asyncio
+import tempfile
+import time
+import uuid
+from collections.abc import Iterator
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Literal
+
+import pyarrow as pa
+from daft.unity_catalog import UnityCatalog
+from fastapi.logger import logger
+
+from deltalink.core.config import settings
+from deltalink.core.executor import job_executor
+from deltalink.core.plan_cache import plan_cache
+from deltalink.core.runners import query_runner
+from deltalink.core.util import pinned_versions, resolve_tables
+
+JobStatus = Literal["queued", "running", "succeeded", "failed", "cancelled"]
+
+
+class JobCancelled(Exception):
+    pass
+
+
+class TooManyJobs(Exception):
+    pass
+
+
+class QueryJob:
+    """
+    A SQL query running in the background, and its result once finished.
+    The result is kept in memory until it grows past the spill threshold,
+    then it is written to an Arrow file as the batches are produced.
+    """
+
+    def __init__(
+        self,
+        sql: str,
+        versions: dict[str, int] | None = None,
+        timestamp: datetime | None = None,
+    ):
+        self.id = uuid.uuid4().hex
+        self.sql = sql
+        self.versions = versions
+        self.timestamp = timestamp
+        self.status: JobStatus = "queued"
+        self.phase: str | None = None
+        self.error: str | None = None
+        self.cancel_requested = False
+
+        self.submitted_at = time.time()
+        self.started_at: float | None = None
+        self.finished_at: float | None = None
+        self.timings: dict[str, float] = {}
+
+        self.rows = 0
+        self.batches = 0
+        self.nbytes = 0
+        self.schema: pa.Schema | None = None
+        self.path: Path | None = None
+        self._result: list[pa.RecordBatch] = []
+        self._sink: pa.OSFile | None = None
+        self._writer: pa.ipc.RecordBatchFileWriter | None = None
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ("succeeded", "failed", "cancelled")
+
+    def _spill(self, directory: Path) -> None:
+        directory.mkdir(parents=True, exist_ok=True)
+        self.path = directory / f"{self.id}.arrow"
+        self._sink = pa.OSFile(str(self.path), "wb")
+        self._writer = pa.ipc.new_file(self._sink, self.schema)
+        for batch in self._result:
+            self._writer.write_batch(batch)
+        self._result = []
+
+    def write(self, batch: pa.RecordBatch, spill_bytes: int, directory: Path) -> None:
+        if self.schema is None:
+            self.schema = batch.schema
+        elif not batch.schema.equals(self.schema):
+            batch = batch.cast(self.schema)
+
+        if self._writer is None and self.nbytes + batch.nbytes > spill_bytes:
+            self._spill(directory)
+        if self._writer is not None:
+            self._writer.write_batch(batch)
+        else:
+            self._result.append(batch)
+
+        self.rows += batch.num_rows
+        self.batches += 1
+        self.nbytes += batch.nbytes
+
+    def close(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+            self._sink.close()
+            self._writer = self._sink = None
+
+    def discard(self) -> None:
+        self.close()
+        self._result = []
+        if self.path is not None:
+            self.path.unlink(missing_ok=True)
+
+    def iter_batches(self) -> Iterator[pa.RecordBatch]:
+        """
+        Batches of the result, read back from disk when it was spilled.
+        """
+
+        if self.path is None:
+            yield from self._result
+            return
+
+        # Memory mapped, the file can be removed while it is being read
+        reader = pa.ipc.open_file(pa.memory_map(str(self.path)))
+        for i in range(reader.num_record_batches):
+            yield reader.get_batch(i)
+
+    def info(self, ttl: float) -> dict[str, Any]:
+        return {
+            "id": self.id,
+            "status": self.status,
+            "phase": self.phase,
+            "error": self.error,
+            "submitted_at": self.submitted_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "expires_at": self.finished_at + ttl if self.finished_at else None,
+            "rows": self.rows,
+            "batches": self.batches,
+            "bytes": self.nbytes,
+            "spilled": self.path is not None,
+            "timings": self.timings,
+        }
+
+
+class JobManager:
+    """
+    Runs SQL queries in the background on the job executor, so a client
+    can submit a long query and fetch its result later instead of holding
+    a connection open. Finished jobs, and their spilled results, are removed
+    once their TTL has passed.
+    """
+
+    def __init__(
+        self,
+        ttl: float,
+        spill_bytes: int,
+        directory: str | None = None,
+        sweep_interval: float = 60,
+        max_pending: int = 32,
+        max_jobs: int = 1000,
+    ):
+        self.ttl = ttl
+        self.spill_bytes = spill_bytes
+        self.directory = Path(directory or tempfile.gettempdir()) / "deltalink-jobs"
+        self.sweep_interval = sweep_interval
+        self.max_pending = max_pending
+        self.max_jobs = max_jobs
+        self._jobs: dict[str, QueryJob] = {}
+        self._tasks: set[asyncio.Task] = set()
+        self._sweeper: asyncio.Task | None = None
+        self._directory_ready = False
+
+        self._submitted = 0
+        self._succeeded = 0
+        self._failed = 0
+        self._cancelled = 0
+        self._expired = 0
+        self._evicted = 0
+        self._rejected = 0
+
+    def _prepare_directory(self) -> None:
+        if self._directory_ready:
+            return
+        # Results left by a previous process can't be fetched anymore
+        if self.directory.exists():
+            for stale in self.directory.glob("*.arrow"):
+                stale.unlink(missing_ok=True)
+        self._directory_ready = True
+
+    def _sweep(self) -> None:
+        now = time.time()
+        for job in list(self._jobs.values()):
+            if job.finished and job.finished_at + self.ttl <= now:
+                del self._jobs[job.id]
+                job.discard()
+                self._expired += 1
+
+    def start(self) -> None:
+        """
+        Remove the expired jobs periodically, the results of a busy server
+        would otherwise stay on disk until the next request.
+        """
+
+        if self._sweeper is None:
+            self._sweeper = asyncio.ensure_future(self._sweep_periodically())
+
+    async def _sweep_periodically(self) -> None:
+        while True:
+            await asyncio.sleep(self.sweep_interval)
+            self._sweep()
+
+    def _make_room(self) -> None:
+        """
+        Remove the oldest finished jobs past the job limit, or raise
+        TooManyJobs when the pending jobs or all the jobs are at their limit.
+        """
+
+        pending = sum(not job.finished for job in self._jobs.values())
+        if pending >= self.max_pending:
+            self._rejected += 1
+            raise TooManyJobs(f"{pending} query jobs are already pending")
+
+        # Jobs are registered in order of submission
+        for job in list(self._jobs.values()):
+            if len(self._jobs) < self.max_jobs:
+                break
+            if job.finished:
+                del self._jobs[job.id]
+                job.discard()
+                self._evicted += 1
+        if len(self._jobs) >= self.max_jobs:
+            self._rejected += 1
+            raise TooManyJobs(f"{len(self._jobs)} query jobs are already kept")
+
+    def submit(
+        self,
+        sql: str,
+        catalog: UnityCatalog,
+        versions: dict[str, int] | None = None,
+        timestamp: datetime | None = None,
+    ) -> QueryJob:
+        self._sweep()
+        self._make_room()
+        self._prepare_directory()
+
+        job = QueryJob(sql, versions, timestamp)
+        self._jobs[job.id] = job
+        self._submitted += 1
+
+        task = asyncio.ensure_future(self._run(job, catalog))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return job
+
+    def get(self, job_id: str) -> QueryJob | None:
+        self._sweep()
+        return self._jobs.get(job_id)
+
+    def cancel(self, job_id: str) -> QueryJob | None:
+        """
+        Stop a job, or forget a finished one along with its result.
+        A running query stops after the batch it is producing.
+        """
+
+        job = self._jobs.get(job_id)
+        if job is None:
+            return None
+
+        if job.finished:
+            del self._jobs[job_id]
+            job.discard()
+        else:
+            job.cancel_requested = True
+        return job
+
+    async def _run(self, job: QueryJob, catalog: UnityCatalog) -> None:
+        try:
+            await job_executor.run(self._execute, job, catalog)
+            job.status = "succeeded"
+            self._succeeded += 1
+        except JobCancelled:
+            job.status = "cancelled"
+            job.discard()
+            self._cancelled += 1
+        except Exception as e:
+            logger.error(f"Query job {job.id} failed: {e!s}")
+            job.status = "failed"
+            job.error = str(e)
+            job.discard()
+            self._failed += 1
+        finally:
+            job.phase = None
+            job.finished_at = time.time()
+            if job.started_at is not None:
+                job.timings["total"] = job.finished_at - job.started_at
+
+    def _execute(self, job: QueryJob, catalog: UnityCatalog) -> None:
+        job.started_at = time.time()
+        job.timings["queued"] = job.started_at - job.submitted_at
+        if job.cancel_requested:
+            raise JobCancelled()
+        job.status = "running"
+
+        def phase(name: str, started: float) -> float:
+            now = time.perf_counter()
+            job.timings[name] = now - started
+            return now
+
+        started = time.perf_counter()
+        job.phase = "resolving"
+        names = plan_cache.tables(job.sql)
+        pins = pinned_versions(names, job.versions, job.timestamp)
+        tables = resolve_tables(catalog, names, pins)
+        started = phase("resolve", started)
+
+        job.phase = "planning"
+        # A worker process runs the whole query before returning
+        schema, batches = query_runner.run(
+            job.sql, tables, lambda: plan_cache.plan(job.sql, tables)
+        )
+        started = phase("planning", started)
+
+        job.phase = "executing"
+        try:
+            for batch in batches:
+                if job.cancel_requested:
+                    raise JobCancelled()
+                job.write(batch, self.spill_bytes, self.directory)
+            if job.schema is None:
+                job.schema = schema
+        finally:
+            job.close()
+        phase("execution", started)
+
+    async def close(self) -> None:
+        """
+        Cancel the running jobs and remove every result, used at shutdown.
+        """
+
+        if self._sweeper is not None:
+            self._sweeper.cancel()
+            self._sweeper = None
+        for job in self._jobs.values():
+            job.cancel_requested = True
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        for job in self._jobs.values():
+            job.discard()
+        self._jobs.clear()
+
+    def stats(self) -> dict[str, Any]:
+        statuses: dict[str, int] = {}
+        for job in self._jobs.values():
+            statuses[job.status] = statuses.get(job.status, 0) + 1
+        return {
+            "jobs": statuses,
+            "spilled_bytes": sum(
+                j.nbytes for j in self._jobs.values() if j.path is not None
+            ),
+            "submitted": self._submitted,
+            "succeeded": self._succeeded,
+            "failed": self._failed,
+            "cancelled": self._cancelled,
+            "evicted": self._evicted,
+            "rejected": self._rejected,
+            "expired": self._expired,
+        }
+
+
+query_jobs = JobManager(
+    ttl=settings.JOB_TTL_SECONDS,
+    spill_bytes=settings.JOB_SPILL_BYTES,
+    directory=settings.JOB_RESULT_DIR,
+    sweep_interval=settings.JOB_SWEEP_INTERVAL_SECONDS,
+    max_pending=settings.JOB_MAX_PENDING,
+    max_jobs=settings.JOB_MAX_JOBS,
+)
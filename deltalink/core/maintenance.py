@@ -0,0 +1,350 @@
+import asyncio
+import contextlib
+import time
+from collections import Counter
+from datetime import UTC, datetime
+from datetime import time as clock
+from typing import Any
+
+import pyarrow as pa
+import pyarrow.compute as pc
+from daft.unity_catalog import UnityCatalog
+from fastapi.logger import logger
+
+from deltalink.core.config import settings
+from deltalink.core.credentials import credentials
+from deltalink.core.executor import (
+    maintenance_executor,
+    read_executor,
+    write_executor,
+)
+from deltalink.core.metrics import delta_commits_total
+from deltalink.core.tables import storage_options, table_cache
+from deltalink.core.writes import write_scheduler
+
+# Values of the partition columns, as the strings Delta stores
+Partition = tuple[tuple[str, str], ...]
+
+
+def parse_window(window: str | None) -> tuple[clock, clock] | None:
+    """
+    Read a `HH:MM-HH:MM` window, it may span midnight.
+    """
+
+    if not window:
+        return None
+    try:
+        start, end = window.split("-")
+        return clock.fromisoformat(start.strip()), clock.fromisoformat(end.strip())
+    except ValueError as e:
+        raise ValueError(f"Invalid maintenance window {window!r}") from e
+
+
+def in_window(window: tuple[clock, clock] | None, now: datetime) -> bool:
+    if window is None:
+        return True
+    start, end = window
+    current = now.time()
+    if start <= end:
+        return start <= current < end
+    return current >= start or current < end
+
+
+class _TableState:
+    def __init__(
+        self,
+        name: str,
+        table_uri: str,
+        catalog: UnityCatalog,
+        vacuum_due: float | None,
+    ):
+        self.name = name
+        self.table_uri = table_uri
+        self.catalog = catalog
+        self.dirty = False
+
+        self.files = 0
+        self.bytes = 0
+        self.small_files = 0
+        # Files added after this modification time were not inspected yet
+        self.inspected_until: int | None = None
+
+        self.compaction: set[Partition] | None = None
+        """Partitions to compact, an empty partition is the whole table."""
+
+        self.vacuum_due = vacuum_due
+        """Monotonic time of the next vacuum, None when vacuum is disabled."""
+
+        self.running = False
+
+    @property
+    def pending(self) -> bool:
+        return bool(self.compaction) or self.vacuum_pending
+
+    @property
+    def vacuum_pending(self) -> bool:
+        return self.vacuum_due is not None and time.monotonic() >= self.vacuum_due
+
+    def info(self) -> dict[str, Any]:
+        return {
+            "files": self.files,
+            "bytes": self.bytes,
+            "avg_file_bytes": self.bytes // self.files if self.files else 0,
+            "small_files": self.small_files,
+            "pending_compactions": len(self.compaction or ()),
+            "vacuum_pending": self.vacuum_pending,
+        }
+
+
+class MaintenanceScheduler:
+    """
+    Compact and vacuum the tables written through the service, in the
+    background. After a write the file sizes are read from the Delta log, and
+    the partitions it touched are compacted once they hold too many small
+    files. Vacuum runs periodically on the tables written since the start.
+    Maintenance only runs in the off-peak window, while no foreground call
+    is queued, and on a bounded number of tables at once.
+    """
+
+    def __init__(
+        self,
+        enabled: bool,
+        small_file_bytes: int,
+        min_small_files: int,
+        target_file_bytes: int | None,
+        vacuum_interval: float,
+        window: str | None,
+        max_concurrent: int,
+        check_interval: float,
+    ):
+        self.enabled = enabled
+        self.small_file_bytes = small_file_bytes
+        self.min_small_files = min_small_files
+        self.target_file_bytes = target_file_bytes
+        self.vacuum_interval = vacuum_interval
+        self.window = parse_window(window)
+        self.max_concurrent = max_concurrent
+        self.check_interval = check_interval
+
+        self._tables: dict[str, _TableState] = {}
+        self._wake: asyncio.Event | None = None
+        self._loop: asyncio.Task | None = None
+        self._running: set[asyncio.Task] = set()
+
+        self._inspections = 0
+        self._compactions = 0
+        self._vacuums = 0
+        self._failures = 0
+        self._deferred = 0
+
+    def notify(self, catalog: UnityCatalog, table_name: str, table_uri: str) -> None:
+        """
+        Record a write to a table, it is inspected on the next check.
+        """
+
+        if not self.enabled:
+            return
+
+        state = self._tables.get(table_uri)
+        if state is None:
+            state = self._tables[table_uri] = _TableState(
+                table_name, table_uri, catalog, self._next_vacuum()
+            )
+        state.catalog = catalog
+        state.dirty = True
+
+        if self._loop is None:
+            self._wake = asyncio.Event()
+            self._loop = asyncio.ensure_future(self._run())
+        self._wake.set()
+
+    def _next_vacuum(self) -> float | None:
+        if self.vacuum_interval <= 0:
+            return None
+        return time.monotonic() + self.vacuum_interval
+
+    def _foreground_idle(self) -> bool:
+        return all(
+            executor.stats()["queued"] == 0
+            for executor in (read_executor, write_executor)
+        )
+
+    async def _run(self) -> None:
+        while True:
+            # Deferred maintenance is retried on the next interval
+            with contextlib.suppress(TimeoutError):
+                await asyncio.wait_for(self._wake.wait(), self.check_interval)
+            self._wake.clear()
+
+            try:
+                await self._check()
+            except Exception as e:  # pragma: no cover
+                logger.error(f"Maintenance check failed: {e!s}")
+
+    async def _check(self) -> None:
+        for state in list(self._tables.values()):
+            if state.dirty and not state.running:
+                state.dirty = False
+                try:
+                    await read_executor.run(self._inspect, state)
+                    self._inspections += 1
+                except Exception as e:
+                    logger.warning(f"Unable to inspect {state.name}: {e!s}")
+
+        pending = [s for s in self._tables.values() if s.pending and not s.running]
+        if not pending:
+            return
+        if not in_window(self.window, datetime.now(UTC)) or not self._foreground_idle():
+            self._deferred += 1
+            return
+
+        for state in pending:
+            if len(self._running) >= self.max_concurrent:
+                return
+            state.running = True
+            task = asyncio.ensure_future(self._maintain(state))
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+
+    def _inspect(self, state: _TableState) -> None:
+        uc_table = credentials.get(state.catalog, state.name, "READ")
+        snapshot = table_cache.snapshot(uc_table.table_uri, storage_options(uc_table))
+        add_actions = snapshot.get_add_actions()
+
+        sizes = add_actions["size_bytes"]
+        small = pc.less(sizes, self.small_file_bytes)
+        state.files = add_actions.num_rows
+        state.bytes = pc.sum(sizes).as_py() or 0
+        state.small_files = pc.sum(small.cast(pa.int64())).as_py() or 0
+        if state.files == 0:
+            return
+
+        modified = add_actions["modification_time"].cast(pa.int64())
+        since = state.inspected_until
+        state.inspected_until = pc.max(modified).as_py()
+        touched = (
+            pc.greater(modified, since).to_pylist()
+            if since is not None
+            else [True] * state.files
+        )
+
+        partitions = self._partitions(
+            add_actions, snapshot.metadata().partition_columns
+        )
+        small_files = Counter(
+            p
+            for p, is_small in zip(partitions, small.to_pylist(), strict=True)
+            if is_small
+        )
+        candidates = {
+            p for p, is_touched in zip(partitions, touched, strict=True) if is_touched
+        }
+
+        compaction = state.compaction or set()
+        for partition in candidates:
+            # Null partition values can't be given as a partition filter
+            if any(value is None for _, value in partition):
+                continue
+            if small_files[partition] >= self.min_small_files:
+                compaction.add(partition)
+        state.compaction = compaction or None
+
+    @staticmethod
+    def _partitions(add_actions: pa.RecordBatch, columns: list[str]) -> list[Partition]:
+        if not columns or "partition_values" not in add_actions.schema.names:
+            return [()] * add_actions.num_rows
+        return [
+            tuple(
+                (column, None if values[column] is None else str(values[column]))
+                for column in columns
+            )
+            for values in add_actions["partition_values"].to_pylist()
+        ]
+
+    async def _maintain(self, state: _TableState) -> None:
+        try:
+            partitions, state.compaction = state.compaction, None
+            for partition in sorted(partitions or ()):
+                # Queued with the writes of the requests to the table
+                await write_scheduler.run(
+                    state.table_uri,
+                    state.name,
+                    "compact",
+                    self._compact,
+                    state,
+                    partition,
+                    executor=maintenance_executor,
+                )
+            if state.vacuum_pending:
+                await maintenance_executor.run(self._vacuum, state)
+        except Exception as e:
+            logger.error(f"Maintenance of {state.name} failed: {e!s}")
+            self._failures += 1
+        finally:
+            state.running = False
+            # Commits of the compaction are inspected like any other write
+            state.dirty = True
+            self._wake.set()
+
+    def _compact(self, state: _TableState, partition: Partition) -> None:
+        uc_table = credentials.get(state.catalog, state.name, "READ_WRITE")
+        filters = [(column, "=", value) for column, value in partition] or None
+
+        with table_cache.acquire(uc_table.table_uri, storage_options(uc_table)) as dt:
+            result = dt.optimize.compact(
+                partition_filters=filters, target_size=self.target_file_bytes
+            )
+
+        self._compactions += 1
+        if result.get("numFilesAdded") or result.get("numFilesRemoved"):
+            delta_commits_total.labels(table=state.name, operation="compact").inc()
+        logger.info(
+            f"Compacted {state.name} {dict(partition)}: "
+            f"{result.get('numFilesRemoved')} files into {result.get('numFilesAdded')}"
+        )
+
+    def _vacuum(self, state: _TableState) -> None:
+        uc_table = credentials.get(state.catalog, state.name, "READ_WRITE")
+
+        with table_cache.acquire(uc_table.table_uri, storage_options(uc_table)) as dt:
+            removed = dt.vacuum(dry_run=False)
+
+        self._vacuums += 1
+        state.vacuum_due = self._next_vacuum()
+        logger.info(f"Vacuumed {state.name}: {len(removed)} files removed")
+
+    async def close(self) -> None:
+        """
+        Stop the checks and wait for the maintenance running, used at shutdown.
+        """
+
+        if self._loop is not None:
+            self._loop.cancel()
+            await asyncio.gather(self._loop, return_exceptions=True)
+            self._loop = None
+        if self._running:
+            await asyncio.gather(*self._running, return_exceptions=True)
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "running": len(self._running),
+            "inspections": self._inspections,
+            "compactions": self._compactions,
+            "vacuums": self._vacuums,
+            "failures": self._failures,
+            "deferred": self._deferred,
+            "tables": {state.name: state.info() for state in self._tables.values()},
+        }
+
+
+maintenance = MaintenanceScheduler(
+    enabled=settings.MAINTENANCE_ENABLED,
+    small_file_bytes=settings.MAINTENANCE_SMALL_FILE_BYTES,
+    min_small_files=settings.MAINTENANCE_MIN_SMALL_FILES,
+    target_file_bytes=settings.MAINTENANCE_TARGET_FILE_BYTES,
+    vacuum_interval=settings.MAINTENANCE_VACUUM_INTERVAL_SECONDS,
+    window=settings.MAINTENANCE_WINDOW,
+    max_concurrent=settings.MAINTENANCE_MAX_CONCURRENT,
+    check_interval=settings.MAINTENANCE_CHECK_INTERVAL_SECONDS,
+)
@@ -0,0 +1,147 @@
+import math
+from collections.abc import Iterator
+from typing import Any
+
+import pyarrow as pa
+
+from deltalink.core.pruning import sql_literal
+from deltalink.core.tables import table_cache
+from deltalink.core.writes import write_scheduler
+
+# Values of the partition columns of a group of source rows
+Partition = tuple[Any, ...]
+
+
+def partition_predicate(
+    columns: list[str], partitions: list[Partition], alias: str = "target"
+) -> str | None:
+    """
+    Restrict a merge to the given partitions of the target table, so delta-rs
+    only scans and rewrites their files.
+    """
+
+    if not columns or not partitions:
+        return None
+
+    def equals(column: str, value: Any) -> str:
+        if value is None:
+            return f"{alias}.{column} IS NULL"
+        return f"{alias}.{column} = {sql_literal(value)}"
+
+    conjuncts = [
+        " AND ".join(equals(c, v) for c, v in zip(columns, values, strict=True))
+        for values in partitions
+    ]
+    if len(conjuncts) == 1:
+        return conjuncts[0]
+    return " OR ".join(f"({conjunct})" for conjunct in conjuncts)
+
+
+def partition_batches(
+    source: pa.Table, columns: list[str], batch_rows: int
+) -> Iterator[tuple[list[Partition], pa.Table]]:
+    """
+    Split the source rows in batches of at most `batch_rows` rows, the rows of
+    a partition being kept together. A partition larger than a batch is split
+    across several, small partitions share one. Only the batch being merged
+    is copied out of the source.
+    """
+
+    if not columns:
+        for offset in range(0, source.num_rows, batch_rows):
+            yield [], source.slice(offset, batch_rows)
+        return
+
+    rows = pa.array(range(source.num_rows), pa.int64())
+    groups = (
+        source.select(columns)
+        .append_column("__row", rows)
+        .group_by(columns, use_threads=False)
+        .aggregate([("__row", "list")])
+    )
+    keys = groups.select(columns).to_pylist()
+    indices = groups["__row_list"].combine_chunks()
+
+    partitions: list[Partition] = []
+    pieces: list[pa.Array] = []
+    size = 0
+    for group, key in enumerate(keys):
+        values = indices[group].values
+        offset = 0
+        while offset < len(values):
+            take = min(batch_rows - size, len(values) - offset)
+            if not partitions or partitions[-1] != tuple(key.values()):
+                partitions.append(tuple(key.values()))
+            pieces.append(values.slice(offset, take))
+            size += take
+            offset += take
+            if size == batch_rows:
+                yield partitions, source.take(pa.concat_arrays(pieces))
+                partitions, pieces, size = [], [], 0
+
+    if pieces:
+        yield partitions, source.take(pa.concat_arrays(pieces))
+
+
+def merge_in_batches(
+    table_uri: str,
+    table_name: str,
+    options: dict[str, str],
+    source: pa.Table,
+    predicate: str,
+    updates: dict[str, str] | None,
+    batch_rows: int,
+) -> Iterator[dict[str, Any]]:
+    """
+    Merge the source into the table with one commit per batch of rows, the
+    predicate of each commit being narrowed to the partitions of its batch.
+    The progress is yielded after each commit, the commits already made are
+    kept when a later one fails. A batch whose commit conflicts with a
+    concurrent write is merged again.
+    """
+
+    def merge(batch: pa.Table, condition: str) -> tuple[dict[str, Any], int]:
+        with table_cache.acquire(table_uri, options) as dt:
+            metrics = (
+                dt.merge(
+                    source=batch,
+                    predicate=condition,
+                    source_alias="source",
+                    target_alias="target",
+                )
+                .when_matched_update(updates=updates)
+                .execute()
+            )
+            return metrics, dt.version()
+
+    with table_cache.acquire(table_uri, options) as dt:
+        partition_columns = dt.metadata().partition_columns
+    # Without every partition column in the source, the whole table is merged
+    if not all(column in source.column_names for column in partition_columns):
+        partition_columns = []
+
+    batches = math.ceil(source.num_rows / batch_rows)
+    merged = 0
+    for number, (partitions, batch) in enumerate(
+        partition_batches(source, partition_columns, batch_rows), 1
+    ):
+        restriction = partition_predicate(partition_columns, partitions)
+        condition = f"({predicate}) AND ({restriction})" if restriction else predicate
+
+        metrics, version = write_scheduler.commit(
+            merge, batch, condition, table_name=table_name, operation="merge"
+        )
+
+        merged += batch.num_rows
+        yield {
+            "batch": number,
+            "batches": batches,
+            "partitions": len(partitions),
+            "rows": batch.num_rows,
+            "bytes": batch.nbytes,
+            "merged_rows": merged,
+            "total_rows": source.num_rows,
+            "version": version,
+            "updated_rows": metrics.get("num_target_rows_updated"),
+            "rewritten_files": metrics.get("num_target_files_removed"),
+        }
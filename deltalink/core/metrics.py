@@ -0,0 +1,199 @@
+import threading
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+import pyarrow as pa
+from prometheus_client import CollectorRegistry, Counter, Histogram
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+DEFAULT_BUCKETS = (
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+    60.0,
+)
+
+# Metrics of the service, apart from the default registry of the process
+metrics = CollectorRegistry()
+
+request_seconds = Histogram(
+    "deltalink_request_duration_seconds",
+    "Time to serve a request, until the last byte of the response.",
+    ("method", "route", "status"),
+    buckets=DEFAULT_BUCKETS,
+    registry=metrics,
+)
+stage_seconds = Histogram(
+    "deltalink_stage_duration_seconds",
+    "Time spent in each stage of a request.",
+    ("route", "stage"),
+    buckets=DEFAULT_BUCKETS,
+    registry=metrics,
+)
+rows_total = Counter(
+    "deltalink_rows_total",
+    "Rows returned by the reads or sent by the writes.",
+    ("operation",),
+    registry=metrics,
+)
+bytes_total = Counter(
+    "deltalink_bytes_total",
+    "Arrow bytes returned by the reads or sent by the writes.",
+    ("operation",),
+    registry=metrics,
+)
+delta_commits_total = Counter(
+    "deltalink_delta_commits_total",
+    "Commits to the Delta tables.",
+    ("table", "operation"),
+    registry=metrics,
+)
+admission_rejections_total = Counter(
+    "deltalink_admission_rejections_total",
+    "Requests rejected with 429 by the admission control.",
+    ("endpoint", "reason"),
+    registry=metrics,
+)
+commit_conflicts_total = Counter(
+    "deltalink_delta_commit_conflicts_total",
+    "Commits rejected by a concurrent write to the Delta tables.",
+    ("table", "operation"),
+    registry=metrics,
+)
+commit_retries_total = Counter(
+    "deltalink_delta_commit_retries_total",
+    "Writes run again after a commit conflict.",
+    ("table", "operation"),
+    registry=metrics,
+)
+
+
+class RequestTimings:
+    """
+    Time spent in each stage of a request. Stages running concurrently, such
+    as the tables of a join being loaded, add up.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self._stages: dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def add(self, stage: str, seconds: float) -> None:
+        with self._lock:
+            self._stages[stage] = self._stages.get(stage, 0.0) + seconds
+
+    def stages(self) -> dict[str, float]:
+        with self._lock:
+            return dict(self._stages)
+
+    def header(self) -> str:
+        """
+        The stages as a Server-Timing header value, in milliseconds.
+        """
+
+        elapsed = time.perf_counter() - self.started
+        stages = [*self.stages().items(), ("total", elapsed)]
+        return ", ".join(
+            f"{stage};dur={seconds * 1000:.3f}" for stage, seconds in stages
+        )
+
+
+_request_timings: ContextVar[RequestTimings | None] = ContextVar(
+    "request_timings", default=None
+)
+
+
+def record_stage(stage: str, seconds: float) -> None:
+    timings = _request_timings.get()
+    if timings is not None:
+        timings.add(stage, seconds)
+
+
+@contextmanager
+def span(stage: str) -> Iterator[None]:
+    """
+    Time a stage of the current request: credentials, load, plan, execute,
+    serialize, commit or catalog.
+    """
+
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(stage, time.perf_counter() - started)
+
+
+def record_rows(operation: str, rows: int, nbytes: int) -> None:
+    rows_total.labels(operation=operation).inc(rows)
+    bytes_total.labels(operation=operation).inc(nbytes)
+
+
+def metered(
+    batches: Iterator[pa.RecordBatch], operation: str
+) -> Iterator[pa.RecordBatch]:
+    """
+    Pass a stream of batches through, timing their production as the execute
+    stage and counting their rows and bytes.
+    """
+
+    while True:
+        with span("execute"):
+            batch = next(batches, None)
+        if batch is None:
+            return
+        record_rows(operation, batch.num_rows, batch.nbytes)
+        yield batch
+
+
+class ServerTimingMiddleware:
+    """
+    Collect the stages of each request, send them in the Server-Timing header
+    and feed the latency histograms. The stages of a streamed response that
+    run after its headers are only found in the histograms.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timings = RequestTimings()
+        token = _request_timings.set(timings)
+        status_code = 500
+
+        async def send_with_timings(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                MutableHeaders(scope=message).append("Server-Timing", timings.header())
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timings)
+        finally:
+            _request_timings.reset(token)
+
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            request_seconds.labels(
+                method=scope["method"], route=route, status=str(status_code)
+            ).observe(time.perf_counter() - timings.started)
+            for stage, seconds in timings.stages().items():
+                stage_seconds.labels(route=route, stage=stage).observe(seconds)
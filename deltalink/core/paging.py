@@ -0,0 +1,98 @@
+import base64
+import hashlib
+import json
+from collections.abc import Iterable
+from typing import NamedTuple
+
+import pyarrow as pa
+
+from deltalink.core.result_cache import normalize_sql
+
+
+def query_digest(sql: str) -> str:
+    return hashlib.sha256(normalize_sql(sql).encode()).hexdigest()[:16]
+
+
+class PageCursor(NamedTuple):
+    """
+    Position of the next page of a query, over pinned table versions.
+    """
+
+    digest: str
+    """Digest of the query the cursor was issued for."""
+
+    offset: int
+    """Rows already returned."""
+
+    page_size: int
+    versions: list[int]
+    """Version of each table, in the order the query references them."""
+
+    def encode(self) -> str:
+        document = json.dumps(
+            {
+                "q": self.digest,
+                "o": self.offset,
+                "s": self.page_size,
+                "v": self.versions,
+            }
+        )
+        return base64.urlsafe_b64encode(document.encode()).decode().rstrip("=")
+
+    @classmethod
+    def decode(cls, token: str, sql: str) -> "PageCursor":
+        """
+        Read a cursor sent back by a client, for the same query.
+        Raises ValueError when it is malformed or was issued for another query.
+        """
+
+        try:
+            padded = token + "=" * (-len(token) % 4)
+            document = json.loads(base64.urlsafe_b64decode(padded))
+            cursor = cls(
+                str(document["q"]),
+                int(document["o"]),
+                int(document["s"]),
+                [int(version) for version in document["v"]],
+            )
+        except (ValueError, TypeError, KeyError) as e:
+            raise ValueError("Invalid cursor") from e
+
+        if cursor.digest != query_digest(sql):
+            raise ValueError("The cursor was issued for another query")
+        if cursor.offset < 0 or cursor.page_size <= 0:
+            raise ValueError("Invalid cursor")
+
+        return cursor
+
+
+def read_page(
+    batches: Iterable[pa.RecordBatch], offset: int, page_size: int
+) -> tuple[list[pa.RecordBatch], bool]:
+    """
+    Rows `offset` to `offset + page_size` of a stream of batches, and whether
+    rows are left after them. The skipped rows are never held together, at
+    most one page and one batch are in memory.
+    """
+
+    page: list[pa.RecordBatch] = []
+    rows = 0
+    skip = offset
+
+    for batch in batches:
+        if skip >= batch.num_rows:
+            skip -= batch.num_rows
+            continue
+        if skip:
+            batch = batch.slice(skip)
+            skip = 0
+        if rows + batch.num_rows > page_size:
+            page.append(batch.slice(0, page_size - rows))
+            return page, True
+        page.append(batch)
+        rows += batch.num_rows
+        if rows == page_size:
+            # Stops the stream when the next batch would be empty
+            return page, any(b.num_rows for b in batches)
+
+    return page, False
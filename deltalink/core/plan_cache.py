@@ -0,0 +1,113 @@
+import threading
+from collections import OrderedDict
+from typing import Any
+
+import daft
+from daft.logical.builder import LogicalPlanBuilder
+from daft.sql import SQLCatalog
+from daft.unity_catalog import UnityCatalogTable
+from sql_metadata import Parser
+
+from deltalink.core.config import settings
+from deltalink.core.util import ResolvedTable
+
+
+class _CachedPlan:
+    def __init__(self, uc_tables: list[UnityCatalogTable], builder: LogicalPlanBuilder):
+        self.uc_tables = uc_tables
+        self.builder = builder
+
+
+class QueryPlanCache:
+    """
+    Cache of the work done on the text of a query before it runs: the tables
+    it references, and the daft plan built for the versions of those tables.
+    A plan holds the credentials of its tables, so it is only reused while
+    they are the credentials the tables are resolved with.
+    """
+
+    def __init__(self, max_queries: int, max_plans: int):
+        self.max_queries = max_queries
+        self.max_plans = max_plans
+        self._tables: OrderedDict[str, tuple[str, ...]] = OrderedDict()
+        self._plans: OrderedDict[tuple, _CachedPlan] = OrderedDict()
+        self._lock = threading.Lock()
+
+        self._parse_hits = 0
+        self._parse_misses = 0
+        self._plan_hits = 0
+        self._plan_misses = 0
+
+    def tables(self, sql: str) -> list[str]:
+        """
+        Names of the tables referenced by the query.
+        """
+
+        with self._lock:
+            tables = self._tables.get(sql)
+            if tables is not None:
+                self._tables.move_to_end(sql)
+                self._parse_hits += 1
+                return list(tables)
+            self._parse_misses += 1
+
+        tables = tuple(Parser(sql).tables)
+        with self._lock:
+            self._tables[sql] = tables
+            while len(self._tables) > self.max_queries:
+                self._tables.popitem(last=False)
+
+        return list(tables)
+
+    def plan(self, sql: str, tables: list[ResolvedTable]) -> daft.DataFrame:
+        """
+        The daft plan of the query, planned again only when one of the
+        tables has a new version or new credentials.
+        """
+
+        key = (sql, tuple((table.name, table.version) for table in tables))
+        with self._lock:
+            entry = self._plans.get(key)
+            if entry is not None and all(
+                cached is table.uc_table
+                for cached, table in zip(entry.uc_tables, tables, strict=True)
+            ):
+                self._plans.move_to_end(key)
+                self._plan_hits += 1
+                # A new DataFrame, results are never held by the cached plan
+                return daft.DataFrame(entry.builder)
+            self._plan_misses += 1
+
+        sql_catalog = SQLCatalog({table.name: table.df for table in tables})
+        df = daft.sql(sql, catalog=sql_catalog)
+
+        entry = _CachedPlan([table.uc_table for table in tables], df._builder)
+        with self._lock:
+            self._plans[key] = entry
+            self._plans.move_to_end(key)
+            while len(self._plans) > self.max_plans:
+                self._plans.popitem(last=False)
+
+        return df
+
+    def clear(self) -> None:
+        with self._lock:
+            self._tables.clear()
+            self._plans.clear()
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "queries": len(self._tables),
+                "plans": len(self._plans),
+                "parse_hits": self._parse_hits,
+                "parse_misses": self._parse_misses,
+                "plan_hits": self._plan_hits,
+                "plan_misses": self._plan_misses,
+            }
+
+
+plan_cache = QueryPlanCache(
+    max_queries=settings.PLAN_CACHE_MAX_QUERIES,
+    max_plans=settings.PLAN_CACHE_MAX_PLANS,
+)
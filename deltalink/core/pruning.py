@@ -0,0 +1,460 @@
+import bisect
+from collections.abc import Iterable, Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, NamedTuple
+
+import pyarrow as pa
+import pyarrow.compute as pc
+from daft import col, lit
+from daft.daft import PyExpr, PyPushdowns
+from daft.expressions import Expression
+from daft.expressions.visitor import PredicateVisitor
+
+
+class _Column(NamedTuple):
+    name: str
+
+
+class _Literal(NamedTuple):
+    value: Any
+
+
+# A predicate evaluates to the files that may hold matching rows, or None
+# when it can't be decided from the file metadata
+Mask = pa.BooleanArray | None
+
+
+def _and(left: Mask, right: Mask) -> Mask:
+    if left is None:
+        return right
+    if right is None:
+        return left
+    return pc.and_(left, right)
+
+
+def _or(left: Mask, right: Mask) -> Mask:
+    if left is None or right is None:
+        return None
+    return pc.or_(left, right)
+
+
+# Length of the string statistics Spark keeps, a longer value is truncated
+TRUNCATED_STATS_LENGTH = 32
+
+
+class _FilePruning(PredicateVisitor[Any]):
+    """
+    Evaluate a pushed down filter over the add actions of a Delta table,
+    with the partition values and the min/max statistics of each file.
+    Anything it doesn't understand keeps the files, so the result is an
+    upper bound of what a scan has to read.
+    """
+
+    def __init__(self, add_actions: pa.RecordBatch, columns: str):
+        self._bounds: dict[str, tuple[pa.Array, pa.Array]] = {}
+        self._null_counts: dict[str, pa.Array] = {}
+
+        names = add_actions.schema.names
+        if columns == "partition_values" and "partition_values" in names:
+            values: pa.StructArray = add_actions["partition_values"]
+            for i, field in enumerate(values.type):
+                self._bounds[field.name] = (values.field(i), values.field(i))
+        elif columns == "stats" and "min" in names and "max" in names:
+            minimums: pa.StructArray = add_actions["min"]
+            maximums: pa.StructArray = add_actions["max"]
+            for field in minimums.type:
+                if pa.types.is_null(field.type) or pa.types.is_nested(field.type):
+                    continue
+                maximum = maximums.field(field.name)
+                if pa.types.is_string(field.type) or pa.types.is_binary(field.type):
+                    # A truncated minimum is still a lower bound, but a maximum
+                    # as long as the prefix Spark keeps may be below the values
+                    truncated = pc.greater_equal(
+                        pc.binary_length(maximum), TRUNCATED_STATS_LENGTH
+                    )
+                    maximum = pc.if_else(
+                        truncated, pa.scalar(None, maximum.type), maximum
+                    )
+                self._bounds[field.name] = (minimums.field(field.name), maximum)
+            if "null_count" in names and "num_records" in names:
+                null_counts: pa.StructArray = add_actions["null_count"]
+                for i, field in enumerate(null_counts.type):
+                    if pa.types.is_integer(field.type):
+                        self._null_counts[field.name] = null_counts.field(i)
+        self._num_records = (
+            add_actions["num_records"] if "num_records" in names else None
+        )
+
+    def mask(self, expr: PyExpr | None) -> Mask:
+        if expr is None:
+            return None
+        return self.visit(Expression._from_pyexpr(expr))
+
+    def visit(self, expr: Expression) -> Any:
+        try:
+            return super().visit(expr)
+        except ValueError:
+            # Literals daft can't convert to Python, such as dates
+            return None
+
+    def _compare(self, left: Any, right: Any, op: str) -> Mask:
+        flipped = {"lt": "gt", "le": "ge", "gt": "lt", "ge": "le", "eq": "eq"}
+        if isinstance(left, _Literal) and isinstance(right, _Column):
+            left, right, op = right, left, flipped[op]
+        if not isinstance(left, _Column) or not isinstance(right, _Literal):
+            return None
+        if left.name not in self._bounds or right.value is None:
+            return None
+
+        minimum, maximum = self._bounds[left.name]
+        try:
+            if op == "lt":
+                result = pc.less(minimum, right.value)
+            elif op == "le":
+                result = pc.less_equal(minimum, right.value)
+            elif op == "gt":
+                result = pc.greater(maximum, right.value)
+            elif op == "ge":
+                result = pc.greater_equal(maximum, right.value)
+            else:
+                # An unknown maximum leaves the minimum to decide
+                result = pc.and_kleene(
+                    pc.less_equal(minimum, right.value),
+                    pc.greater_equal(maximum, right.value),
+                )
+        except (pa.ArrowInvalid, pa.ArrowNotImplementedError, pa.ArrowTypeError):
+            return None
+
+        # Files without statistics are kept
+        return result.fill_null(True)
+
+    def visit_col(self, name: str) -> _Column:
+        return _Column(name)
+
+    def visit_lit(self, value: Any) -> _Literal:
+        return _Literal(value)
+
+    def visit_alias(self, expr: Expression, alias: str) -> Any:
+        return self.visit(expr)
+
+    def visit_cast(self, expr: Expression, dtype: Any) -> None:
+        return None
+
+    def visit_function(self, name: str, args: list[Expression]) -> None:
+        return None
+
+    def visit_and(self, left: Expression, right: Expression) -> Mask:
+        return _and(self.visit(left), self.visit(right))
+
+    def visit_or(self, left: Expression, right: Expression) -> Mask:
+        return _or(self.visit(left), self.visit(right))
+
+    def visit_not(self, expr: Expression) -> None:
+        return None
+
+    def visit_equal(self, left: Expression, right: Expression) -> Mask:
+        return self._compare(self.visit(left), self.visit(right), "eq")
+
+    def visit_not_equal(self, left: Expression, right: Expression) -> None:
+        return None
+
+    def visit_less_than(self, left: Expression, right: Expression) -> Mask:
+        return self._compare(self.visit(left), self.visit(right), "lt")
+
+    def visit_less_than_or_equal(self, left: Expression, right: Expression) -> Mask:
+        return self._compare(self.visit(left), self.visit(right), "le")
+
+    def visit_greater_than(self, left: Expression, right: Expression) -> Mask:
+        return self._compare(self.visit(left), self.visit(right), "gt")
+
+    def visit_greater_than_or_equal(self, left: Expression, right: Expression) -> Mask:
+        return self._compare(self.visit(left), self.visit(right), "ge")
+
+    def visit_between(
+        self, expr: Expression, lower: Expression, upper: Expression
+    ) -> Mask:
+        column = self.visit(expr)
+        return _and(
+            self._compare(column, self.visit(lower), "ge"),
+            self._compare(column, self.visit(upper), "le"),
+        )
+
+    def visit_is_in(self, expr: Expression, items: list[Expression]) -> Mask:
+        column = self.visit(expr)
+        result: Mask = None
+        for i, item in enumerate(items):
+            matches = self._compare(column, self.visit(item), "eq")
+            if matches is None:
+                return None
+            result = matches if i == 0 else _or(result, matches)
+        return result
+
+    def visit_is_null(self, expr: Expression) -> Mask:
+        column = self.visit(expr)
+        if not isinstance(column, _Column) or column.name not in self._null_counts:
+            return None
+        return pc.greater(self._null_counts[column.name], 0).fill_null(True)
+
+    def visit_not_null(self, expr: Expression) -> Mask:
+        column = self.visit(expr)
+        if (
+            not isinstance(column, _Column)
+            or column.name not in self._null_counts
+            or self._num_records is None
+        ):
+            return None
+        return pc.less(self._null_counts[column.name], self._num_records).fill_null(
+            True
+        )
+
+
+def lookup_files(add_actions: pa.RecordBatch, column: str) -> float | None:
+    """
+    Files an equality lookup on the column is expected to read, from the
+    min/max statistics of the files. The lookups are sampled at the bounds of
+    the files, files without statistics are always read. None when the
+    column has no statistics.
+    """
+
+    names = add_actions.schema.names
+    if "min" not in names or "max" not in names:
+        return None
+    minimums: pa.StructArray = add_actions["min"]
+    if minimums.type.get_field_index(column) < 0:
+        return None
+    if pa.types.is_null(minimums.type.field(column).type):
+        return None
+
+    bounds = [
+        (low, high)
+        for low, high in zip(
+            minimums.field(column).to_pylist(),
+            add_actions["max"].field(column).to_pylist(),
+            strict=True,
+        )
+        if low is not None and high is not None
+    ]
+    unknown = add_actions.num_rows - len(bounds)
+    if not bounds:
+        return float(unknown) if unknown else None
+
+    lows = sorted(low for low, _ in bounds)
+    highs = sorted(high for _, high in bounds)
+    samples = lows + highs
+    # Files whose range holds the value: starting at or before it, less the
+    # ones ending before it
+    matches = sum(
+        bisect.bisect_right(lows, value) - bisect.bisect_left(highs, value)
+        for value in samples
+    )
+    return matches / len(samples) + unknown
+
+
+def file_mask(add_actions: pa.RecordBatch, predicate: Expression) -> Mask:
+    """
+    Files that may hold rows matching the predicate, from their partition
+    values and their statistics, or None when no file can be skipped.
+    """
+
+    return _and(
+        _FilePruning(add_actions, "partition_values").visit(predicate),
+        _FilePruning(add_actions, "stats").visit(predicate),
+    )
+
+
+_OPERATORS = {
+    "=": Expression.__eq__,
+    "!=": Expression.__ne__,
+    "<": Expression.__lt__,
+    "<=": Expression.__le__,
+    ">": Expression.__gt__,
+    ">=": Expression.__ge__,
+}
+
+
+def _typed_value(column: str, value: Any, schema: pa.Schema) -> Any:
+    if column not in schema.names:
+        raise ValueError(f"Unknown column {column!r}")
+    field = schema.field(column)
+    try:
+        return pc.cast(pa.scalar(value), field.type).as_py()
+    except (pa.ArrowInvalid, pa.ArrowNotImplementedError) as e:
+        raise ValueError(
+            f"Invalid value {value!r} for column {column!r} of type {field.type}"
+        ) from e
+
+
+def predicate_expression(
+    filters: Iterable[tuple[str, str, str]], schema: pa.Schema
+) -> Expression | None:
+    """
+    Conjunction of `(column, operator, value)` filters, the values are sent as
+    text and converted to the type of their column.
+    Raises ValueError for an unknown column or a value of the wrong type.
+    """
+
+    predicate: Expression | None = None
+    for column, operator, value in filters:
+        if operator not in _OPERATORS:
+            raise ValueError(f"Unsupported operator {operator!r}")
+
+        typed = _typed_value(column, value, schema)
+        condition = _OPERATORS[operator](col(column), lit(typed))
+        predicate = condition if predicate is None else predicate & condition
+
+    return predicate
+
+
+def sql_literal(value: Any) -> str:
+    """
+    A value as a literal of the SQL predicates delta-rs takes.
+    """
+
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, int | float | Decimal):
+        return str(value)
+    if isinstance(value, datetime | date):
+        value = value.isoformat()
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+def sql_identifier(column: str) -> str:
+    return '"' + column.replace('"', '""') + '"'
+
+
+def predicate_sql(filters: Iterable[tuple[str, str, str]], schema: pa.Schema) -> str:
+    """
+    The filters of `predicate_expression` as a SQL predicate for delta-rs.
+    """
+
+    conditions = []
+    for column, operator, value in filters:
+        if operator not in _OPERATORS:
+            raise ValueError(f"Unsupported operator {operator!r}")
+        typed = _typed_value(column, value, schema)
+        conditions.append(f"{sql_identifier(column)} {operator} {sql_literal(typed)}")
+    if not conditions:
+        raise ValueError("No predicate given")
+    return " AND ".join(conditions)
+
+
+def keys_sql(column: str, keys: Iterable[Any], schema: pa.Schema) -> str:
+    """
+    A SQL predicate matching the rows whose column holds one of the keys.
+    The range of the keys is added, so the files are skipped from their
+    min/max statistics even when the list is too long for delta-rs to
+    prune with it.
+    """
+
+    distinct = {_typed_value(column, key, schema) for key in keys}
+    if not distinct:
+        raise ValueError("No keys given")
+    if None in distinct:
+        raise ValueError(f"Null keys can't be matched on {column!r}")
+    typed = sorted(distinct)
+
+    name = sql_identifier(column)
+    values = ", ".join(sql_literal(key) for key in typed)
+    return (
+        f"{name} >= {sql_literal(typed[0])} AND {name} <= {sql_literal(typed[-1])}"
+        f" AND {name} IN ({values})"
+    )
+
+
+class ScanReport(NamedTuple):
+    """
+    Files of a Delta table a scan has to read, after pruning.
+    """
+
+    table: str
+    """Full name of the table in UC, or its URI when read without UC."""
+
+    table_uri: str
+    version: int
+    files: int
+    bytes: int
+    partition_files: int
+    """Files left by the partition filters."""
+
+    partition_bytes: int
+    scanned_files: int
+    """Files left by the partition filters and the file statistics."""
+
+    scanned_bytes: int
+    scan_tasks: int
+    """Scan tasks planned by daft."""
+
+
+def scan_report(
+    table: str,
+    table_uri: str,
+    version: int,
+    add_actions: pa.RecordBatch,
+    pushdowns: PyPushdowns,
+    scan_tasks: int,
+) -> ScanReport:
+    partitions = _FilePruning(add_actions, "partition_values").mask(
+        pushdowns.partition_filters
+    )
+    stats = _FilePruning(add_actions, "stats").mask(pushdowns.filters)
+    scanned = _and(partitions, stats)
+
+    sizes = add_actions["size_bytes"]
+
+    def total(mask: Mask) -> tuple[int, int]:
+        if mask is None:
+            return add_actions.num_rows, pc.sum(sizes).as_py() or 0
+        return (
+            pc.sum(mask.cast(pa.int64())).as_py() or 0,
+            pc.sum(pc.filter(sizes, mask)).as_py() or 0,
+        )
+
+    files, nbytes = total(None)
+    partition_files, partition_bytes = total(partitions)
+    scanned_files, scanned_bytes = total(scanned)
+
+    return ScanReport(
+        table,
+        table_uri,
+        version,
+        files,
+        nbytes,
+        partition_files,
+        partition_bytes,
+        scanned_files,
+        scanned_bytes,
+        scan_tasks,
+    )
+
+
+_scan_reports: ContextVar[list[ScanReport] | None] = ContextVar(
+    "scan_reports", default=None
+)
+
+
+@contextmanager
+def collect_scan_reports() -> Iterator[list[ScanReport]]:
+    """
+    Collect a report of the Delta scans planned in this context.
+    """
+
+    reports: list[ScanReport] = []
+    token = _scan_reports.set(reports)
+    try:
+        yield reports
+    finally:
+        _scan_reports.reset(token)
+
+
+def record_scan(report: ScanReport) -> None:
+    reports = _scan_reports.get()
+    if reports is not None:
+        reports.append(report)
+
+
+def collecting_scan_reports() -> bool:
+    return _scan_reports.get() is not None
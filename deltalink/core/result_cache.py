@@ -0,0 +1,303 @@
+import functools
+import hashlib
+import json
+import threading
+import uuid
+from collections import OrderedDict
+from collections.abc import Iterable, Iterator
+from pathlib import Path
+from typing import Any
+
+import pyarrow as pa
+import sqlparse
+from fastapi.logger import logger
+
+from deltalink.core.config import settings
+
+
+# Formatting is a full sqlparse pass, repeated queries are formatted once
+@functools.lru_cache(maxsize=settings.PLAN_CACHE_MAX_QUERIES)
+def normalize_sql(sql: str) -> str:
+    """
+    Normalize the layout of a query, so the same query sent with different
+    whitespace or comments shares its cache entries. The case is kept, the
+    column names are case sensitive and can't be told from the keywords.
+    """
+
+    formatted = sqlparse.format(sql, strip_comments=True, strip_whitespace=True)
+    return formatted.strip().rstrip(";").strip()
+
+
+class CachedResult:
+    """
+    Result of a query, held in memory or in an Arrow file on disk.
+    """
+
+    def __init__(
+        self,
+        nbytes: int,
+        num_rows: int,
+        table: pa.Table | None = None,
+        path: Path | None = None,
+        plan: str | None = None,
+    ):
+        self.nbytes = nbytes
+        self.num_rows = num_rows
+        self.table = table
+        self.path = path
+        self.plan = plan
+
+    def load(self) -> pa.Table:
+        if self.table is not None:
+            return self.table
+
+        # Memory mapped, the batches are read from the page cache
+        return pa.ipc.open_file(pa.memory_map(str(self.path))).read_all()
+
+
+class _ArrowFile:
+    """
+    Arrow file written batch by batch, moved in place once it is complete.
+    """
+
+    def __init__(self, path: Path, schema: pa.Schema):
+        self.path = path
+        self.partial = path.with_name(f"{path.stem}.{uuid.uuid4().hex}.tmp")
+        self._sink = pa.OSFile(str(self.partial), "wb")
+        self._writer = pa.ipc.new_file(self._sink, schema)
+
+    def write(self, batch: pa.RecordBatch) -> None:
+        self._writer.write_batch(batch)
+
+    def _close(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+            self._sink.close()
+            self._writer = self._sink = None
+
+    def commit(self) -> Path:
+        self._close()
+        self.partial.replace(self.path)
+        return self.path
+
+    def discard(self) -> None:
+        self._close()
+        self.partial.unlink(missing_ok=True)
+
+
+class ResultCache:
+    """
+    Cache of query results keyed by the normalized SQL text and the Delta
+    version of every table it reads. A new commit to one of the tables
+    changes the key, so an entry is never served stale and is left to the
+    LRU eviction. Results too large to be kept in memory are written as
+    Arrow files when a directory is configured.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int,
+        max_entry_bytes: int,
+        directory: str | None = None,
+        max_disk_bytes: int = 0,
+    ):
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = max_entry_bytes
+        self.directory = Path(directory) if directory else None
+        self.max_disk_bytes = max_disk_bytes
+        self._entries: OrderedDict[str, CachedResult] = OrderedDict()
+        self._lock = threading.Lock()
+        self._memory_bytes = 0
+        self._disk_bytes = 0
+        self._directory_ready = False
+
+        self._hits = 0
+        self._misses = 0
+        self._stores = 0
+        self._evictions = 0
+
+    @staticmethod
+    def key(sql: str, versions: dict[str, int]) -> str:
+        document = json.dumps([normalize_sql(sql), sorted(versions.items())])
+        return hashlib.sha256(document.encode()).hexdigest()
+
+    def get(self, key: str) -> CachedResult | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return entry
+
+    def _open(self, key: str, schema: pa.Schema) -> "_ArrowFile":
+        if not self._directory_ready:
+            # Files left by a previous process are not accounted for
+            self.directory.mkdir(parents=True, exist_ok=True)
+            for stale in self.directory.glob("*.arrow"):
+                stale.unlink(missing_ok=True)
+            self._directory_ready = True
+
+        return _ArrowFile(self.directory / f"{key}.arrow", schema)
+
+    def _write(self, key: str, table: pa.Table) -> Path:
+        file = self._open(key, table.schema)
+        try:
+            for batch in table.to_batches():
+                file.write(batch)
+            return file.commit()
+        except BaseException:
+            file.discard()
+            raise
+
+    def put(self, key: str, table: pa.Table, plan: str | None = None) -> bool:
+        """
+        Store a result, returns False when it is too large to be cached.
+        """
+
+        nbytes = table.nbytes
+        if nbytes <= self.max_entry_bytes:
+            entry = CachedResult(nbytes, table.num_rows, table=table, plan=plan)
+        elif self.directory is not None and nbytes <= self.max_disk_bytes:
+            try:
+                path = self._write(key, table)
+            except OSError as e:
+                logger.warning(f"Unable to write the query result to disk: {e!s}")
+                return False
+            entry = CachedResult(nbytes, table.num_rows, path=path, plan=plan)
+        else:
+            return False
+
+        self._store(key, entry)
+        return True
+
+    def _store(self, key: str, entry: CachedResult) -> None:
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = entry
+            if entry.path is None:
+                self._memory_bytes += entry.nbytes
+            else:
+                self._disk_bytes += entry.nbytes
+            self._stores += 1
+            self._evict()
+
+    def tee(
+        self, key: str, batches: Iterable[pa.RecordBatch]
+    ) -> Iterator[pa.RecordBatch]:
+        """
+        Pass the batches of a streamed result through, and cache the result
+        once it is complete. Only a result up to the entry size is held in
+        memory, a larger one is written to an Arrow file as its batches pass
+        through, when a directory is set. Collecting stops when the result
+        can't be cached anyway.
+        """
+
+        collected: list[pa.RecordBatch] = []
+        file: _ArrowFile | None = None
+        caching = True
+        nbytes = rows = 0
+
+        try:
+            for batch in batches:
+                if caching:
+                    nbytes += batch.nbytes
+                    rows += batch.num_rows
+                    try:
+                        if file is None and nbytes <= self.max_entry_bytes:
+                            collected.append(batch)
+                        elif self.directory is not None and (
+                            nbytes <= self.max_disk_bytes
+                        ):
+                            if file is None:
+                                file = self._open(key, batch.schema)
+                                for held in collected:
+                                    file.write(held)
+                                collected = []
+                            file.write(batch)
+                        else:
+                            caching = False
+                    except OSError as e:
+                        logger.warning(
+                            f"Unable to write the query result to disk: {e!s}"
+                        )
+                        caching = False
+                    if not caching:
+                        collected = []
+                        if file is not None:
+                            file.discard()
+                            file = None
+                yield batch
+
+            if file is not None:
+                path, file = file.commit(), None
+                self._store(key, CachedResult(nbytes, rows, path=path))
+            elif caching and collected:
+                self.put(key, pa.Table.from_batches(collected))
+        finally:
+            # The client went away before the end of the stream
+            if file is not None:
+                file.discard()
+
+    def _remove(self, key: str) -> None:
+        """
+        Remove an entry, the lock must be held.
+        """
+
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+
+        if entry.path is None:
+            self._memory_bytes -= entry.nbytes
+        else:
+            self._disk_bytes -= entry.nbytes
+            entry.path.unlink(missing_ok=True)
+
+    def _evict(self) -> None:
+        """
+        Evict the least recently used entries over budget, the lock must be held.
+        """
+
+        for key in list(self._entries):
+            if (
+                self._memory_bytes <= self.max_bytes
+                and self._disk_bytes <= self.max_disk_bytes
+            ):
+                return
+
+            entry = self._entries[key]
+            on_disk = entry.path is not None
+            if (on_disk and self._disk_bytes > self.max_disk_bytes) or (
+                not on_disk and self._memory_bytes > self.max_bytes
+            ):
+                self._remove(key)
+                self._evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            for key in list(self._entries):
+                self._remove(key)
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "enabled": settings.RESULT_CACHE_ENABLED,
+                "entries": len(self._entries),
+                "memory_bytes": self._memory_bytes,
+                "disk_bytes": self._disk_bytes,
+                "hits": self._hits,
+                "misses": self._misses,
+                "stores": self._stores,
+                "evictions": self._evictions,
+            }
+
+
+result_cache = ResultCache(
+    max_bytes=settings.RESULT_CACHE_MAX_BYTES,
+    max_entry_bytes=settings.RESULT_CACHE_MAX_ENTRY_BYTES,
+    directory=settings.RESULT_CACHE_DIR,
+    max_disk_bytes=settings.RESULT_CACHE_DISK_MAX_BYTES,
+)
@@ -0,0 +1,230 @@
+import errno
+import multiprocessing
+import pickle
+import tempfile
+import threading
+import uuid
+from collections.abc import Callable, Iterator
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from typing import Any, Literal
+
+import daft
+import pyarrow as pa
+from daft.daft import IOConfig
+from daft.sql import SQLCatalog
+from daft.unity_catalog import UnityCatalogTable
+from fastapi.logger import logger
+
+from deltalink.core.config import settings
+from deltalink.core.metrics import span
+from deltalink.core.tables import load_snapshot, read_deltalake
+from deltalink.core.util import ResolvedTable
+
+RunnerMode = Literal["native", "process", "ray"]
+
+# What a worker process needs to read a table: name, version, URI and credentials
+_WorkerTable = tuple[str, int, str, IOConfig | None]
+
+
+def _warm_up() -> None:
+    """
+    Run once by each worker process, so the imports are done at startup.
+    """
+
+
+def _run_query(sql: str, tables: list[_WorkerTable], path: str) -> int:
+    """
+    Entry point of the query worker processes: run the query on the versions
+    of the tables resolved by the API process, and write the result to an
+    Arrow IPC file. Returns the number of rows.
+    """
+
+    try:
+        return _write_result(sql, tables, path)
+    except Exception as e:
+        try:
+            pickle.dumps(e)
+        except Exception:
+            # Some daft errors can't be sent back to the API process
+            raise RuntimeError(f"{type(e).__name__}: {e!s}") from None
+        raise
+
+
+def _write_result(sql: str, tables: list[_WorkerTable], path: str) -> int:
+    frames = {}
+    for name, version, table_uri, io_config in tables:
+        uc_table = UnityCatalogTable(
+            table_info=None, table_uri=table_uri, io_config=io_config
+        )
+        frames[name] = read_deltalake(uc_table, load_snapshot(uc_table, version))
+    df = daft.sql(sql, catalog=SQLCatalog(frames))
+
+    schema = df.schema().to_pyarrow_schema()
+    rows = 0
+    with pa.OSFile(path, "wb") as sink, pa.ipc.new_file(sink, schema) as writer:
+        for batch in df.to_arrow_iter(results_buffer_size=1):
+            if not batch.schema.equals(schema):
+                batch = batch.cast(schema)
+            writer.write_batch(batch)
+            rows += batch.num_rows
+    return rows
+
+
+def _read_result(path: Path) -> tuple[pa.Schema, Iterator[pa.RecordBatch]]:
+    # Memory mapped, the file can be removed while it is being read
+    reader = pa.ipc.open_file(pa.memory_map(str(path)))
+    path.unlink(missing_ok=True)
+
+    def batches() -> Iterator[pa.RecordBatch]:
+        for i in range(reader.num_record_batches):
+            yield reader.get_batch(i)
+
+    return reader.schema, batches()
+
+
+def _out_of_space(error: BaseException) -> bool:
+    if not isinstance(error, OSError):
+        return False
+    return error.errno == errno.ENOSPC or "No space left" in str(error)
+
+
+class QueryRunner:
+    """
+    Where the daft queries run, chosen when the application starts:
+
+    - native: in the API process, with the native runner of daft
+    - process: in a pool of query worker processes, the result is written
+      to an Arrow IPC file and read back memory mapped, so the API process
+      only resolves the tables and serves the rows
+    - ray: on a local Ray cluster, with the Ray runner of daft
+
+    The tables are resolved by the API process in every mode, with its
+    credentials and table versions.
+    """
+
+    def __init__(
+        self,
+        mode: RunnerMode,
+        workers: int,
+        directory: str | None = None,
+        ray_address: str | None = None,
+    ):
+        self.mode = mode
+        self.workers = workers
+        self.ray_address = ray_address
+        # A worker writes the whole result before it is served, /dev/shm is
+        # only used when set, its size is limited in containers
+        root = Path(directory or tempfile.gettempdir())
+        self.directory = root / "deltalink-results"
+
+        self._pool: ProcessPoolExecutor | None = None
+        self._lock = threading.Lock()
+        self._started = False
+
+        self._queries = 0
+        self._failures = 0
+
+    def start(self) -> None:
+        """
+        Set the daft runner up, or start the worker processes.
+        """
+
+        if self._started:
+            return
+        self._started = True
+
+        if self.mode == "ray":
+            import ray
+
+            ray.init()
+            daft.context.set_runner_ray(self.ray_address)
+        elif self.mode == "process":
+            pool = self._process_pool()
+            for _ in range(self.workers):
+                pool.submit(_warm_up)
+        logger.info(f"Queries run with the {self.mode} runner")
+
+    def _process_pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                self.directory.mkdir(parents=True, exist_ok=True)
+                # daft and delta-rs run threads, the workers are not forked
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+            return self._pool
+
+    def run(
+        self,
+        sql: str,
+        tables: list[ResolvedTable],
+        plan: Callable[[], daft.DataFrame],
+    ) -> tuple[pa.Schema, Iterator[pa.RecordBatch]]:
+        """
+        Run a query, blocking, and return the schema and the batches of its
+        result. In the API process the batches are produced as they are
+        read, `plan` building the DataFrame of the query. A worker process
+        runs the whole query before the first batch is returned.
+        """
+
+        with self._lock:
+            self._queries += 1
+
+        if self.mode != "process":
+            df = plan()
+            return df.schema().to_pyarrow_schema(), df.to_arrow_iter(
+                results_buffer_size=1
+            )
+
+        path = self.directory / f"{uuid.uuid4().hex}.arrow"
+        worker_tables = [
+            (t.name, t.version, t.uc_table.table_uri, t.uc_table.io_config)
+            for t in tables
+        ]
+        try:
+            with span("execute"):
+                future = self._process_pool().submit(
+                    _run_query, sql, worker_tables, str(path)
+                )
+                future.result()
+            return _read_result(path)
+        except BaseException as e:
+            with self._lock:
+                self._failures += 1
+                # A worker died, a new pool is started for the next query
+                if isinstance(e, BrokenProcessPool):
+                    self._pool = None
+            path.unlink(missing_ok=True)
+            if _out_of_space(e):
+                raise RuntimeError(
+                    f"The query result doesn't fit in {self.directory}, set "
+                    "QUERY_RESULT_DIR to a volume large enough for the results"
+                ) from e
+            raise
+
+    def shutdown(self) -> None:
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=True, cancel_futures=True)
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "mode": self.mode,
+                "workers": self.workers if self.mode == "process" else None,
+                "queries": self._queries,
+                "failures": self._failures,
+            }
+
+
+query_runner = QueryRunner(
+    # RAY_ENABLED is the former way of choosing the Ray runner
+    mode="ray" if settings.RAY_ENABLED else settings.QUERY_RUNNER,
+    workers=settings.QUERY_PROCESS_WORKERS,
+    directory=settings.QUERY_RESULT_DIR,
+    ray_address=settings.RAY_ENDPOINT,
+)
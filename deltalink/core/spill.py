@@ -0,0 +1,325 @@
+import contextlib
+import os
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from collections.abc import Iterable
+from pathlib import Path
+from typing import Any, Literal
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from deltalink.core.arrow import ARROW_FILE_MEDIA_TYPE, PARQUET_MEDIA_TYPE
+from deltalink.core.config import settings
+
+SpillFormat = Literal["parquet", "arrow"]
+
+
+class SpillQuotaExceeded(Exception):
+    pass
+
+
+class SpilledResult:
+    """
+    Result of a query written to a local file, until it expires.
+    """
+
+    def __init__(
+        self, path: Path, format: SpillFormat, rows: int, nbytes: int, ttl: float
+    ):
+        self.id = path.stem
+        self.path = path
+        self.format = format
+        self.rows = rows
+        self.nbytes = nbytes
+        self.size = path.stat().st_size
+        self.created_at = time.time()
+        self.expires_at = self.created_at + ttl
+
+    @property
+    def media_type(self) -> str:
+        return PARQUET_MEDIA_TYPE if self.format == "parquet" else ARROW_FILE_MEDIA_TYPE
+
+    @property
+    def filename(self) -> str:
+        return self.path.name
+
+    def info(self) -> dict[str, Any]:
+        return {
+            "id": self.id,
+            "format": self.format,
+            "media_type": self.media_type,
+            "rows": self.rows,
+            "bytes": self.nbytes,
+            "size": self.size,
+            "created_at": self.created_at,
+            "expires_at": self.expires_at,
+        }
+
+
+class _SpillWriter:
+    """
+    Parquet or Arrow IPC file written one batch at a time.
+    """
+
+    def __init__(self, path: Path, format: SpillFormat, schema: pa.Schema):
+        self.schema = schema
+        if format == "parquet":
+            self._writer = pq.ParquetWriter(str(path), schema)
+            self._sink = None
+        else:
+            self._sink = pa.OSFile(str(path), "wb")
+            self._writer = pa.ipc.new_file(self._sink, schema)
+
+    def write(self, batch: pa.RecordBatch) -> None:
+        self._writer.write_batch(batch)
+
+    def close(self) -> None:
+        self._writer.close()
+        if self._sink is not None:
+            self._sink.close()
+
+
+class ResultSpill:
+    """
+    Results of /sql/query too large to be held in memory and sent as JSON.
+    The batches are buffered until the result grows past the threshold,
+    then they are written to a Parquet or Arrow file as they are produced,
+    and the client downloads the file, with Range requests to resume.
+
+    The files share a disk quota: the least recently downloaded results
+    are removed to make room, and every result is removed once it wasn't
+    downloaded for the TTL.
+
+    The results are known by the process that spilled them, in a directory
+    of its own. Behind several workers, the downloads must be routed to the
+    worker that ran the query, with sticky sessions, or they get a 404.
+    """
+
+    def __init__(
+        self,
+        enabled: bool,
+        threshold_bytes: int,
+        max_disk_bytes: int,
+        ttl: float,
+        format: SpillFormat = "parquet",
+        directory: str | None = None,
+    ):
+        self.enabled = enabled
+        self.threshold_bytes = threshold_bytes
+        self.max_disk_bytes = max_disk_bytes
+        self.ttl = ttl
+        self.format = format
+        self.root = Path(directory or tempfile.gettempdir()) / "deltalink-spill"
+        # Set in each process, workers forked after the import included
+        self.directory: Path | None = None
+        self._pid: int | None = None
+        self._results: OrderedDict[str, SpilledResult] = OrderedDict()
+        self._lock = threading.Lock()
+        self._disk_bytes = 0
+        # Bytes of the files being written, not registered yet
+        self._reserved = 0
+
+        self._spilled = 0
+        self._downloads = 0
+        self._expired = 0
+        self._evicted = 0
+        self._rejected = 0
+
+    def _prepare_directory(self) -> Path:
+        with self._lock:
+            if self._pid != os.getpid():
+                self._pid = os.getpid()
+                self.directory = self.root / f"{self._pid}-{uuid.uuid4().hex[:8]}"
+                self._remove_stale()
+            self.directory.mkdir(parents=True, exist_ok=True)
+            return self.directory
+
+    def _remove_stale(self) -> None:
+        """
+        Remove the directories of the processes gone for longer than the TTL,
+        the lock must be held. The files of a result are touched on each
+        download, the directories of the live workers are left alone.
+        """
+
+        if not self.root.is_dir():
+            return
+        expired = time.time() - self.ttl
+        for stale in self.root.iterdir():
+            if stale == self.directory or not stale.is_dir():
+                continue
+            try:
+                paths = [stale, *stale.iterdir()]
+                if max(path.stat().st_mtime for path in paths) <= expired:
+                    shutil.rmtree(stale, ignore_errors=True)
+            except OSError:
+                # Removed by another worker meanwhile
+                continue
+
+    def collect(
+        self, schema: pa.Schema, batches: Iterable[pa.RecordBatch]
+    ) -> pa.Table | SpilledResult:
+        """
+        Read the batches of a result, into a table while it is smaller than
+        the threshold, or into a spilled file.
+        """
+
+        collected: list[pa.RecordBatch] = []
+        nbytes = 0
+        batches = iter(batches)
+        for batch in batches:
+            if not batch.schema.equals(schema):
+                batch = batch.cast(schema)
+            collected.append(batch)
+            nbytes += batch.nbytes
+            if self.enabled and nbytes > self.threshold_bytes:
+                return self._spill(schema, collected, batches)
+        return pa.Table.from_batches(collected, schema)
+
+    def _spill(
+        self,
+        schema: pa.Schema,
+        collected: list[pa.RecordBatch],
+        batches: Iterable[pa.RecordBatch],
+    ) -> SpilledResult:
+        directory = self._prepare_directory()
+        self._sweep()
+
+        extension = "parquet" if self.format == "parquet" else "arrow"
+        path = directory / f"{uuid.uuid4().hex}.{extension}"
+        partial = path.with_suffix(".tmp")
+        rows = nbytes = reserved = 0
+        writer = _SpillWriter(partial, self.format, schema)
+        try:
+
+            def write(batch: pa.RecordBatch) -> None:
+                nonlocal rows, nbytes, reserved
+                # Reserved by Arrow size, the file size is counted once written
+                self._reserve(batch.nbytes)
+                reserved += batch.nbytes
+                writer.write(batch)
+                rows += batch.num_rows
+                nbytes += batch.nbytes
+
+            for batch in collected:
+                write(batch)
+            collected.clear()
+            for batch in batches:
+                if not batch.schema.equals(schema):
+                    batch = batch.cast(schema)
+                write(batch)
+            writer.close()
+            partial.replace(path)
+        except BaseException:
+            writer.close()
+            partial.unlink(missing_ok=True)
+            with self._lock:
+                self._reserved -= reserved
+            raise
+
+        result = SpilledResult(path, self.format, rows, nbytes, self.ttl)
+        with self._lock:
+            self._reserved -= reserved
+            self._results[result.id] = result
+            self._disk_bytes += result.size
+            self._spilled += 1
+        return result
+
+    def _reserve(self, nbytes: int) -> None:
+        """
+        Make room for a batch being written, or raise SpillQuotaExceeded.
+        """
+
+        with self._lock:
+            while self._disk_bytes + self._reserved + nbytes > self.max_disk_bytes:
+                if not self._results:
+                    self._rejected += 1
+                    raise SpillQuotaExceeded(
+                        "The query result is larger than the space left to "
+                        "spill it to disk"
+                    )
+                _, oldest = self._results.popitem(last=False)
+                self._remove(oldest)
+                self._evicted += 1
+            self._reserved += nbytes
+
+    def _remove(self, result: SpilledResult) -> None:
+        """
+        Remove the file of a result, the lock must be held.
+        """
+
+        self._disk_bytes -= result.size
+        # A download in progress keeps reading the unlinked file
+        result.path.unlink(missing_ok=True)
+
+    def _sweep(self) -> None:
+        now = time.time()
+        with self._lock:
+            for result in list(self._results.values()):
+                if result.expires_at <= now:
+                    del self._results[result.id]
+                    self._remove(result)
+                    self._expired += 1
+
+    def get(self, result_id: str) -> SpilledResult | None:
+        """
+        Result to download, its TTL starts over so the download can resume.
+        """
+
+        self._sweep()
+        with self._lock:
+            result = self._results.get(result_id)
+            if result is None:
+                return None
+            self._results.move_to_end(result_id)
+            result.expires_at = time.time() + self.ttl
+            # The other workers tell a live result from its modification time
+            with contextlib.suppress(OSError):
+                os.utime(result.path)
+            self._downloads += 1
+            return result
+
+    def delete(self, result_id: str) -> bool:
+        with self._lock:
+            result = self._results.pop(result_id, None)
+            if result is None:
+                return False
+            self._remove(result)
+            return True
+
+    def clear(self) -> None:
+        with self._lock:
+            for result in self._results.values():
+                self._remove(result)
+            self._results.clear()
+            if self.directory is not None and self._pid == os.getpid():
+                shutil.rmtree(self.directory, ignore_errors=True)
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "format": self.format,
+                "results": len(self._results),
+                "disk_bytes": self._disk_bytes,
+                "writing_bytes": self._reserved,
+                "spilled": self._spilled,
+                "downloads": self._downloads,
+                "expired": self._expired,
+                "evicted": self._evicted,
+                "rejected": self._rejected,
+            }
+
+
+result_spill = ResultSpill(
+    enabled=settings.RESULT_SPILL_ENABLED,
+    threshold_bytes=settings.RESULT_SPILL_BYTES,
+    max_disk_bytes=settings.RESULT_SPILL_MAX_DISK_BYTES,
+    ttl=settings.RESULT_SPILL_TTL_SECONDS,
+    format=settings.RESULT_SPILL_FORMAT,
+    directory=settings.RESULT_SPILL_DIR,
+)
@@ -0,0 +1,486 @@
+import copy
+import threading
+from collections import OrderedDict
+from collections.abc import Iterator
+from contextlib import contextmanager
+from datetime import UTC, datetime
+from typing import Any
+
+import daft
+import pyarrow as pa
+import pyarrow.compute as pc
+from daft import context
+from daft.daft import (
+    IOConfig,
+    PyPartitionField,
+    PyPushdowns,
+    ScanOperatorHandle,
+    ScanTask,
+    StorageConfig,
+)
+from daft.delta_lake.delta_lake_scan import DeltaLakeScanOperator
+from daft.io.object_store_options import io_config_to_storage_options
+from daft.io.scan import ScanOperator
+from daft.logical.builder import LogicalPlanBuilder
+from daft.logical.schema import Schema
+from daft.unity_catalog import UnityCatalogTable
+from deltalake import DeltaTable as DeltaLakeTable
+from fastapi.logger import logger
+
+from deltalink.core.config import settings
+from deltalink.core.pruning import (
+    collecting_scan_reports,
+    file_mask,
+    record_scan,
+    scan_report,
+)
+
+
+def storage_options(uc_table: UnityCatalogTable) -> dict[str, str]:
+    """
+    Storage options for delta-rs, built from the credentials vended by UC.
+    """
+
+    io_config = uc_table.io_config
+    if io_config is None:
+        return {}
+    if io_config.azure.sas_token:
+        return {"SAS_TOKEN": io_config.azure.sas_token}
+
+    return io_config_to_storage_options(io_config, uc_table.table_uri) or {}
+
+
+class DeltaSnapshot:
+    """
+    Immutable view of one version of a Delta table.
+    It holds what daft needs to plan a scan, so a snapshot can be shared by
+    concurrent queries while the handle it was taken from moves forward.
+    """
+
+    def __init__(self, table: DeltaLakeTable):
+        self.table_uri = table.table_uri
+        self.version = table.version()
+        self._metadata = table.metadata()
+        self._schema = table.schema()
+        self._add_actions: pa.RecordBatch = table.get_add_actions()
+
+    @property
+    def nbytes(self) -> int:
+        return self._add_actions.nbytes
+
+    @property
+    def size_bytes(self) -> int:
+        """
+        Bytes of the data files of the snapshot, from their add actions.
+        """
+
+        return pc.sum(self._add_actions["size_bytes"]).as_py() or 0
+
+    def metadata(self):
+        return self._metadata
+
+    def schema(self):
+        return self._schema
+
+    def get_add_actions(self) -> pa.RecordBatch:
+        return self._add_actions
+
+    def prune(self, predicate: daft.Expression) -> "DeltaSnapshot":
+        """
+        The same snapshot without the files that can't hold rows matching the
+        predicate, from their partition values and min/max statistics.
+        The predicate still has to be applied to the rows that are read.
+        """
+
+        mask = file_mask(self._add_actions, predicate)
+        if mask is None:
+            return self
+
+        pruned = copy.copy(self)
+        pruned._add_actions = self._add_actions.filter(mask)
+        return pruned
+
+    def to_daft(
+        self, io_config: IOConfig | None = None, table: str | None = None
+    ) -> daft.DataFrame:
+        """
+        Same as `daft.read_deltalake`, without loading the table again.
+        The scans are reported under the full name of the table, when given.
+        """
+
+        multithreaded_io = context.get_context().get_or_create_runner().name != "ray"
+        if io_config is None:
+            io_config = context.get_context().daft_planning_config.default_io_config
+
+        operator = _SnapshotScanOperator(
+            self, StorageConfig(multithreaded_io, io_config), table
+        )
+        handle = ScanOperatorHandle.from_python_scan_operator(operator)
+        builder = LogicalPlanBuilder.from_tabular_scan(scan_operator=handle)
+        return daft.DataFrame(builder)
+
+
+class _SnapshotScanOperator(DeltaLakeScanOperator):
+    """
+    daft's Delta Lake scan over an already loaded snapshot.
+    """
+
+    def __init__(
+        self,
+        snapshot: DeltaSnapshot,
+        storage_config: StorageConfig,
+        table: str | None = None,
+    ):
+        ScanOperator.__init__(self)
+
+        self._table = snapshot
+        self._name = table or snapshot.table_uri
+        self._storage_config = storage_config
+        self._schema = Schema.from_pyarrow_schema(snapshot.schema().to_pyarrow())
+        partition_columns = set(snapshot.metadata().partition_columns)
+        self._partition_keys = [
+            PyPartitionField(field._field)
+            for field in self._schema
+            if field.name in partition_columns
+        ]
+
+    def to_scan_tasks(self, pushdowns: PyPushdowns) -> Iterator[ScanTask]:
+        scan_tasks = super().to_scan_tasks(pushdowns)
+        if not collecting_scan_reports():
+            return scan_tasks
+
+        scan_tasks = list(scan_tasks)
+        snapshot: DeltaSnapshot = self._table
+        record_scan(
+            scan_report(
+                self._name,
+                snapshot.table_uri,
+                snapshot.version,
+                snapshot.get_add_actions(),
+                pushdowns,
+                len(scan_tasks),
+            )
+        )
+        return iter(scan_tasks)
+
+
+class _CachedTable:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.storage_options: dict[str, str] | None = None
+        self.table: DeltaLakeTable | None = None
+        self.snapshot: DeltaSnapshot | None = None
+        self.nbytes = 0
+
+
+class DeltaTableCache:
+    """
+    Process-wide cache of the loaded Delta tables, keyed by table URI.
+    A cached handle is brought up to date with an incremental read of the
+    transaction log instead of a replay from the last checkpoint. Tables
+    are evicted by LRU once there are too many, or they take too much memory.
+    """
+
+    def __init__(self, max_tables: int, max_bytes: int):
+        self.max_tables = max_tables
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict[str, _CachedTable] = OrderedDict()
+        self._lock = threading.Lock()
+
+        self._hits = 0
+        self._loads = 0
+        self._refreshes = 0
+        self._stale_reads = 0
+        self._evictions = 0
+
+    def _entry(self, table_uri: str) -> _CachedTable:
+        with self._lock:
+            entry = self._entries.get(table_uri)
+            if entry is None:
+                entry = self._entries[table_uri] = _CachedTable()
+            self._entries.move_to_end(table_uri)
+            return entry
+
+    def _refresh(
+        self, entry: _CachedTable, table_uri: str, options: dict[str, str]
+    ) -> DeltaLakeTable:
+        """
+        Load or update the handle of the entry, its lock must be held.
+        """
+
+        # New credentials can't be given to an existing handle
+        if entry.table is None or entry.storage_options != options:
+            logger.debug(f"Loading Delta table {table_uri}")
+            entry.table = DeltaLakeTable(table_uri, storage_options=options)
+            entry.storage_options = options
+            entry.snapshot = None
+            self._loads += 1
+            return entry.table
+
+        version = entry.table.version()
+        entry.table.update_incremental()
+        if entry.table.version() == version:
+            self._hits += 1
+        else:
+            self._refreshes += 1
+
+        return entry.table
+
+    def _evict(self) -> None:
+        with self._lock:
+            total = sum(e.nbytes for e in self._entries.values())
+            while len(self._entries) > 1 and (
+                len(self._entries) > self.max_tables or total > self.max_bytes
+            ):
+                _, entry = self._entries.popitem(last=False)
+                total -= entry.nbytes
+                self._evictions += 1
+
+    @contextmanager
+    def acquire(
+        self, table_uri: str, options: dict[str, str]
+    ) -> Iterator[DeltaLakeTable]:
+        """
+        Exclusive use of the up to date handle of a table, used for writes.
+        """
+
+        entry = self._entry(table_uri)
+        with entry.lock:
+            yield self._refresh(entry, table_uri, options)
+        self._evict()
+
+    def snapshot(self, table_uri: str, options: dict[str, str]) -> DeltaSnapshot:
+        """
+        The latest snapshot of a table, used for reads.
+        While a write holds the handle, the snapshot taken before that write
+        is returned instead of waiting for it.
+        """
+
+        entry = self._entry(table_uri)
+        previous = entry.snapshot
+        if previous is not None and not entry.lock.acquire(blocking=False):
+            self._stale_reads += 1
+            return previous
+        if previous is None:
+            entry.lock.acquire()
+
+        try:
+            table = self._refresh(entry, table_uri, options)
+            if entry.snapshot is None or entry.snapshot.version != table.version():
+                entry.snapshot = DeltaSnapshot(table)
+                # The handle holds the same state as its snapshot
+                entry.nbytes = 2 * entry.snapshot.nbytes
+            snapshot = entry.snapshot
+        finally:
+            entry.lock.release()
+
+        self._evict()
+        return snapshot
+
+    def invalidate(self, table_uri: str) -> None:
+        with self._lock:
+            self._entries.pop(table_uri, None)
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "tables": len(self._entries),
+                "bytes": sum(e.nbytes for e in self._entries.values()),
+                "hits": self._hits,
+                "loads": self._loads,
+                "refreshes": self._refreshes,
+                "stale_reads": self._stale_reads,
+                "evictions": self._evictions,
+            }
+
+
+table_cache = DeltaTableCache(
+    max_tables=settings.TABLE_CACHE_MAX_TABLES,
+    max_bytes=settings.TABLE_CACHE_MAX_BYTES,
+)
+
+
+class PinnedSnapshotCache:
+    """
+    LRU of the snapshots of past table versions, read with time travel,
+    keyed by table URI and version. A committed version never changes, so
+    an entry is never refreshed and reading the version again skips the
+    replay of the log. The version a timestamp resolves to is kept as well,
+    once a later commit makes it final.
+    """
+
+    def __init__(self, max_snapshots: int, max_bytes: int):
+        self.max_snapshots = max_snapshots
+        self.max_bytes = max_bytes
+        self._snapshots: OrderedDict[tuple[str, int], DeltaSnapshot] = OrderedDict()
+        self._timestamps: OrderedDict[tuple[str, datetime], int] = OrderedDict()
+        self._lock = threading.Lock()
+        self._bytes = 0
+
+        self._hits = 0
+        self._loads = 0
+        self._evictions = 0
+
+    def get(self, table_uri: str, version: int) -> DeltaSnapshot | None:
+        with self._lock:
+            snapshot = self._snapshots.get((table_uri, version))
+            if snapshot is not None:
+                self._snapshots.move_to_end((table_uri, version))
+                self._hits += 1
+            return snapshot
+
+    def put(self, table_uri: str, snapshot: DeltaSnapshot) -> None:
+        key = (table_uri, snapshot.version)
+        with self._lock:
+            previous = self._snapshots.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous.nbytes
+            self._snapshots[key] = snapshot
+            self._bytes += snapshot.nbytes
+            self._loads += 1
+            while len(self._snapshots) > 1 and (
+                len(self._snapshots) > self.max_snapshots
+                or self._bytes > self.max_bytes
+            ):
+                _, evicted = self._snapshots.popitem(last=False)
+                self._bytes -= evicted.nbytes
+                self._evictions += 1
+
+    def version_at(self, table_uri: str, timestamp: datetime) -> int | None:
+        with self._lock:
+            return self._timestamps.get((table_uri, timestamp))
+
+    def put_version_at(self, table_uri: str, timestamp: datetime, version: int) -> None:
+        with self._lock:
+            self._timestamps[(table_uri, timestamp)] = version
+            while len(self._timestamps) > self.max_snapshots:
+                self._timestamps.popitem(last=False)
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "snapshots": len(self._snapshots),
+                "bytes": self._bytes,
+                "timestamps": len(self._timestamps),
+                "hits": self._hits,
+                "loads": self._loads,
+                "evictions": self._evictions,
+            }
+
+
+pinned_snapshots = PinnedSnapshotCache(
+    max_snapshots=settings.PINNED_SNAPSHOT_MAX_SNAPSHOTS,
+    max_bytes=settings.PINNED_SNAPSHOT_MAX_BYTES,
+)
+
+
+def _pinned_snapshot(
+    table_uri: str, version: int, options: dict[str, str]
+) -> DeltaSnapshot:
+    snapshot = pinned_snapshots.get(table_uri, version)
+    if snapshot is None:
+        logger.debug(f"Loading version {version} of Delta table {table_uri}")
+        snapshot = DeltaSnapshot(
+            DeltaLakeTable(table_uri, version=version, storage_options=options)
+        )
+        pinned_snapshots.put(table_uri, snapshot)
+    return snapshot
+
+
+def _created_at(table: DeltaLakeTable) -> datetime:
+    """
+    Time of the first commit of a table loaded at its version 0.
+    """
+
+    created = table.metadata().created_time
+    if created is None:
+        created = next(
+            commit["timestamp"]
+            for commit in table.history()
+            if commit.get("version") == 0
+        )
+    return datetime.fromtimestamp(created / 1000, UTC)
+
+
+def _version_at(
+    table_uri: str, timestamp: datetime, options: dict[str, str], latest: int
+) -> int:
+    """
+    Version of a table as of the given time, from the commits in its log.
+    A time before the table was created is a ValueError.
+    """
+
+    version = pinned_snapshots.version_at(table_uri, timestamp)
+    if version is not None:
+        return version
+
+    # Only the log is read to find the version, the files are loaded after
+    table = DeltaLakeTable(table_uri, storage_options=options, without_files=True)
+    table.load_as_version(timestamp)
+    version = table.version()
+    # delta-rs reads a time before the first commit as version 0
+    if version == 0 and timestamp < (created := _created_at(table)):
+        raise ValueError(
+            f"{table_uri} didn't exist yet at {timestamp.isoformat()}, "
+            f"it was created at {created.isoformat()}"
+        )
+    # The latest version can still get a commit before the timestamp
+    if version < latest:
+        pinned_snapshots.put_version_at(table_uri, timestamp, version)
+    return version
+
+
+def load_snapshot(
+    uc_table: UnityCatalogTable, version: int | datetime | None = None
+) -> DeltaSnapshot:
+    """
+    The latest snapshot of a UC table through the table cache, or the
+    snapshot of the given version, or as of the given time, through the
+    pinned snapshots.
+    """
+
+    options = storage_options(uc_table)
+    if isinstance(version, int):
+        pinned = pinned_snapshots.get(uc_table.table_uri, version)
+        if pinned is not None:
+            return pinned
+
+    snapshot = table_cache.snapshot(uc_table.table_uri, options)
+    if version is None or snapshot.version == version:
+        return snapshot
+
+    if isinstance(version, datetime):
+        if version.tzinfo is None:
+            version = version.replace(tzinfo=UTC)
+        version = _version_at(uc_table.table_uri, version, options, snapshot.version)
+        if version == snapshot.version:
+            return snapshot
+    elif version > snapshot.version:
+        raise ValueError(
+            f"Version {version} of {uc_table.table_uri} doesn't exist yet, "
+            f"the latest version is {snapshot.version}"
+        )
+    return _pinned_snapshot(uc_table.table_uri, version, options)
+
+
+def table_name(uc_table: UnityCatalogTable) -> str | None:
+    """
+    Full name of a UC table, catalog, schema and table.
+    """
+
+    info = uc_table.table_info
+    if info is None:
+        return None
+    return f"{info.catalog_name}.{info.schema_name}.{info.name}"
+
+
+def read_deltalake(
+    uc_table: UnityCatalogTable, snapshot: DeltaSnapshot | None = None
+) -> daft.DataFrame:
+    """
+    Read a UC table with daft, from the given snapshot or the latest one.
+    """
+
+    if snapshot is None:
+        snapshot = load_snapshot(uc_table)
+    return snapshot.to_daft(uc_table.io_config, table_name(uc_table))
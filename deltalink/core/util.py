@@ -1,20 +1,32 @@
-from collections.abc import Iterable
-from typing import Literal
+import contextvars
+import time
+from collections.abc import Iterable, Iterator
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime
+from functools import partial
+from typing import Literal, NamedTuple
 
 import daft
-from cachetools import TTLCache
 from daft.unity_catalog import UnityCatalog, UnityCatalogTable
 from fastapi.logger import logger
 from fastapi_msal import MSALClientConfig
 
-from deltalink.core.config import Settings
+from deltalink.core.config import Settings, settings
+from deltalink.core.credentials import access_denied, credentials
+from deltalink.core.metrics import span
+from deltalink.core.tables import (
+    load_snapshot,
+    read_deltalake,
+    table_cache,
+    table_name,
+)
 
-DEFAULT_TIME_TO_LIVE = 60 * 60 - 30  # 1 hour minus 30 seconds
-
-# cache: dict[str, UnityCatalogTable] = {}
-cache = TTLCache(
-    ttl=DEFAULT_TIME_TO_LIVE, maxsize=10000000
-)  # Cache for UnityCatalogTable objects
+# Shared by the queries, bounds the tables being resolved at once
+_resolver = ThreadPoolExecutor(
+    max_workers=settings.TABLE_RESOLUTION_WORKERS,
+    thread_name_prefix="deltalink-resolve",
+)
 
 
 def ensure_io_from_tables(
@@ -25,37 +37,130 @@ def ensure_io_from_tables(
     """
     Ensure that the tables are loaded from the catalog and cached.
     This is used to avoid loading the same table multiple times.
-    Each load will result to a access token for the table in UC
+    Each load will result to a access token for the table in UC,
+    see CredentialManager for how they are cached and refreshed.
     """
 
     for table in tables:
-        if table not in cache:
-            logger.debug(f"Loading credentials for {table}")
-            unity_table: UnityCatalogTable = catalog.load_table(
-                table, operation=operation, table_type="MANAGED"
-            )
-            cache[table] = unity_table
-            yield unity_table
-        else:
-            logger.debug(f"Using cached table for {table}")
-            yield cache[table]
-
-
-def table_config(catalog: UnityCatalog, tables: list[str]) -> dict[str, daft.DataFrame]:
+        yield credentials.get(catalog, table, operation)
+
+
+@contextmanager
+def forget_denied(table: str, table_uri: str) -> Iterator[None]:
+    """
+    Forget the credentials and the cached Delta table of a table when the
+    storage denies them, instead of failing with them until they expire.
+    """
+
+    try:
+        yield
+    except Exception as e:
+        if access_denied(e):
+            logger.warning(f"Access to {table} denied, forgetting its credentials")
+            credentials.invalidate(table)
+            table_cache.invalidate(table_uri)
+        raise
+
+
+class ResolvedTable(NamedTuple):
+    name: str
+    """Full name of the table in UC."""
+
+    version: int
+    """Version of the Delta table the DataFrame reads."""
+
+    uc_table: UnityCatalogTable
+    """UC table holding the credentials the DataFrame reads with."""
+
+    df: daft.DataFrame
+
+    elapsed: float
+    """Seconds spent loading the credentials and the snapshot."""
+
+    size_bytes: int = 0
+    """Bytes of the data files of the version read."""
+
+
+def _resolve_table(
+    catalog: UnityCatalog, table: str, version: int | datetime | None = None
+) -> ResolvedTable:
+    start = time.perf_counter()
+
+    with span("credentials"):
+        uc_table = next(iter(ensure_io_from_tables(catalog, [table])))
+    with span("load"), forget_denied(table, uc_table.table_uri):
+        snapshot = load_snapshot(uc_table, version)
+    df = read_deltalake(uc_table, snapshot)
+
+    return ResolvedTable(
+        table_name(uc_table),
+        snapshot.version,
+        uc_table,
+        df,
+        time.perf_counter() - start,
+        snapshot.size_bytes,
+    )
+
+
+def _resolve_in_context(
+    catalog: UnityCatalog,
+    context: contextvars.Context,
+    table: str,
+    version: int | datetime | None,
+) -> ResolvedTable:
+    return context.run(_resolve_table, catalog, table, version)
+
+
+def resolve_tables(
+    catalog: UnityCatalog,
+    tables: list[str],
+    versions: list[int | datetime | None] | None = None,
+) -> list[ResolvedTable]:
     """
-    Load the tables from the catalog and return a dictionary of DataFrames.
+    Load the tables from the catalog, with the version of each of them.
+    The latest versions are read unless `versions` pins one per table,
+    a version number or the time to read the table as of.
+    The tables are resolved concurrently, so a join waits for the slowest
+    table rather than the sum of them.
     """
 
-    catalog_config = {}
+    if versions is None:
+        versions = [None] * len(tables)
+    elif len(versions) != len(tables):
+        raise ValueError(f"Expected {len(tables)} table versions, got {len(versions)}")
+
+    if len(tables) > 1:
+        # One copy of the context per table, a context can't be entered twice
+        contexts = [contextvars.copy_context() for _ in tables]
+        resolve = partial(_resolve_in_context, catalog)
+        resolved = list(_resolver.map(resolve, contexts, tables, versions))
+    else:
+        resolved = [
+            _resolve_table(catalog, table, version)
+            for table, version in zip(tables, versions, strict=True)
+        ]
+
+    for table in resolved:
+        logger.debug(f"Resolved {table.name}@{table.version} in {table.elapsed:.3f}s")
+
+    return resolved
 
-    uc_tables: list[UnityCatalogTable] = list(ensure_io_from_tables(catalog, tables))
 
-    for uc_table in uc_tables:
-        df = daft.read_deltalake(uc_table)
-        table_name = f"{uc_table.table_info.catalog_name}.{uc_table.table_info.schema_name}.{uc_table.table_info.name}"  # noqa: E501
-        catalog_config[table_name] = df
+def pinned_versions(
+    tables: list[str],
+    versions: dict[str, int] | None = None,
+    timestamp: datetime | None = None,
+) -> list[int | datetime | None]:
+    """
+    Version, or time, each table of a query is read as of. A table not
+    pinned by `versions` is read as of `timestamp`, or its latest version.
+    """
 
-    return catalog_config
+    pins = versions or {}
+    unknown = ", ".join(sorted(set(pins) - set(tables)))
+    if unknown:
+        raise ValueError(f"Tables pinned to a version are not in the query: {unknown}")
+    return [pins.get(table, timestamp) for table in tables]
 
 
 def get_auth_config(settings: Settings):
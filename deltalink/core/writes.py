@@ -0,0 +1,170 @@
+import asyncio
+import random
+import threading
+import time
+from collections.abc import AsyncIterator, Callable
+from contextlib import asynccontextmanager
+from typing import Any, TypeVar
+
+from deltalake.exceptions import CommitFailedError
+from fastapi.logger import logger
+
+from deltalink.core.config import settings
+from deltalink.core.executor import BoundedExecutor, write_executor
+from deltalink.core.metrics import commit_conflicts_total, commit_retries_total
+
+T = TypeVar("T")
+
+# Conflicts that change what the write means, running it again could be wrong
+_FATAL_CONFLICTS = ("metadata changed", "protocol changed", "unsupported")
+
+
+def retryable(error: CommitFailedError) -> bool:
+    message = str(error).lower()
+    return not any(conflict in message for conflict in _FATAL_CONFLICTS)
+
+
+class _TableQueue:
+    def __init__(self):
+        self.lock = asyncio.Lock()
+        self.waiting = 0
+
+
+class TableWriteScheduler:
+    """
+    Run the writes to a table one at a time, in the order they arrive, while
+    the writes to other tables run in parallel. A write waits for its turn on
+    the event loop, not in a worker thread, so a busy table doesn't hold the
+    writers of the others.
+
+    A commit rejected by the optimistic concurrency of Delta, because another
+    process wrote to the table, is run again on the latest version with an
+    exponential backoff, up to a number of attempts. The conflicts on the
+    metadata or the protocol of the table are not retried.
+
+    Appends are not queued, blind appends never conflict with other writes.
+    """
+
+    def __init__(self, max_attempts: int, backoff: float, max_backoff: float):
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+
+        self._queues: dict[str, _TableQueue] = {}
+        self._lock = threading.Lock()
+        self._writes = 0
+        self._conflicts = 0
+        self._retries = 0
+        self._failures = 0
+
+    @asynccontextmanager
+    async def serialize(self, table_uri: str) -> AsyncIterator[None]:
+        """
+        Wait for the writes queued before on the table, and hold it.
+        """
+
+        queue = self._queues.get(table_uri)
+        if queue is None:
+            queue = self._queues[table_uri] = _TableQueue()
+        queue.waiting += 1
+        try:
+            async with queue.lock:
+                yield
+        finally:
+            queue.waiting -= 1
+            if queue.waiting == 0:
+                del self._queues[table_uri]
+
+    def delay(self, attempt: int) -> float:
+        """
+        Backoff before the given retry, with jitter so the writers that
+        conflicted don't collide again.
+        """
+
+        delay = min(self.backoff * 2 ** (attempt - 1), self.max_backoff)
+        return delay * random.uniform(0.5, 1.0)
+
+    def commit(
+        self,
+        fn: Callable[..., T],
+        *args: Any,
+        table_name: str,
+        operation: str,
+    ) -> T:
+        """
+        Run a write, blocking, again as long as its commit conflicts with a
+        concurrent one. The write must load the latest version of the table.
+        """
+
+        attempt = 1
+        while True:
+            try:
+                result = fn(*args)
+            except CommitFailedError as e:
+                with self._lock:
+                    self._conflicts += 1
+                commit_conflicts_total.labels(
+                    table=table_name, operation=operation
+                ).inc()
+
+                if not retryable(e) or attempt >= self.max_attempts:
+                    with self._lock:
+                        self._failures += 1
+                    raise
+
+                delay = self.delay(attempt)
+                logger.warning(
+                    f"Commit {attempt} of the {operation} of {table_name} "
+                    f"conflicted, retrying in {delay:.3f}s: {e!s}"
+                )
+                with self._lock:
+                    self._retries += 1
+                commit_retries_total.labels(table=table_name, operation=operation).inc()
+                time.sleep(delay)
+                attempt += 1
+                continue
+
+            with self._lock:
+                self._writes += 1
+            return result
+
+    async def run(
+        self,
+        table_uri: str,
+        table_name: str,
+        operation: str,
+        fn: Callable[..., T],
+        *args: Any,
+        executor: BoundedExecutor = write_executor,
+    ) -> T:
+        """
+        Queue a write to the table, then run it in the executor.
+        """
+
+        async with self.serialize(table_uri):
+            return await executor.run(
+                self.commit, fn, *args, table_name=table_name, operation=operation
+            )
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            counts = {
+                "writes": self._writes,
+                "conflicts": self._conflicts,
+                "retries": self._retries,
+                "failures": self._failures,
+            }
+        return {
+            "max_attempts": self.max_attempts,
+            **counts,
+            # Tables being written, and their writes running or queued
+            "tables": len(self._queues),
+            "pending": sum(queue.waiting for queue in self._queues.values()),
+        }
+
+
+write_scheduler = TableWriteScheduler(
+    max_attempts=settings.WRITE_MAX_ATTEMPTS,
+    backoff=settings.WRITE_RETRY_BACKOFF_MS / 1000,
+    max_backoff=settings.WRITE_RETRY_MAX_BACKOFF_MS / 1000,
+)
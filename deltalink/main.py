@@ -1,3 +1,5 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.routing import APIRoute
 from starlette.middleware.sessions import SessionMiddleware
@@ -5,16 +7,40 @@ from starlette.middleware.sessions import SessionMiddleware
 from deltalink.api.catalog import router as catalog_router
 from deltalink.api.data import router as data_router
 from deltalink.api.health import router as health_router
+from deltalink.api.jobs import router as jobs_router
 from deltalink.api.sql import router as sql_router
 from deltalink.api.user import router as user_router
 from deltalink.core.auth import get_auth
+from deltalink.core.coalescer import append_coalescer
 from deltalink.core.config import settings
+from deltalink.core.credentials import credentials
+from deltalink.core.executor import shutdown_executors
+from deltalink.core.jobs import query_jobs
+from deltalink.core.maintenance import maintenance
+from deltalink.core.metrics import ServerTimingMiddleware
+from deltalink.core.runners import query_runner
+from deltalink.core.spill import result_spill
 
 
 def custom_generate_unique_id(route: APIRoute) -> str:
     return f"{route.tags[0]}-{route.name}"
 
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Under uvicorn or gunicorn too, each worker sets its runner up
+    query_runner.start()
+    query_jobs.start()
+    yield
+    await append_coalescer.close()
+    await query_jobs.close()
+    result_spill.clear()
+    await maintenance.close()
+    credentials.shutdown()
+    shutdown_executors()
+    query_runner.shutdown()
+
+
 msal_auth = get_auth()
 
 app = FastAPI(
@@ -25,12 +51,16 @@ app = FastAPI(
                     Databricks Compute.""",
     openapi_url=f"{settings.API_V1_STR}/openapi.json",
     generate_unique_id_function=custom_generate_unique_id,
+    lifespan=lifespan,
 )
 app.add_middleware(SessionMiddleware, secret_key=settings.SESSION_KEY)
+# Outermost, so the timings cover the whole request
+app.add_middleware(ServerTimingMiddleware)
 
 app.include_router(msal_auth.router)
 app.include_router(data_router, prefix=settings.API_V1_STR)
 app.include_router(sql_router, prefix=settings.API_V1_STR)
+app.include_router(jobs_router, prefix=settings.API_V1_STR)
 app.include_router(catalog_router, prefix=settings.API_V1_STR)
 app.include_router(user_router, prefix=settings.API_V1_STR)
 app.include_router(health_router)
@@ -38,12 +68,4 @@ app.include_router(health_router)
 if __name__ == "__main__":
     import uvicorn
 
-    if settings.RAY_ENABLED:
-        import daft
-        import ray
-
-        ray.init()
-
-        daft.context.set_runner_ray(settings.RAY_ENDPOINT)
-
     uvicorn.run(app, host="localhost", port=8000)
@@ -1,7 +1,8 @@
 from collections.abc import Iterable
+from datetime import datetime
 from typing import Literal, Optional
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field, model_validator
 
 
 class DeltaTableColumn(BaseModel):
@@ -124,6 +125,50 @@ class DeltaTablePredicate(BaseModel):
     }
 
 
+class DeltaTableRead(BaseModel):
+    catalog_name: str
+    schema_name: str
+    table_name: str
+    columns: Optional[list[str]] = None
+    """Columns to return, all of them when not set."""
+
+    predicates: Optional[list[DeltaTablePredicate]] = None
+    """Conditions the returned rows must all match."""
+
+    limit: Optional[int] = Field(default=None, gt=0)
+    """Maximum number of rows to return."""
+
+    version: Optional[int] = Field(default=None, ge=0)
+    """Version of the table to read, the latest when not set."""
+
+    timestamp: Optional[datetime] = None
+    """Time to read the table as of, UTC when it has no time zone."""
+
+    @model_validator(mode="after")
+    def check_version(self) -> "DeltaTableRead":
+        if self.version is not None and self.timestamp is not None:
+            raise ValueError("Either version or timestamp can be set, not both")
+        return self
+
+    model_config = {
+        "json_schema_extra": {
+            "examples": [
+                {
+                    "catalog_name": "main",
+                    "schema_name": "backhouse",
+                    "table_name": "sales_suppliers",
+                    "columns": ["supplierID", "name", "city"],
+                    "predicates": [
+                        {"column": "continent", "operator": "=", "value": "Europe"},
+                        {"column": "supplierID", "operator": "=", "value": "007"},
+                    ],
+                    "limit": 100,
+                }
+            ]
+        }
+    }
+
+
 class DeltaTableOptimization(BaseModel):
     catalog_name: str
     schema_name: str
@@ -131,6 +176,49 @@ class DeltaTableOptimization(BaseModel):
     partition_filters: Optional[list[DeltaTablePredicate]] = None
     """List of partition filters to apply during optimization."""
 
+    mode: Literal["compact", "z_order"] = "compact"
+    """Bin-packing of the small files, or clustering of the rows by Z-order."""
+
+    z_order_columns: Optional[list[str]] = None
+    """Columns to cluster the rows by, required by the Z-order mode."""
+
+    target_size: Optional[int] = Field(default=None, gt=0)
+    """Size of the files written in bytes, the table default when not set."""
+
+    max_concurrent_tasks: Optional[int] = Field(default=None, gt=0)
+    """Partitions optimized at once, the number of CPUs when not set."""
+
+    max_spill_size: Optional[int] = Field(default=None, gt=0)
+    """Bytes the Z-order sort can spill to disk before failing."""
+
+    @model_validator(mode="after")
+    def check_mode(self) -> "DeltaTableOptimization":
+        if self.mode == "z_order" and not self.z_order_columns:
+            raise ValueError("The Z-order mode requires z_order_columns")
+        if self.mode == "compact" and (self.z_order_columns or self.max_spill_size):
+            raise ValueError(
+                "z_order_columns and max_spill_size are only used by the Z-order mode"
+            )
+        return self
+
+    model_config = {
+        "json_schema_extra": {
+            "examples": [
+                {
+                    "catalog_name": "main",
+                    "schema_name": "backhouse",
+                    "table_name": "sales_suppliers",
+                    "mode": "z_order",
+                    "z_order_columns": ["supplierID"],
+                    "partition_filters": [
+                        {"column": "continent", "operator": "=", "value": "Europe"}
+                    ],
+                    "target_size": 128 * 1024 * 1024,
+                }
+            ]
+        }
+    }
+
 
 class DeltaTableMerge(BaseModel):
     catalog_name: str
@@ -141,6 +229,11 @@ class DeltaTableMerge(BaseModel):
     updates: Optional[dict[str, str]] = None
     """mapping of target column to source column"""
 
+    batch_rows: Optional[int] = Field(default=None, gt=0)
+    """Rows merged per commit. When set, the rows are grouped by the partitions
+    of the table and merged in batches, each commit only rewriting the
+    partitions of its rows, and the progress is streamed back as NDJSON."""
+
     model_config = {
         "json_schema_extra": {
             "examples": [
@@ -218,6 +311,53 @@ class DeltaTableDelete(BaseModel):
     predicate: str  # condition for matching rows
 
 
+class DeltaTablePredicateDelete(BaseModel):
+    catalog_name: str
+    schema_name: str
+    table_name: str
+
+    key_column: Optional[str] = None
+    """Column holding the keys of the rows to delete."""
+
+    keys: Optional[list[str | int | float | bool]] = None
+    """Keys of the rows to delete, converted to the type of the key column."""
+
+    predicates: Optional[list[DeltaTablePredicate]] = None
+    """Conditions the rows to delete match, instead of keys."""
+
+    @model_validator(mode="after")
+    def check_condition(self) -> "DeltaTablePredicateDelete":
+        by_keys = self.key_column is not None or self.keys is not None
+        if by_keys == bool(self.predicates):
+            raise ValueError("Either key_column and keys, or predicates are required")
+        if by_keys and (self.key_column is None or not self.keys):
+            raise ValueError("key_column and keys are required together")
+        return self
+
+    model_config = {
+        "json_schema_extra": {
+            "examples": [
+                {
+                    "catalog_name": "main",
+                    "schema_name": "backhouse",
+                    "table_name": "sales_suppliers",
+                    "key_column": "supplierID",
+                    "keys": ["007", "008"],
+                },
+                {
+                    "catalog_name": "main",
+                    "schema_name": "backhouse",
+                    "table_name": "sales_suppliers",
+                    "predicates": [
+                        {"column": "continent", "operator": "=", "value": "Europe"},
+                        {"column": "size", "operator": "=", "value": "S"},
+                    ],
+                },
+            ]
+        }
+    }
+
+
 class DeltaTableVacuum(BaseModel):
     catalog_name: str
     schema_name: str
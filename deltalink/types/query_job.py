@@ -0,0 +1,45 @@
+from datetime import datetime
+from typing import Literal, Optional
+
+from pydantic import BaseModel
+
+
+class QueryJobInfo(BaseModel):
+    id: str
+    """Identifier of the job."""
+
+    status: Literal["queued", "running", "succeeded", "failed", "cancelled"]
+    """Status of the job."""
+
+    phase: Optional[Literal["resolving", "planning", "executing"]] = None
+    """Step of the query being run, while the job is running."""
+
+    error: Optional[str] = None
+    """Why the job failed."""
+
+    submitted_at: datetime
+    """Time at which the job was submitted."""
+
+    started_at: Optional[datetime] = None
+    """Time at which the query started to run."""
+
+    finished_at: Optional[datetime] = None
+    """Time at which the job finished."""
+
+    expires_at: Optional[datetime] = None
+    """Time after which the job and its result are removed."""
+
+    rows: int = 0
+    """Rows of the result produced so far."""
+
+    batches: int = 0
+    """Record batches of the result produced so far."""
+
+    bytes: int = 0
+    """Size of the result produced so far, in Arrow memory."""
+
+    spilled: bool = False
+    """Whether the result was written to disk."""
+
+    timings: dict[str, float] = {}
+    """Seconds spent queued, resolving the tables, planning and executing."""
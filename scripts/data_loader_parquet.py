@@ -1,8 +1,7 @@
 import argparse
-import json
-from datetime import date, datetime
 
 import pandas as pd
+import pyarrow as pa
 import requests
 
 CHUNK_SIZE = 1000000  # Define the chunk size for processing
@@ -18,13 +17,12 @@ parser.add_argument(
 )
 
 
-class timestamp_encoder(json.JSONEncoder):
-    def default(self, obj):
-        if isinstance(obj, pd.Timestamp):
-            return str(obj)
-        if isinstance(obj, (datetime, date)):
-            return obj.isoformat()
-        return json.JSONEncoder.default(self, obj)
+def to_arrow_stream(chunk: pd.DataFrame) -> bytes:
+    table = pa.Table.from_pandas(chunk, preserve_index=False)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
 
 
 if __name__ == "__main__":
@@ -46,24 +44,22 @@ if __name__ == "__main__":
         end_index = min(chunk_num * CHUNK_SIZE + CHUNK_SIZE, len(df))
         chunk = df[start_index:end_index]
 
-        json_payload = chunk.to_dict(orient="records")
-
-        # call web api to send the chunk
+        # Send the chunk as an Arrow IPC stream, the table coordinates
+        # are given in the query string
         print(f"Chunk {chunk_num} processed with {len(chunk)} records.")
-        # Here you would typically send the json_payload to your web API
-        # For demonstration, we just print the first few lines
 
-        payload = {
+        params = {
             "catalog_name": "main",
             "schema_name": "iot",
             "table_name": "sensors",
             "partition_by": ["day"],
-            "values": json_payload,
         }
 
         r = requests.post(
             "http://localhost:8000/api/v1/data",
-            data=json.dumps(payload, cls=timestamp_encoder),
+            params=params,
+            data=to_arrow_stream(chunk),
+            headers={"Content-Type": "application/vnd.apache.arrow.stream"},
         )
         if r.status_code == 204:
             print(f"Chunk {chunk_num} successfully sent.")
@@ -0,0 +1,160 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+from starlette.requests import ClientDisconnect
+
+from deltalink.core.admission import AdmissionController, AdmittedResponse
+
+SCOPE = {"type": "http", "asgi": {"spec_version": "2.0"}}
+
+
+def controller(
+    memory_bytes: int = 100, concurrency: int = 2, queue_timeout: float = 1.0
+) -> AdmissionController:
+    return AdmissionController(
+        enabled=True,
+        memory_bytes=memory_bytes,
+        concurrency={"query": concurrency, "read": concurrency, "write": concurrency},
+        queue_timeout=queue_timeout,
+        max_queued=4,
+        retry_after=7,
+        scan_factor=2.0,
+        body_factor=4.0,
+    )
+
+
+def test_requests_beyond_the_concurrency_wait_in_order():
+    admission = controller(concurrency=1)
+    order = []
+
+    async def request(name: str, hold: float) -> None:
+        async with admission.admit("query", 10):
+            order.append(name)
+            await asyncio.sleep(hold)
+
+    async def main():
+        first = asyncio.create_task(request("first", 0.05))
+        await asyncio.sleep(0)
+        waiting = [asyncio.create_task(request(n, 0)) for n in ("second", "third")]
+        await asyncio.sleep(0.01)
+        assert admission.stats()["endpoints"]["query"]["waiting"] == 2
+        # The other endpoints are not limited by the queries
+        async with admission.admit("write", 10):
+            pass
+        await asyncio.gather(first, *waiting)
+
+    asyncio.run(main())
+    assert order == ["first", "second", "third"]
+
+    stats = admission.stats()
+    assert stats["used_bytes"] == 0
+    assert stats["endpoints"]["query"]["admitted"] == 3
+    assert stats["endpoints"]["query"]["queued"] == 2
+    assert stats["endpoints"]["query"]["running"] == 0
+
+
+def test_requests_are_rejected_with_retry_after():
+    admission = controller(concurrency=1, queue_timeout=0.01)
+
+    async def main():
+        async with admission.admit("read", 0):
+            with pytest.raises(HTTPException) as e:
+                await admission.acquire("read", 0)
+        return e.value
+
+    error = asyncio.run(main())
+    assert error.status_code == 429
+    assert error.headers == {"Retry-After": "7"}
+    assert admission.stats()["endpoints"]["read"]["rejected"] == 1
+
+    # Without a queue, they are rejected at once
+    admission = controller(concurrency=1, queue_timeout=0)
+
+    async def full():
+        async with admission.admit("read", 0):
+            with pytest.raises(HTTPException):
+                await admission.acquire("read", 0)
+
+    asyncio.run(full())
+
+
+def test_memory_budget_is_shared_by_the_endpoints():
+    admission = controller(memory_bytes=100, concurrency=4)
+
+    async def main():
+        query = await admission.acquire("query", 80)
+        write = asyncio.create_task(admission.acquire("write", 40))
+        await asyncio.sleep(0.01)
+        assert not write.done()
+
+        query.release()
+        ticket = await write
+        assert admission.stats()["used_bytes"] == 40
+        ticket.release()
+
+        # Larger than the whole budget, it runs alone
+        big = await admission.acquire("query", 1000)
+        assert big.cost == 100
+        small = asyncio.create_task(admission.acquire("read", 1))
+        await asyncio.sleep(0.01)
+        assert not small.done()
+        big.release()
+        (await small).release()
+
+    asyncio.run(main())
+    assert admission.stats()["used_bytes"] == 0
+
+
+def test_streamed_responses_hold_the_ticket_until_sent():
+    admission = controller()
+    sent = []
+
+    async def chunks():
+        yield b"a"
+        yield b"b"
+
+    async def receive():
+        await asyncio.sleep(1)
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        assert admission.stats()["used_bytes"] == 30
+        sent.append(message)
+
+    async def main():
+        async with admission.admit("query", 30) as ticket:
+            response = AdmittedResponse(ticket, chunks())
+        assert admission.stats()["used_bytes"] == 30
+        await response(SCOPE, receive, send)
+
+    asyncio.run(main())
+    assert [m.get("body") for m in sent[1:]] == [b"a", b"b", b""]
+    assert admission.stats()["used_bytes"] == 0
+
+
+def test_tickets_are_released_when_the_stream_never_starts():
+    admission = controller()
+    started = []
+
+    async def chunks():
+        started.append(True)
+        yield b"a"
+
+    async def receive():
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        # The client is gone before the response starts
+        raise OSError("connection reset")
+
+    async def main():
+        async with admission.admit("query", 30) as ticket:
+            response = AdmittedResponse(ticket, chunks())
+        with pytest.raises(ClientDisconnect):
+            await response(SCOPE | {"asgi": {"spec_version": "2.4"}}, receive, send)
+
+    asyncio.run(main())
+    assert not started
+    assert admission.stats()["used_bytes"] == 0
+    assert admission.stats()["endpoints"]["query"]["running"] == 0
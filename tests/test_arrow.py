@@ -0,0 +1,159 @@
+import asyncio
+import io
+import json
+import threading
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+from fastapi import HTTPException
+from starlette.requests import Request
+
+from deltalink.core import arrow
+from deltalink.core.arrow import (
+    ARROW_STREAM_MEDIA_TYPE,
+    PARQUET_MEDIA_TYPE,
+    iter_arrow_stream,
+    iter_json,
+    iter_ndjson,
+    read_arrow_table,
+    read_table_payload,
+)
+from deltalink.types.delta_table import DeltaTableInsert, DeltaTableMerge
+
+
+def make_request(body: bytes, content_type: str, query: str = "") -> Request:
+    async def receive():
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    scope = {
+        "type": "http",
+        "method": "POST",
+        "path": "/api/v1/data",
+        "query_string": query.encode(),
+        "headers": [(b"content-type", content_type.encode())],
+    }
+    return Request(scope, receive)
+
+
+@pytest.fixture
+def arrow_table():
+    return pa.table({"supplierID": ["007", "008"], "city": ["London", "Paris"]})
+
+
+def test_read_table_payload_arrow_stream(arrow_table):
+    sink = io.BytesIO()
+    with pa.ipc.new_stream(sink, arrow_table.schema) as writer:
+        writer.write_table(arrow_table)
+
+    request = make_request(
+        sink.getvalue(),
+        ARROW_STREAM_MEDIA_TYPE,
+        "catalog_name=main&schema_name=bakehouse&table_name=sales"
+        "&partition_by=continent&partition_by=city",
+    )
+    payload, data = asyncio.run(read_table_payload(request, DeltaTableInsert))
+
+    assert payload.table_name == "sales"
+    assert payload.partition_by == ["continent", "city"]
+    assert data.equals(arrow_table)
+
+
+def test_spooled_payload_is_decoded_off_the_event_loop(arrow_table, monkeypatch):
+    sink = io.BytesIO()
+    with pa.ipc.new_stream(sink, arrow_table.schema) as writer:
+        writer.write_table(arrow_table)
+    threads = []
+
+    def read(body, media_type):
+        threads.append(threading.current_thread())
+        return read_arrow_table(body, media_type)
+
+    monkeypatch.setattr(arrow, "read_arrow_table", read)
+    request = make_request(
+        sink.getvalue(),
+        ARROW_STREAM_MEDIA_TYPE,
+        "catalog_name=main&schema_name=bakehouse&table_name=sales",
+    )
+    _, data = asyncio.run(read_table_payload(request, DeltaTableInsert, spool=True))
+
+    assert data.equals(arrow_table)
+    assert threads and threads[0] is not threading.main_thread()
+
+
+def test_read_table_payload_parquet_with_updates(arrow_table):
+    sink = io.BytesIO()
+    pq.write_table(arrow_table, sink)
+
+    request = make_request(
+        sink.getvalue(),
+        PARQUET_MEDIA_TYPE,
+        "catalog_name=main&schema_name=bakehouse&table_name=sales"
+        "&predicate=target.supplierID%20%3D%20source.supplierID"
+        "&updates=%7B%22city%22%3A%20%22source.city%22%7D",
+    )
+    payload, data = asyncio.run(read_table_payload(request, DeltaTableMerge))
+
+    assert payload.updates == {"city": "source.city"}
+    assert data.num_rows == 2
+
+
+def test_read_table_payload_json():
+    request = make_request(
+        b'{"catalog_name": "main", "schema_name": "bakehouse", '
+        b'"table_name": "sales", "values": [{"supplierID": "007"}]}',
+        "application/json",
+    )
+    payload, data = asyncio.run(read_table_payload(request, DeltaTableInsert))
+
+    assert payload.catalog_name == "main"
+    assert list(data["supplierID"]) == ["007"]
+
+
+def test_read_table_payload_invalid_body():
+    request = make_request(
+        b"not parquet",
+        PARQUET_MEDIA_TYPE,
+        "catalog_name=main&schema_name=bakehouse&table_name=sales",
+    )
+    with pytest.raises(HTTPException) as e:
+        asyncio.run(read_table_payload(request, DeltaTableInsert))
+
+    assert e.value.status_code == 400
+
+
+def test_iter_arrow_stream_round_trip(arrow_table):
+    batches = arrow_table.to_batches(max_chunksize=1)
+    chunks = list(iter_arrow_stream(iter(batches), arrow_table.schema))
+
+    assert len(chunks) == len(batches) + 1
+    assert pa.ipc.open_stream(b"".join(chunks)).read_all().equals(arrow_table)
+
+
+def test_iter_arrow_stream_empty_result(arrow_table):
+    data = b"".join(iter_arrow_stream(iter([]), arrow_table.schema))
+    result = pa.ipc.open_stream(data).read_all()
+
+    assert result.num_rows == 0
+    assert result.schema.equals(arrow_table.schema)
+
+
+def test_iter_json(arrow_table):
+    data = b"".join(iter_json(arrow_table.to_batches(max_chunksize=1)))
+
+    assert json.loads(data) == {
+        "data": [
+            {"supplierID": "007", "city": "London"},
+            {"supplierID": "008", "city": "Paris"},
+        ]
+    }
+    assert json.loads(b"".join(iter_json([]))) == {"data": []}
+
+
+def test_iter_ndjson(arrow_table):
+    data = b"".join(iter_ndjson(arrow_table.to_batches(max_chunksize=1)))
+
+    assert data.splitlines() == [
+        b'{"supplierID": "007", "city": "London"}',
+        b'{"supplierID": "008", "city": "Paris"}',
+    ]
@@ -0,0 +1,93 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import MagicMock
+
+import pytest
+
+from deltalink.api.catalog import etag_matches
+from deltalink.core.catalog_cache import CatalogMetadataCache
+
+
+def test_entries_are_cached_until_the_ttl():
+    cache = CatalogMetadataCache(ttl=0.1)
+    load = MagicMock(return_value=["main"])
+
+    assert cache.get(("catalogs",), load) == ["main"]
+    assert cache.get(("catalogs",), load) == ["main"]
+    assert load.call_count == 1
+
+    time.sleep(0.15)
+    cache.get(("catalogs",), load)
+    assert load.call_count == 2
+
+
+def test_invalidate_by_prefix():
+    cache = CatalogMetadataCache(ttl=60)
+    load = MagicMock(return_value=[])
+    for key in (("tables", "a", "x"), ("tables", "a", "y"), ("tables", "b", "x")):
+        cache.get(key, load)
+
+    cache.invalidate("tables", "a", "x")
+    assert cache.stats()["entries"] == 2
+
+    cache.invalidate("tables")
+    assert cache.stats()["entries"] == 0
+
+
+def test_concurrent_misses_share_one_load():
+    cache = CatalogMetadataCache(ttl=60)
+    calls = 0
+    lock = threading.Lock()
+
+    def load():
+        nonlocal calls
+        with lock:
+            calls += 1
+        time.sleep(0.1)
+        return ["main.default"]
+
+    with ThreadPoolExecutor(4) as pool:
+        results = list(
+            pool.map(lambda _: cache.get(("schemas", "main"), load), range(4))
+        )
+
+    assert results == [["main.default"]] * 4
+    assert calls == 1
+    assert cache.stats()["coalesced"] == 3
+
+
+def test_failed_loads_are_not_cached():
+    cache = CatalogMetadataCache(ttl=60)
+    load = MagicMock(side_effect=[RuntimeError("UC is down"), ["main"]])
+
+    with pytest.raises(RuntimeError):
+        cache.get(("catalogs",), load)
+    assert cache.get(("catalogs",), load) == ["main"]
+
+
+def test_zero_ttl_disables_the_cache():
+    cache = CatalogMetadataCache(ttl=0)
+    load = MagicMock(return_value=["main"])
+
+    cache.get(("catalogs",), load)
+    cache.get(("catalogs",), load)
+    assert load.call_count == 2
+
+
+@pytest.mark.parametrize(
+    "header, matches",
+    [
+        (None, False),
+        ('"abc"', True),
+        ('W/"abc"', True),
+        ('"xyz", "abc"', True),
+        ("*", True),
+        ('"xyz"', False),
+    ],
+)
+def test_etag_matches(header, matches):
+    request = MagicMock()
+    request.headers = {"if-none-match": header} if header else {}
+
+    assert etag_matches(request, '"abc"') is matches
@@ -0,0 +1,70 @@
+import asyncio
+
+import pyarrow as pa
+import pytest
+from deltalake import DeltaTable
+
+from deltalink.core.coalescer import AppendCoalescer
+
+
+@pytest.fixture
+def table_uri(tmp_path):
+    return str(tmp_path / "sales_suppliers")
+
+
+def test_appends_are_committed_together(table_uri):
+    coalescer = AppendCoalescer(window_ms=50, max_rows=1000, max_bytes=1 << 30)
+
+    async def main():
+        await asyncio.gather(
+            *(
+                coalescer.append(table_uri, pa.table({"supplierID": [i]}), {})
+                for i in range(5)
+            )
+        )
+
+    asyncio.run(main())
+
+    dt = DeltaTable(table_uri)
+    assert dt.version() == 0
+    assert sorted(dt.to_pyarrow_table()["supplierID"].to_pylist()) == list(range(5))
+
+    stats = coalescer.stats()
+    assert stats["commits"] == 1
+    assert stats["requests"] == 5
+    assert stats["pending_requests"] == 0
+
+
+def test_size_threshold_flushes_before_the_window(table_uri):
+    coalescer = AppendCoalescer(window_ms=60_000, max_rows=2, max_bytes=1 << 30)
+
+    async def main():
+        await asyncio.wait_for(
+            asyncio.gather(
+                coalescer.append(table_uri, pa.table({"supplierID": [1]}), {}),
+                coalescer.append(table_uri, pa.table({"supplierID": [2]}), {}),
+            ),
+            timeout=10,
+        )
+
+    asyncio.run(main())
+
+    assert coalescer.stats()["flushes"] == 1
+    assert DeltaTable(table_uri).version() == 0
+
+
+def test_failed_commit_is_raised_to_every_caller(table_uri):
+    coalescer = AppendCoalescer(window_ms=10, max_rows=1000, max_bytes=1 << 30)
+
+    async def main():
+        await coalescer.append(table_uri, pa.table({"supplierID": [1]}), {})
+        return await asyncio.gather(
+            coalescer.append(table_uri, pa.table({"supplierID": ["a"]}), {}),
+            coalescer.append(table_uri, pa.table({"supplierID": ["b"]}), {}),
+            return_exceptions=True,
+        )
+
+    results = asyncio.run(main())
+
+    assert all(isinstance(r, Exception) for r in results)
+    assert coalescer.stats()["failed_commits"] == 1
@@ -0,0 +1,119 @@
+import threading
+import time
+from datetime import UTC, datetime, timedelta
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+import pytest
+
+from deltalink.core.credentials import CredentialManager, credential_expiry
+
+
+def uc_table(expires_in: float | None = None):
+    sas_token = ""
+    if expires_in is not None:
+        expiry = datetime.now(UTC) + timedelta(seconds=expires_in)
+        sas_token = f"sv=2022-11-02&se={expiry:%Y-%m-%dT%H:%M:%SZ}&sig=abc"
+    io_config = SimpleNamespace(azure=SimpleNamespace(sas_token=sas_token))
+    return SimpleNamespace(table_uri="abfss://c@a/t", io_config=io_config)
+
+
+@pytest.fixture
+def manager():
+    manager = CredentialManager(refresh_ahead=300, default_ttl=3600)
+    yield manager
+    manager.shutdown()
+
+
+def test_credential_expiry():
+    expiry = credential_expiry(uc_table(expires_in=3600))
+    assert expiry == pytest.approx(time.time() + 3600, abs=2)
+    assert credential_expiry(uc_table()) is None
+
+
+def test_cached_by_operation(manager):
+    catalog = MagicMock()
+    catalog.load_table.side_effect = lambda *a, **k: uc_table(expires_in=3600)
+
+    manager.get(catalog, "main.bakehouse.sales", "READ")
+    manager.get(catalog, "main.bakehouse.sales", "READ")
+    # A READ credential must not be used to write
+    manager.get(catalog, "main.bakehouse.sales", "READ_WRITE")
+    manager.get(catalog, "main.bakehouse.sales", "READ_WRITE")
+
+    assert catalog.load_table.call_count == 2
+    assert manager.stats()["hits"] == 2
+
+
+def test_read_served_by_read_write(manager):
+    catalog = MagicMock()
+    catalog.load_table.side_effect = lambda *a, **k: uc_table(expires_in=3600)
+
+    manager.get(catalog, "main.bakehouse.sales", "READ_WRITE")
+    manager.get(catalog, "main.bakehouse.sales", "READ")
+
+    assert catalog.load_table.call_count == 1
+
+
+def test_reads_and_writes_share_the_read_write_credential(manager):
+    catalog = MagicMock()
+    catalog.load_table.side_effect = lambda *a, **k: uc_table(expires_in=3600)
+
+    read = manager.get(catalog, "main.bakehouse.sales", "READ")
+    written = manager.get(catalog, "main.bakehouse.sales", "READ_WRITE")
+
+    # Once the table is written, its reads use the same storage options
+    assert manager.get(catalog, "main.bakehouse.sales", "READ") is written
+    assert read is not written
+
+
+def test_expired_credential_is_reloaded(manager):
+    catalog = MagicMock()
+    catalog.load_table.side_effect = lambda *a, **k: uc_table(expires_in=10)
+
+    manager.get(catalog, "main.bakehouse.sales")
+    manager.get(catalog, "main.bakehouse.sales")
+
+    assert catalog.load_table.call_count == 2
+
+
+def test_refresh_ahead(manager):
+    catalog = MagicMock()
+    catalog.load_table.side_effect = lambda *a, **k: uc_table(expires_in=120)
+
+    first = manager.get(catalog, "main.bakehouse.sales")
+    # Served from the cache while the refresh runs in the background
+    assert manager.get(catalog, "main.bakehouse.sales") is first
+
+    for _ in range(100):
+        if manager.stats()["refreshes"]:
+            break
+        time.sleep(0.01)
+
+    assert manager.stats()["refreshes"] == 1
+    assert catalog.load_table.call_count == 2
+
+
+def test_concurrent_misses_are_coalesced(manager):
+    release = threading.Event()
+
+    def load_table(*args, **kwargs):
+        release.wait()
+        return uc_table(expires_in=3600)
+
+    catalog = MagicMock()
+    catalog.load_table.side_effect = load_table
+
+    threads = [
+        threading.Thread(target=manager.get, args=(catalog, "main.bakehouse.sales"))
+        for _ in range(5)
+    ]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.1)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert catalog.load_table.call_count == 1
+    assert manager.stats()["coalesced"] == 4
@@ -0,0 +1,67 @@
+import asyncio
+import threading
+
+import pytest
+
+from deltalink.core.executor import BoundedExecutor
+
+
+@pytest.fixture
+def executor():
+    executor = BoundedExecutor("test", max_workers=2)
+    yield executor
+    executor.shutdown()
+
+
+def test_run_off_the_event_loop(executor):
+    async def main():
+        return await executor.run(lambda: threading.current_thread().name)
+
+    assert asyncio.run(main()).startswith("deltalink-test")
+
+    stats = executor.stats()
+    assert stats["completed"] == 1
+    assert stats["queued"] == 0
+    assert stats["running"] == 0
+
+
+def test_run_bounded_concurrency(executor):
+    release = threading.Event()
+
+    async def main():
+        tasks = [asyncio.ensure_future(executor.run(release.wait)) for _ in range(3)]
+        await asyncio.sleep(0.1)
+        stats = executor.stats()
+        release.set()
+        await asyncio.gather(*tasks)
+        return stats
+
+    stats = asyncio.run(main())
+    assert stats["running"] == 2
+    assert stats["queued"] == 1
+
+
+def test_run_counts_failures(executor):
+    async def main():
+        await executor.run(int, "not a number")
+
+    with pytest.raises(ValueError):
+        asyncio.run(main())
+
+    assert executor.stats()["failed"] == 1
+
+
+def test_iterate(executor):
+    async def main():
+        return [item async for item in executor.iterate(iter(range(3)))]
+
+    assert asyncio.run(main()) == [0, 1, 2]
+
+
+def test_run_after_shutdown(executor):
+    executor.shutdown()
+
+    async def main():
+        return await executor.run(sum, [1, 2])
+
+    assert asyncio.run(main()) == 3
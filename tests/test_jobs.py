@@ -0,0 +1,166 @@
+import asyncio
+import time
+
+import pyarrow as pa
+import pytest
+from daft.unity_catalog import UnityCatalogTable
+from deltalake import write_deltalake
+
+from deltalink.core.jobs import JobManager, QueryJob, TooManyJobs
+
+
+class DummyTableInfo:
+    def __init__(self, name):
+        self.catalog_name = "cat"
+        self.schema_name = "jobs"
+        self.name = name
+
+
+class DummyCatalog:
+    def __init__(self, tables: dict[str, str]):
+        self.tables = tables
+
+    def load_table(self, name, operation=None, table_type=None):
+        return UnityCatalogTable(
+            table_info=DummyTableInfo(name.split(".")[-1]),
+            table_uri=self.tables[name],
+            io_config=None,
+        )
+
+
+@pytest.fixture
+def catalog(tmp_path, request):
+    # The credentials of a table are cached by name across the tests
+    name = f"cat.jobs.{request.node.name}"
+    uri = str(tmp_path / "sales")
+    for i in range(3):
+        write_deltalake(
+            uri, pa.table({"id": list(range(i * 10, i * 10 + 10))}), mode="append"
+        )
+    return name, DummyCatalog({name: uri})
+
+
+def run_job(manager: JobManager, sql: str, catalog, **pins) -> QueryJob:
+    async def main():
+        job = manager.submit(sql, catalog, **pins)
+        await asyncio.gather(*manager._tasks)
+        return job
+
+    return asyncio.run(main())
+
+
+def test_job_result_in_memory(catalog, tmp_path):
+    name, uc_catalog = catalog
+    manager = JobManager(ttl=60, spill_bytes=1 << 30, directory=str(tmp_path))
+
+    job = run_job(manager, f"select * from {name} where id >= 5", uc_catalog)
+
+    assert job.status == "succeeded"
+    assert job.rows == 25
+    assert job.path is None
+    assert sorted(r["id"] for b in job.iter_batches() for r in b.to_pylist()) == list(
+        range(5, 30)
+    )
+    assert set(job.timings) == {"queued", "resolve", "planning", "execution", "total"}
+
+
+def test_large_result_is_spilled(catalog, tmp_path):
+    name, uc_catalog = catalog
+    manager = JobManager(ttl=60, spill_bytes=100, directory=str(tmp_path))
+
+    job = run_job(manager, f"select * from {name}", uc_catalog)
+
+    assert job.path is not None and job.path.exists()
+    assert pa.Table.from_batches(list(job.iter_batches())).num_rows == 30
+
+    manager.cancel(job.id)
+    assert manager.get(job.id) is None
+    assert not job.path.exists()
+
+
+def test_job_reads_the_pinned_versions(catalog, tmp_path):
+    name, uc_catalog = catalog
+    manager = JobManager(ttl=60, spill_bytes=1 << 30, directory=str(tmp_path))
+
+    job = run_job(manager, f"select * from {name}", uc_catalog, versions={name: 0})
+
+    assert job.status == "succeeded"
+    assert job.rows == 10
+
+
+def test_failed_job(catalog, tmp_path):
+    name, uc_catalog = catalog
+    manager = JobManager(ttl=60, spill_bytes=1 << 30, directory=str(tmp_path))
+
+    job = run_job(manager, f"select * from {name} where", uc_catalog)
+
+    assert job.status == "failed"
+    assert job.error
+    assert manager.stats()["failed"] == 1
+
+
+def test_finished_jobs_expire(catalog, tmp_path):
+    name, uc_catalog = catalog
+    manager = JobManager(ttl=0.1, spill_bytes=100, directory=str(tmp_path))
+
+    job = run_job(manager, f"select * from {name}", uc_catalog)
+    assert manager.get(job.id) is job
+
+    time.sleep(0.2)
+    assert manager.get(job.id) is None
+    assert not job.path.exists()
+    assert manager.stats()["expired"] == 1
+
+
+def test_expired_jobs_are_swept_without_requests(catalog, tmp_path):
+    name, uc_catalog = catalog
+    manager = JobManager(
+        ttl=0.1, spill_bytes=100, directory=str(tmp_path), sweep_interval=0.05
+    )
+
+    async def main():
+        manager.start()
+        job = manager.submit(f"select * from {name}", uc_catalog)
+        await asyncio.gather(*manager._tasks)
+        await asyncio.sleep(0.3)
+        await manager.close()
+        return job
+
+    job = asyncio.run(main())
+
+    assert manager.stats()["expired"] == 1
+    assert not job.path.exists()
+
+
+def test_pending_jobs_are_limited(catalog, tmp_path):
+    name, uc_catalog = catalog
+    manager = JobManager(
+        ttl=60, spill_bytes=1 << 30, directory=str(tmp_path), max_pending=1
+    )
+
+    async def main():
+        manager.submit(f"select * from {name}", uc_catalog)
+        with pytest.raises(TooManyJobs):
+            manager.submit(f"select * from {name}", uc_catalog)
+        await asyncio.gather(*manager._tasks)
+        # The first job finished, another one can run
+        manager.submit(f"select * from {name}", uc_catalog)
+        await asyncio.gather(*manager._tasks)
+
+    asyncio.run(main())
+
+    assert manager.stats()["rejected"] == 1
+    assert manager.stats()["succeeded"] == 2
+
+
+def test_oldest_finished_jobs_make_room(catalog, tmp_path):
+    name, uc_catalog = catalog
+    manager = JobManager(
+        ttl=60, spill_bytes=1 << 30, directory=str(tmp_path), max_jobs=2
+    )
+
+    jobs = [run_job(manager, f"select * from {name}", uc_catalog) for _ in range(3)]
+
+    assert manager.get(jobs[0].id) is None
+    assert [manager.get(job.id) for job in jobs[1:]] == jobs[1:]
+    assert manager.stats()["evicted"] == 1
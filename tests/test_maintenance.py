@@ -0,0 +1,160 @@
+import asyncio
+from datetime import UTC, datetime
+
+import pyarrow as pa
+import pytest
+from daft.unity_catalog import UnityCatalogTable
+from deltalake import DeltaTable, write_deltalake
+
+from deltalink.core.maintenance import MaintenanceScheduler, in_window, parse_window
+
+
+class DummyTableInfo:
+    def __init__(self, name):
+        self.catalog_name = "cat"
+        self.schema_name = "maintenance"
+        self.name = name
+
+
+class DummyCatalog:
+    def __init__(self, tables: dict[str, str]):
+        self.tables = tables
+
+    def load_table(self, name, operation=None, table_type=None):
+        return UnityCatalogTable(
+            table_info=DummyTableInfo(name.split(".")[-1]),
+            table_uri=self.tables[name],
+            io_config=None,
+        )
+
+
+def append(uri: str, continent: str, count: int) -> None:
+    for i in range(count):
+        data = pa.table({"supplierID": [i], "continent": [continent]})
+        write_deltalake(uri, data, partition_by=["continent"], mode="append")
+
+
+def partition_files(uri: str) -> dict[str, int]:
+    files: dict[str, int] = {}
+    for values in DeltaTable(uri).get_add_actions()["partition_values"].to_pylist():
+        files[values["continent"]] = files.get(values["continent"], 0) + 1
+    return files
+
+
+@pytest.fixture
+def table(tmp_path, request):
+    # The credentials of a table are cached by name across the tests
+    name = f"cat.maintenance.{request.node.name}"
+    uri = str(tmp_path / "sales_suppliers")
+    return name, uri, DummyCatalog({name: uri})
+
+
+def scheduler(**kwargs) -> MaintenanceScheduler:
+    options = {
+        "enabled": True,
+        "small_file_bytes": 1024 * 1024,
+        "min_small_files": 3,
+        "target_file_bytes": None,
+        "vacuum_interval": 0,
+        "window": None,
+        "max_concurrent": 1,
+        "check_interval": 60,
+    }
+    return MaintenanceScheduler(**(options | kwargs))
+
+
+def check(maintenance: MaintenanceScheduler) -> None:
+    async def main():
+        await maintenance._check()
+        await asyncio.gather(*maintenance._running)
+
+    asyncio.run(main())
+
+
+def notify(maintenance: MaintenanceScheduler, table) -> None:
+    async def main():
+        maintenance.notify(table[2], table[0], table[1])
+        # The background loop is stopped, checks are run by the test
+        await maintenance.close()
+
+    asyncio.run(main())
+
+
+def test_windows():
+    assert parse_window(None) is None
+    night = parse_window("22:00-06:00")
+    day = parse_window("09:30-17:00")
+
+    def at(hour: int, minute: int = 0) -> datetime:
+        return datetime(2024, 1, 1, hour, minute, tzinfo=UTC)
+
+    assert in_window(night, at(23)) and in_window(night, at(5, 59))
+    assert not in_window(night, at(6)) and not in_window(night, at(12))
+    assert in_window(day, at(9, 30)) and not in_window(day, at(17))
+    assert in_window(None, at(12))
+    with pytest.raises(ValueError):
+        parse_window("22h-6h")
+
+
+def test_touched_partitions_with_small_files_are_compacted(table):
+    _, uri, _ = table
+    append(uri, "Europe", 4)
+    append(uri, "Asia", 2)
+    maintenance = scheduler()
+
+    notify(maintenance, table)
+    check(maintenance)
+
+    assert partition_files(uri) == {"Europe": 1, "Asia": 2}
+    assert DeltaTable(uri).to_pyarrow_table().num_rows == 6
+
+    # Files written before the last inspection are not candidates anymore
+    append(uri, "Asia", 1)
+    append(uri, "Oceania", 1)
+    notify(maintenance, table)
+    check(maintenance)
+
+    assert partition_files(uri) == {"Europe": 1, "Asia": 1, "Oceania": 1}
+
+    stats = maintenance.stats()
+    assert stats["compactions"] == 2
+    assert stats["failures"] == 0
+    assert stats["tables"][table[0]]["pending_compactions"] == 0
+
+
+def test_maintenance_waits_for_the_window(table):
+    _, uri, _ = table
+    append(uri, "Europe", 4)
+    now = datetime.now(UTC)
+    closed = f"{(now.hour + 2) % 24:02d}:00-{(now.hour + 3) % 24:02d}:00"
+    maintenance = scheduler(window=closed)
+
+    notify(maintenance, table)
+    check(maintenance)
+
+    assert partition_files(uri) == {"Europe": 4}
+    stats = maintenance.stats()
+    assert stats["deferred"] == 1
+    assert stats["tables"][table[0]]["pending_compactions"] == 1
+    assert stats["tables"][table[0]]["small_files"] == 4
+
+
+def test_vacuum_runs_when_due(table):
+    _, uri, _ = table
+    append(uri, "Europe", 1)
+    maintenance = scheduler(vacuum_interval=3600)
+
+    notify(maintenance, table)
+    check(maintenance)
+    assert maintenance.stats()["vacuums"] == 0
+
+    maintenance._tables[uri].vacuum_due = 0
+    check(maintenance)
+    assert maintenance.stats()["vacuums"] == 1
+    assert not maintenance.stats()["tables"][table[0]]["vacuum_pending"]
+
+
+def test_disabled_scheduler_ignores_writes(table):
+    maintenance = scheduler(enabled=False)
+    notify(maintenance, table)
+    assert maintenance.stats()["tables"] == {}
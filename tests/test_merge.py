@@ -0,0 +1,96 @@
+from datetime import date
+
+import pyarrow as pa
+import pytest
+from deltalake import DeltaTable, write_deltalake
+
+from deltalink.core.merge import (
+    merge_in_batches,
+    partition_batches,
+    partition_predicate,
+)
+
+
+@pytest.fixture
+def table(tmp_path):
+    uri = str(tmp_path / "sales_suppliers")
+    for continent in ("Europe", "Asia", "Oceania"):
+        data = pa.table(
+            {
+                "supplierID": [f"{continent[0]}{i}" for i in range(4)],
+                "name": ["old"] * 4,
+                "continent": [continent] * 4,
+            }
+        )
+        write_deltalake(uri, data, partition_by=["continent"], mode="append")
+    return uri
+
+
+def source(rows: list[tuple[str, str]]) -> pa.Table:
+    return pa.table(
+        {
+            "supplierID": [supplier for supplier, _ in rows],
+            "name": ["new"] * len(rows),
+            "continent": [continent for _, continent in rows],
+        }
+    )
+
+
+def test_partition_predicate():
+    assert partition_predicate(["continent"], [("Europe",)]) == (
+        "target.continent = 'Europe'"
+    )
+    assert partition_predicate(["day", "shop"], [(date(2024, 1, 2), "O'Neil")]) == (
+        "target.day = '2024-01-02' AND target.shop = 'O''Neil'"
+    )
+    assert partition_predicate(["id"], [(1,), (None,)]) == (
+        "(target.id = 1) OR (target.id IS NULL)"
+    )
+    assert partition_predicate([], [()]) is None
+
+
+def test_rows_of_a_partition_are_batched_together():
+    rows = [("E0", "Europe"), ("A0", "Asia"), ("E1", "Europe"), ("O0", "Oceania")]
+    rows += [("E2", "Europe"), ("A1", "Asia")]
+
+    batches = list(partition_batches(source(rows), ["continent"], 4))
+
+    assert [partitions for partitions, _ in batches] == [
+        [("Europe",), ("Asia",)],
+        [("Asia",), ("Oceania",)],
+    ]
+    assert batches[0][1]["supplierID"].to_pylist() == ["E0", "E1", "E2", "A0"]
+    assert batches[1][1]["supplierID"].to_pylist() == ["A1", "O0"]
+
+    # Without partitions the rows are sliced in order
+    batches = list(partition_batches(source(rows), [], 4))
+    assert [batch.num_rows for _, batch in batches] == [4, 2]
+
+
+def test_merge_in_batches_only_rewrites_the_partitions_of_each_batch(table):
+    rows = [("E0", "Europe"), ("E3", "Europe"), ("A1", "Asia")]
+    version = DeltaTable(table).version()
+
+    progress = list(
+        merge_in_batches(
+            table,
+            "cat.merge.sales_suppliers",
+            {},
+            source(rows),
+            "target.supplierID = source.supplierID",
+            {"name": "source.name"},
+            batch_rows=2,
+        )
+    )
+
+    assert [p["batch"] for p in progress] == [1, 2]
+    assert {p["batches"] for p in progress} == {2}
+    assert progress[-1]["merged_rows"] == progress[-1]["total_rows"] == 3
+    assert progress[-1]["version"] == version + 2
+    # Each commit rewrote the single file of its partition
+    assert [p["rewritten_files"] for p in progress] == [1, 1]
+
+    rows = DeltaTable(table).to_pyarrow_table().to_pylist()
+    updated = sorted(r["supplierID"] for r in rows if r["name"] == "new")
+    assert updated == ["A1", "E0", "E3"]
+    assert len(rows) == 12
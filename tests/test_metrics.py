@@ -0,0 +1,93 @@
+import asyncio
+import time
+
+import pyarrow as pa
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from deltalink.api.health import prometheus_metrics
+from deltalink.core.executor import BoundedExecutor
+from deltalink.core.metrics import (
+    ServerTimingMiddleware,
+    metered,
+    metrics,
+    rows_total,
+    span,
+)
+
+
+def test_metrics_are_rendered_in_the_prometheus_format():
+    rows_total.labels(operation="render").inc(3)
+    response = asyncio.run(prometheus_metrics())
+
+    text = response.body.decode()
+    assert response.media_type.startswith("text/plain; version=0.0.4")
+    assert "# TYPE deltalink_rows_total counter" in text
+    assert 'deltalink_rows_total{operation="render"} 3.0' in text
+    assert "# TYPE deltalink_stage_duration_seconds histogram" in text
+    assert 'deltalink_cache_hits_total{cache="result"}' in text
+
+
+def stage_count(route: str, stage: str) -> float:
+    sample = metrics.get_sample_value(
+        "deltalink_stage_duration_seconds_count", {"route": route, "stage": stage}
+    )
+    return sample or 0
+
+
+def rows(operation: str) -> float:
+    return (
+        metrics.get_sample_value("deltalink_rows_total", {"operation": operation}) or 0
+    )
+
+
+@pytest.fixture
+def client():
+    app = FastAPI()
+    app.add_middleware(ServerTimingMiddleware)
+    executor = BoundedExecutor("test", 2)
+
+    @app.get("/work/{item}")
+    async def work(item: str) -> dict[str, str]:
+        def blocking() -> None:
+            with span("load"):
+                time.sleep(0.01)
+
+        with span("credentials"):
+            await asyncio.sleep(0)
+        # Spans of the executor threads are added to the request
+        await executor.run(blocking)
+        await executor.run(blocking)
+        return {"item": item}
+
+    with TestClient(app) as client:
+        yield client
+    executor.shutdown()
+
+
+def test_stages_are_sent_in_the_server_timing_header(client):
+    before = stage_count("/work/{item}", "load")
+
+    response = client.get("/work/a")
+
+    timing = dict(
+        entry.split(";dur=") for entry in response.headers["server-timing"].split(", ")
+    )
+    assert list(timing) == ["credentials", "load", "total"]
+    assert float(timing["load"]) >= 20
+    assert float(timing["total"]) >= float(timing["load"])
+    assert stage_count("/work/{item}", "load") == before + 1
+
+
+def test_spans_outside_of_a_request_are_ignored():
+    with span("load"):
+        pass
+
+
+def test_metered_counts_rows_and_bytes():
+    batch = pa.record_batch({"a": [1, 2, 3]})
+    before = rows("test")
+
+    assert list(metered(iter([batch, batch]), "test")) == [batch, batch]
+    assert rows("test") == before + 6
@@ -0,0 +1,56 @@
+import pyarrow as pa
+import pytest
+
+from deltalink.core.paging import PageCursor, query_digest, read_page
+
+
+def batches(*sizes: int) -> list[pa.RecordBatch]:
+    start = 0
+    result = []
+    for size in sizes:
+        result.append(pa.record_batch({"id": list(range(start, start + size))}))
+        start += size
+    return result
+
+
+def ids(page: list[pa.RecordBatch]) -> list[int]:
+    return [row["id"] for batch in page for row in batch.to_pylist()]
+
+
+def test_cursor_round_trip():
+    sql = "select * from a.b.c"
+    cursor = PageCursor(query_digest(sql), 100, 50, [3, 7])
+
+    assert PageCursor.decode(cursor.encode(), "select *\nfrom a.b.c;") == cursor
+
+
+@pytest.mark.parametrize("token", ["", "not a cursor", "e30", "eyJxIjoxfQ"])
+def test_invalid_cursor(token):
+    with pytest.raises(ValueError, match="Invalid cursor"):
+        PageCursor.decode(token, "select 1")
+
+
+def test_cursor_of_another_query():
+    cursor = PageCursor(query_digest("select * from a.b.c"), 0, 10, [1])
+
+    with pytest.raises(ValueError, match="another query"):
+        PageCursor.decode(cursor.encode(), "select * from a.b.d")
+    with pytest.raises(ValueError, match="another query"):
+        PageCursor.decode(cursor.encode(), "select * from a.b.C")
+
+
+@pytest.mark.parametrize(
+    "offset, page_size, expected, more",
+    [
+        (0, 3, [0, 1, 2], True),
+        (2, 4, [2, 3, 4, 5], True),
+        (5, 5, [5, 6, 7, 8, 9], False),
+        (7, 10, [7, 8, 9], False),
+        (10, 5, [], False),
+    ],
+)
+def test_read_page(offset, page_size, expected, more):
+    page, has_more = read_page(iter(batches(4, 4, 2)), offset, page_size)
+
+    assert ids(page) == expected
+    assert has_more is more
@@ -0,0 +1,56 @@
+from unittest.mock import MagicMock
+
+import pyarrow as pa
+from deltalake import write_deltalake
+
+from deltalink.core.plan_cache import QueryPlanCache
+from deltalink.core.tables import DeltaTableCache
+from deltalink.core.util import ResolvedTable
+
+
+def resolve(table_uri: str, uc_table=None) -> ResolvedTable:
+    snapshot = DeltaTableCache(max_tables=1, max_bytes=1 << 30).snapshot(table_uri, {})
+    return ResolvedTable(
+        "cat.sch.t", snapshot.version, uc_table or MagicMock(), snapshot.to_daft(), 0.0
+    )
+
+
+def test_tables_are_parsed_once():
+    cache = QueryPlanCache(max_queries=1, max_plans=1)
+    sql = "select * from cat.sch.a join cat.sch.b on a.id = b.id"
+
+    assert cache.tables(sql) == ["cat.sch.a", "cat.sch.b"]
+    assert cache.tables(sql) == ["cat.sch.a", "cat.sch.b"]
+    cache.tables("select * from cat.sch.c")
+
+    assert cache.stats()["parse_hits"] == 1
+    assert cache.stats()["queries"] == 1
+
+
+def test_plan_is_reused_until_a_new_version(tmp_path):
+    table_uri = str(tmp_path / "t")
+    write_deltalake(table_uri, pa.table({"id": [1, 2]}))
+    cache = QueryPlanCache(max_queries=10, max_plans=10)
+    sql = "select * from cat.sch.t where id > 1"
+
+    table = resolve(table_uri)
+    assert cache.plan(sql, [table]).to_pydict() == {"id": [2]}
+    assert cache.plan(sql, [table]).to_pydict() == {"id": [2]}
+    assert cache.stats()["plan_hits"] == 1
+
+    write_deltalake(table_uri, pa.table({"id": [3]}), mode="append")
+    newer = resolve(table_uri, table.uc_table)
+    assert sorted(cache.plan(sql, [newer]).to_pydict()["id"]) == [2, 3]
+    assert cache.stats()["plan_misses"] == 2
+
+
+def test_plan_is_not_reused_with_new_credentials(tmp_path):
+    table_uri = str(tmp_path / "t")
+    write_deltalake(table_uri, pa.table({"id": [1, 2]}))
+    cache = QueryPlanCache(max_queries=10, max_plans=10)
+    sql = "select * from cat.sch.t"
+
+    cache.plan(sql, [resolve(table_uri)])
+    cache.plan(sql, [resolve(table_uri)])
+
+    assert cache.stats()["plan_hits"] == 0
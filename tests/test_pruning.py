@@ -0,0 +1,188 @@
+import io
+from datetime import date
+
+import daft
+import pyarrow as pa
+import pytest
+from deltalake import DeltaTable, write_deltalake
+
+from deltalink.core.pruning import (
+    collect_scan_reports,
+    keys_sql,
+    lookup_files,
+    predicate_expression,
+    predicate_sql,
+)
+from deltalink.core.tables import DeltaSnapshot
+
+
+@pytest.fixture
+def snapshot(tmp_path):
+    uri = str(tmp_path / "sales")
+    for day, ids in (("a", [1, 2]), ("b", [10, 20]), ("b", [100, 200])):
+        data = pa.table(
+            {
+                "id": ids,
+                "day": [day] * 2,
+                "sold": [date(2024, 1, ids[0] % 28 + 1)] * 2,
+                "name": ["x"] * 2,
+            }
+        )
+        write_deltalake(uri, data, partition_by=["day"], mode="append")
+    return DeltaSnapshot(DeltaTable(uri))
+
+
+def scan(snapshot: DeltaSnapshot, predicate: daft.Expression | None):
+    df = snapshot.to_daft()
+    if predicate is not None:
+        df = df.where(predicate)
+    with collect_scan_reports() as reports:
+        df.explain(True, file=io.StringIO())
+    assert len(reports) == 1
+    return reports[0]
+
+
+def test_no_filter_scans_every_file(snapshot):
+    report = scan(snapshot, None)
+
+    assert (report.files, report.partition_files, report.scanned_files) == (3, 3, 3)
+    assert report.scanned_bytes == report.bytes > 0
+    assert report.scan_tasks == 3
+    assert report.version == 2
+
+
+def test_partition_and_statistics_pruning(snapshot):
+    report = scan(snapshot, (daft.col("day") == "b") & (daft.col("id") > 50))
+
+    assert report.partition_files == 2
+    assert report.scanned_files == 1
+    assert report.scan_tasks == 2
+    assert report.scanned_bytes < report.partition_bytes < report.bytes
+
+
+@pytest.mark.parametrize(
+    "predicate, scanned_files",
+    [
+        (daft.col("id") < 5, 1),
+        (daft.col("id").between(15, 150), 2),
+        (daft.col("id").is_in([2, 200]), 2),
+        ((daft.col("id") < 5) | (daft.col("id") > 150), 2),
+        (daft.col("id").is_null(), 0),
+        (daft.col("name") == "y", 0),
+        (daft.col("name") == "x", 3),
+        # Not decided from the statistics, every file is kept
+        (daft.col("sold") > date(2024, 1, 15), 3),
+        (~(daft.col("id") < 5), 3),
+        (daft.col("id") + 1 > 500, 3),
+    ],
+)
+def test_statistics_pruning_is_conservative(snapshot, predicate, scanned_files):
+    assert scan(snapshot, predicate).scanned_files == scanned_files
+
+
+def test_long_string_maxima_are_not_bounds(tmp_path):
+    uri = str(tmp_path / "names")
+    for prefix in ("a", "m"):
+        names = [prefix * 40, prefix + "z" * 40]
+        write_deltalake(uri, pa.table({"name": names}), mode="append")
+    snapshot = DeltaSnapshot(DeltaTable(uri))
+
+    # The minima prune, the maxima may be truncated prefixes
+    assert scan(snapshot, daft.col("name") < "b").scanned_files == 1
+    assert scan(snapshot, daft.col("name") == "a").scanned_files == 0
+    assert scan(snapshot, daft.col("name") > "zz").scanned_files == 2
+
+
+def test_reports_are_only_collected_on_demand(snapshot):
+    with collect_scan_reports() as reports:
+        pass
+    snapshot.to_daft().explain(True, file=io.StringIO())
+
+    assert reports == []
+
+
+def test_predicates_are_typed_from_the_schema(snapshot):
+    schema = snapshot.schema().to_pyarrow()
+    predicate = predicate_expression(
+        [("day", "=", "b"), ("id", ">", "50"), ("sold", "<=", "2024-01-30")], schema
+    )
+
+    rows = snapshot.to_daft().where(predicate).to_pydict()
+    assert sorted(rows["id"]) == [100, 200]
+    assert predicate_expression([], schema) is None
+
+
+@pytest.mark.parametrize(
+    "filters, error",
+    [
+        ([("missing", "=", "1")], "Unknown column"),
+        ([("id", "=", "one")], "Invalid value"),
+        ([("id", "IN", "1")], "Unsupported operator"),
+    ],
+)
+def test_invalid_predicates(snapshot, filters, error):
+    with pytest.raises(ValueError, match=error):
+        predicate_expression(filters, snapshot.schema().to_pyarrow())
+
+
+def test_prune_skips_files_before_the_scan(snapshot):
+    predicate = (daft.col("day") == "b") & (daft.col("id") > 50)
+    pruned = snapshot.prune(predicate)
+
+    assert pruned.get_add_actions().num_rows == 1
+    assert snapshot.get_add_actions().num_rows == 3
+    assert pruned.version == snapshot.version
+    assert scan(pruned, predicate).files == 1
+    assert pruned.to_daft().where(predicate).to_pydict()["id"] == [100, 200]
+
+    # Nothing to decide from the metadata, the snapshot is used as is
+    assert snapshot.prune(daft.col("sold") > date(2024, 1, 15)) is snapshot
+
+
+def test_lookup_files_from_statistics(snapshot):
+    add_actions = snapshot.get_add_actions()
+
+    # Disjoint ranges, every lookup reads one file
+    assert lookup_files(add_actions, "id") == 1
+    assert lookup_files(add_actions, "name") == 3
+    assert lookup_files(add_actions, "missing") is None
+
+
+def test_z_order_clusters_the_files(tmp_path):
+    uri = str(tmp_path / "sensors")
+    for offset in range(4):
+        ids = list(range(offset, 400, 4))
+        write_deltalake(uri, pa.table({"id": ids, "value": ids}), mode="append")
+    dt = DeltaTable(uri)
+    assert lookup_files(dt.get_add_actions(), "id") >= 2.5
+
+    dt.optimize.z_order(["id"], target_size=1)
+
+    assert lookup_files(dt.get_add_actions(), "id") == 1
+
+
+def test_sql_predicates_are_typed_from_the_schema(snapshot):
+    schema = snapshot.schema().to_pyarrow()
+
+    assert predicate_sql([("id", ">", "10"), ("name", "=", "O'Neil")], schema) == (
+        """"id" > 10 AND "name" = 'O''Neil'"""
+    )
+    assert keys_sql("sold", ["2024-01-11", "2024-01-02"], schema) == (
+        """"sold" >= '2024-01-02' AND "sold" <= '2024-01-11'"""
+        """ AND "sold" IN ('2024-01-02', '2024-01-11')"""
+    )
+    with pytest.raises(ValueError, match="Invalid value"):
+        keys_sql("id", ["x"], schema)
+    with pytest.raises(ValueError, match="No keys"):
+        keys_sql("id", [], schema)
+
+
+def test_key_delete_only_rewrites_the_files_holding_the_keys(snapshot):
+    dt = DeltaTable(snapshot.table_uri)
+    keys = [str(key) for key in range(100, 201)]
+
+    metrics = dt.delete(keys_sql("id", keys, snapshot.schema().to_pyarrow()))
+
+    assert metrics["num_deleted_rows"] == 2
+    assert metrics["num_removed_files"] == 1
+    assert sorted(dt.to_pyarrow_table()["id"].to_pylist()) == [1, 2, 10, 20]
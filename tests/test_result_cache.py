@@ -0,0 +1,122 @@
+import pyarrow as pa
+
+from deltalink.core.result_cache import ResultCache, normalize_sql
+
+
+def make_table(rows: int) -> pa.Table:
+    return pa.table({"id": list(range(rows))})
+
+
+def test_key_ignores_layout_and_follows_versions():
+    key = ResultCache.key("select * from a.b.c", {"a.b.c": 1})
+
+    assert normalize_sql("select *\n  from a.b.c; -- all\n") == "select * from a.b.c"
+    assert ResultCache.key("select *  from a.b.c;", {"a.b.c": 1}) == key
+    assert ResultCache.key("select * from a.b.c", {"a.b.c": 2}) != key
+
+
+def test_identifier_case_is_kept():
+    lower = ResultCache.key("select size from a.b.c", {"a.b.c": 1})
+    upper = ResultCache.key("select Size from a.b.c", {"a.b.c": 1})
+    alias = ResultCache.key("select count(*) as Size from a.b.c", {"a.b.c": 1})
+
+    assert lower != upper
+    assert alias != ResultCache.key("select count(*) as size from a.b.c", {"a.b.c": 1})
+
+
+def test_put_and_get():
+    cache = ResultCache(max_bytes=1 << 20, max_entry_bytes=1 << 20)
+    table = make_table(10)
+
+    assert cache.get("k") is None
+    assert cache.put("k", table, plan="plan")
+
+    entry = cache.get("k")
+    assert entry.load().equals(table)
+    assert entry.plan == "plan"
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+def test_least_recently_used_entries_are_evicted():
+    table = make_table(100)
+    cache = ResultCache(max_bytes=2 * table.nbytes, max_entry_bytes=1 << 20)
+
+    cache.put("a", table)
+    cache.put("b", table)
+    cache.get("a")
+    cache.put("c", table)
+
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+    assert cache.stats()["evictions"] == 1
+
+
+def test_large_results_are_kept_on_disk(tmp_path):
+    table = make_table(1000)
+    cache = ResultCache(
+        max_bytes=1 << 20,
+        max_entry_bytes=table.nbytes - 1,
+        directory=str(tmp_path),
+        max_disk_bytes=1 << 20,
+    )
+
+    assert cache.put("k", table)
+
+    entry = cache.get("k")
+    assert entry.table is None
+    assert entry.load().equals(table)
+    assert cache.stats()["disk_bytes"] == table.nbytes
+
+    cache.clear()
+    assert not list(tmp_path.glob("*.arrow"))
+
+
+def test_too_large_results_are_not_cached():
+    table = make_table(1000)
+    cache = ResultCache(max_bytes=1 << 20, max_entry_bytes=table.nbytes - 1)
+
+    assert not cache.put("k", table)
+    assert cache.get("k") is None
+
+
+def test_tee_caches_a_complete_stream():
+    table = make_table(100)
+    cache = ResultCache(max_bytes=1 << 20, max_entry_bytes=1 << 20)
+
+    batches = cache.tee("k", iter(table.to_batches(max_chunksize=10)))
+    assert next(batches).num_rows == 10
+    assert cache.get("k") is None
+
+    assert sum(batch.num_rows for batch in batches) == 90
+    assert cache.get("k").load().equals(table)
+
+
+def test_tee_writes_large_streams_to_disk_as_they_pass(tmp_path):
+    table = make_table(100)
+    cache = ResultCache(
+        max_bytes=1 << 20,
+        max_entry_bytes=200,
+        directory=str(tmp_path),
+        max_disk_bytes=1 << 20,
+    )
+
+    batches = cache.tee("k", iter(table.to_batches(max_chunksize=10)))
+    for _ in range(5):
+        next(batches)
+    # Past the entry size, the batches are in the file being written
+    assert len(list(tmp_path.glob("*.tmp"))) == 1
+
+    assert sum(batch.num_rows for batch in batches) == 50
+    entry = cache.get("k")
+    assert entry.table is None
+    assert entry.load().equals(table)
+    assert not list(tmp_path.glob("*.tmp"))
+
+    # An abandoned stream leaves nothing behind
+    batches = cache.tee("other", iter(table.to_batches(max_chunksize=10)))
+    for _ in range(5):
+        next(batches)
+    batches.close()
+    assert cache.get("other") is None
+    assert not list(tmp_path.glob("*.tmp"))
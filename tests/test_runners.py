@@ -0,0 +1,80 @@
+import errno
+import tempfile
+from pathlib import Path
+
+import pyarrow as pa
+import pytest
+from daft.unity_catalog import UnityCatalogTable
+from deltalake import write_deltalake
+
+from deltalink.core.plan_cache import QueryPlanCache
+from deltalink.core.runners import QueryRunner
+from deltalink.core.tables import load_snapshot, read_deltalake
+from deltalink.core.util import ResolvedTable
+
+SQL = "select continent, sum(sales) as sales from cat.s.sales group by continent"
+
+
+@pytest.fixture
+def tables(tmp_path):
+    uri = str(tmp_path / "sales")
+    write_deltalake(uri, pa.table({"continent": ["Europe", "Asia"], "sales": [1, 2]}))
+    write_deltalake(
+        uri, pa.table({"continent": ["Europe"], "sales": [10]}), mode="append"
+    )
+    uc_table = UnityCatalogTable(table_info=None, table_uri=uri, io_config=None)
+    # The first version is read, the runners must not load the latest one
+    snapshot = load_snapshot(uc_table, 0)
+    df = read_deltalake(uc_table, snapshot)
+    return [ResolvedTable("cat.s.sales", 0, uc_table, df, 0.0)]
+
+
+def result(runner: QueryRunner, tables) -> dict[str, int]:
+    plans = QueryPlanCache(8, 8)
+    schema, batches = runner.run(SQL, tables, lambda: plans.plan(SQL, tables))
+    table = pa.Table.from_batches(list(batches), schema)
+    return dict(zip(*table.to_pydict().values(), strict=True))
+
+
+def test_native_runner(tables, tmp_path):
+    runner = QueryRunner("native", 1, str(tmp_path))
+    assert result(runner, tables) == {"Europe": 1, "Asia": 2}
+    assert runner.stats()["queries"] == 1
+
+
+def test_process_runner_reads_the_result_from_shared_memory(tables, tmp_path):
+    runner = QueryRunner("process", 1, str(tmp_path))
+    runner.start()
+    try:
+        assert result(runner, tables) == {"Europe": 1, "Asia": 2}
+        # The result files are removed once mapped
+        assert list(runner.directory.iterdir()) == []
+
+        with pytest.raises(RuntimeError, match="missing"):
+            runner.run("select * from cat.s.missing", tables, lambda: None)
+    finally:
+        runner.shutdown()
+
+    assert runner.stats() == {
+        "mode": "process",
+        "workers": 1,
+        "queries": 2,
+        "failures": 1,
+    }
+
+
+def test_process_results_are_written_to_disk_by_default(monkeypatch):
+    monkeypatch.setattr(tempfile, "tempdir", "/var/tmp")
+    assert QueryRunner("process", 1).directory == Path("/var/tmp/deltalink-results")
+
+
+def test_a_full_result_directory_is_reported(tables, tmp_path, monkeypatch):
+    runner = QueryRunner("process", 1, str(tmp_path))
+
+    class FullPool:
+        def submit(self, *args):
+            raise OSError(errno.ENOSPC, "No space left on device")
+
+    monkeypatch.setattr(runner, "_process_pool", FullPool)
+    with pytest.raises(RuntimeError, match="QUERY_RESULT_DIR"):
+        runner.run(SQL, tables, lambda: None)
@@ -0,0 +1,115 @@
+import os
+import time
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+from deltalink.core.spill import ResultSpill, SpilledResult, SpillQuotaExceeded
+
+
+def spill(tmp_path, format="parquet", max_disk_bytes=10**9, ttl=60) -> ResultSpill:
+    return ResultSpill(
+        enabled=True,
+        threshold_bytes=100,
+        max_disk_bytes=max_disk_bytes,
+        ttl=ttl,
+        format=format,
+        directory=str(tmp_path),
+    )
+
+
+def batches(count: int, rows: int = 10):
+    for i in range(count):
+        yield pa.record_batch({"id": list(range(i * rows, (i + 1) * rows))})
+
+
+SCHEMA = pa.schema({"id": pa.int64()})
+
+
+def test_small_results_are_collected_in_memory(tmp_path):
+    result = spill(tmp_path).collect(SCHEMA, batches(1))
+    assert isinstance(result, pa.Table)
+    assert result.num_rows == 10
+
+
+def test_large_results_are_written_as_they_are_read(tmp_path):
+    results = spill(tmp_path)
+    result = results.collect(SCHEMA, batches(5))
+
+    assert isinstance(result, SpilledResult)
+    assert result.rows == 50
+    assert result.path.suffix == ".parquet"
+    assert pq.read_table(result.path)["id"].to_pylist() == list(range(50))
+    assert results.get(result.id) is result
+    assert results.stats()["disk_bytes"] == result.size
+
+    arrow = spill(tmp_path / "arrow", format="arrow").collect(SCHEMA, batches(5))
+    reader = pa.ipc.open_file(pa.memory_map(str(arrow.path)))
+    assert reader.read_all()["id"].to_pylist() == list(range(50))
+    assert arrow.media_type == "application/vnd.apache.arrow.file"
+
+
+def test_least_recently_downloaded_results_make_room(tmp_path):
+    # Room for two Arrow files of 5 batches, 1530 bytes each
+    results = spill(tmp_path, format="arrow", max_disk_bytes=3300)
+    first = results.collect(SCHEMA, batches(5))
+    second = results.collect(SCHEMA, batches(5))
+    results.get(first.id)
+
+    third = results.collect(SCHEMA, batches(5))
+
+    assert results.get(second.id) is None
+    assert not second.path.exists()
+    assert results.get(first.id) is first and results.get(third.id) is third
+    assert results.stats()["evicted"] == 1
+
+
+def test_results_over_the_quota_are_rejected(tmp_path):
+    results = spill(tmp_path, max_disk_bytes=300)
+
+    with pytest.raises(SpillQuotaExceeded):
+        results.collect(SCHEMA, batches(10))
+
+    # The partial file is removed
+    assert list(results.directory.iterdir()) == []
+    stats = results.stats()
+    assert stats["rejected"] == 1 and stats["writing_bytes"] == 0
+
+
+def test_results_expire_without_downloads(tmp_path):
+    results = spill(tmp_path, ttl=0.05)
+    result = results.collect(SCHEMA, batches(5))
+
+    time.sleep(0.03)
+    # A download starts the TTL over
+    assert results.get(result.id) is result
+    time.sleep(0.03)
+    assert results.get(result.id) is result
+
+    time.sleep(0.06)
+    assert results.get(result.id) is None
+    assert not result.path.exists()
+    assert results.stats()["expired"] == 1
+
+
+def test_only_the_results_of_gone_workers_are_removed(tmp_path):
+    root = tmp_path / "deltalink-spill"
+    live, gone = root / "1-live", root / "2-gone"
+    for directory in (live, gone):
+        directory.mkdir(parents=True)
+        (directory / "result.parquet").write_bytes(b"rows")
+        (directory / "result.tmp").write_bytes(b"rows")
+    expired = time.time() - 120
+    for path in (gone, *gone.iterdir()):
+        os.utime(path, (expired, expired))
+
+    results = spill(tmp_path, ttl=60)
+    result = results.collect(SCHEMA, batches(5))
+
+    assert result.path.parent.parent == root
+    assert sorted(p.name for p in live.iterdir()) == ["result.parquet", "result.tmp"]
+    assert not gone.exists()
+
+    results.clear()
+    assert sorted(p.name for p in root.iterdir()) == ["1-live"]
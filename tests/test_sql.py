@@ -0,0 +1,73 @@
+import pyarrow as pa
+import pytest
+from daft.unity_catalog import UnityCatalogTable
+from deltalake import write_deltalake
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from deltalink.api import sql
+
+
+class DummyTableInfo:
+    def __init__(self, name):
+        self.catalog_name = "cat"
+        self.schema_name = "sql"
+        self.name = name
+
+
+class DummyCatalog:
+    def __init__(self, tables: dict[str, str]):
+        self.tables = tables
+
+    def load_table(self, name, operation=None, table_type=None):
+        return UnityCatalogTable(
+            table_info=DummyTableInfo(name.split(".")[-1]),
+            table_uri=self.tables[name],
+            io_config=None,
+        )
+
+
+@pytest.fixture
+def client(tmp_path, request, monkeypatch):
+    # The credentials of a table are cached by name across the tests
+    name = f"cat.sql.{request.node.name}"
+    uri = str(tmp_path / "sales")
+    for i in range(3):
+        write_deltalake(
+            uri, pa.table({"id": list(range(i * 10, i * 10 + 10))}), mode="append"
+        )
+
+    async def get_unity():
+        return DummyCatalog({name: uri})
+
+    monkeypatch.setattr(sql, "get_unity", get_unity)
+    app = FastAPI()
+    app.include_router(sql.router)
+    return name, TestClient(app)
+
+
+def test_explain_reads_the_pinned_versions(client):
+    name, http = client
+
+    latest = http.post("/sql/explain", json={"query": f"select * from {name}"})
+    pinned = http.post(
+        "/sql/explain",
+        json={"query": f"select * from {name}", "versions": {name: 0}},
+    )
+
+    assert latest.headers["X-Table-Versions"] == f"{name}=2"
+    assert [scan["files"] for scan in latest.json()["scans"]] == [3]
+    assert pinned.headers["X-Table-Versions"] == f"{name}=0"
+    assert [scan["files"] for scan in pinned.json()["scans"]] == [1]
+    assert [scan["table"] for scan in pinned.json()["scans"]] == [name]
+
+
+def test_explain_rejects_pins_of_other_tables(client):
+    name, http = client
+
+    response = http.post(
+        "/sql/explain",
+        json={"query": f"select * from {name}", "versions": {"cat.sql.other": 0}},
+    )
+
+    assert response.status_code == 400
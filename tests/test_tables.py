@@ -0,0 +1,172 @@
+import time
+from datetime import UTC, datetime
+
+import daft
+import pyarrow as pa
+import pytest
+from daft.unity_catalog import UnityCatalogTable
+from deltalake import write_deltalake
+
+from deltalink.core.tables import (
+    DeltaTableCache,
+    PinnedSnapshotCache,
+    load_snapshot,
+    pinned_snapshots,
+    read_deltalake,
+    table_cache,
+)
+
+
+@pytest.fixture
+def table_uri(tmp_path):
+    uri = str(tmp_path / "sales_suppliers")
+    write_deltalake(uri, pa.table({"supplierID": [1, 2]}))
+    return uri
+
+
+def test_snapshot_is_refreshed_incrementally(table_uri):
+    cache = DeltaTableCache(max_tables=10, max_bytes=1 << 30)
+
+    first = cache.snapshot(table_uri, {})
+    assert cache.snapshot(table_uri, {}) is first
+
+    write_deltalake(table_uri, pa.table({"supplierID": [3]}), mode="append")
+    second = cache.snapshot(table_uri, {})
+
+    assert (first.version, second.version) == (0, 1)
+    assert second.get_add_actions().num_rows == 2
+    assert cache.stats()["loads"] == 1
+    assert cache.stats()["refreshes"] == 1
+
+
+def test_acquire_advances_the_snapshot(table_uri):
+    cache = DeltaTableCache(max_tables=10, max_bytes=1 << 30)
+    cache.snapshot(table_uri, {})
+
+    with cache.acquire(table_uri, {}) as dt:
+        dt.delete("supplierID = 1")
+
+    assert cache.snapshot(table_uri, {}).version == 1
+    assert cache.stats()["loads"] == 1
+
+
+def test_new_credentials_reload_the_table(table_uri):
+    cache = DeltaTableCache(max_tables=10, max_bytes=1 << 30)
+
+    cache.snapshot(table_uri, {"SAS_TOKEN": "a"})
+    cache.snapshot(table_uri, {"SAS_TOKEN": "b"})
+
+    assert cache.stats()["loads"] == 2
+
+
+def test_lru_eviction(tmp_path):
+    cache = DeltaTableCache(max_tables=2, max_bytes=1 << 30)
+    uris = []
+    for name in ("a", "b", "c"):
+        uri = str(tmp_path / name)
+        write_deltalake(uri, pa.table({"supplierID": [1]}))
+        uris.append(uri)
+        cache.snapshot(uri, {})
+
+    stats = cache.stats()
+    assert stats["tables"] == 2
+    assert stats["evictions"] == 1
+
+
+def test_read_deltalake(table_uri):
+    uc_table = UnityCatalogTable(table_info=None, table_uri=table_uri, io_config=None)
+
+    df = read_deltalake(uc_table)
+    write_deltalake(table_uri, pa.table({"supplierID": [3]}), mode="append")
+
+    # A dataframe stays on the version it was planned with
+    assert sorted(df.to_pydict()["supplierID"]) == [1, 2]
+    assert read_deltalake(uc_table).count_rows() == 3
+    table_cache.invalidate(table_uri)
+
+
+def test_load_snapshot_of_a_version(table_uri):
+    uc_table = UnityCatalogTable(table_info=None, table_uri=table_uri, io_config=None)
+    write_deltalake(table_uri, pa.table({"supplierID": [3]}), mode="append")
+
+    assert load_snapshot(uc_table).version == 1
+    assert load_snapshot(uc_table, 1) is load_snapshot(uc_table)
+
+    snapshot = load_snapshot(uc_table, 0)
+    assert snapshot.version == 0
+    assert snapshot.to_daft().count_rows() == 2
+    table_cache.invalidate(table_uri)
+
+
+def test_pinned_snapshots_are_not_loaded_again(table_uri):
+    uc_table = UnityCatalogTable(table_info=None, table_uri=table_uri, io_config=None)
+    write_deltalake(table_uri, pa.table({"supplierID": [3]}), mode="append")
+    before = pinned_snapshots.stats()
+
+    snapshot = load_snapshot(uc_table, 0)
+    assert load_snapshot(uc_table, 0) is snapshot
+
+    stats = pinned_snapshots.stats()
+    assert stats["loads"] == before["loads"] + 1
+    assert stats["hits"] == before["hits"] + 1
+
+    with pytest.raises(ValueError, match="doesn't exist yet"):
+        load_snapshot(uc_table, 5)
+    table_cache.invalidate(table_uri)
+
+
+def test_load_snapshot_as_of_a_time(table_uri):
+    uc_table = UnityCatalogTable(table_info=None, table_uri=table_uri, io_config=None)
+    time.sleep(0.05)
+    first_commit = datetime.now(UTC)
+    time.sleep(0.05)
+    write_deltalake(table_uri, pa.table({"supplierID": [3]}), mode="append")
+
+    snapshot = load_snapshot(uc_table, first_commit)
+    assert snapshot.version == 0
+    assert snapshot.to_daft().count_rows() == 2
+    # A later commit made the version of the time final
+    assert pinned_snapshots.version_at(table_uri, first_commit) == 0
+
+    # A naive time is read as UTC
+    assert load_snapshot(uc_table, first_commit.replace(tzinfo=None)) is snapshot
+    assert load_snapshot(uc_table, datetime.now(UTC)).version == 1
+    table_cache.invalidate(table_uri)
+
+
+def test_load_snapshot_before_the_table_was_created(table_uri):
+    uc_table = UnityCatalogTable(table_info=None, table_uri=table_uri, io_config=None)
+    write_deltalake(table_uri, pa.table({"supplierID": [3]}), mode="append")
+
+    with pytest.raises(ValueError, match="didn't exist yet"):
+        load_snapshot(uc_table, datetime(2000, 1, 1, tzinfo=UTC))
+    table_cache.invalidate(table_uri)
+
+
+def test_pinned_snapshot_lru_eviction(tmp_path):
+    cache = PinnedSnapshotCache(max_snapshots=2, max_bytes=1 << 30)
+    uri = str(tmp_path / "sales")
+    for i in range(3):
+        write_deltalake(uri, pa.table({"supplierID": [i]}), mode="append")
+        uc_table = UnityCatalogTable(table_info=None, table_uri=uri, io_config=None)
+        cache.put(uri, load_snapshot(uc_table, i))
+
+    assert cache.get(uri, 0) is None
+    assert cache.get(uri, 2).version == 2
+    assert cache.stats()["snapshots"] == 2
+    assert cache.stats()["evictions"] == 1
+    table_cache.invalidate(uri)
+
+
+def test_size_bytes_of_a_pruned_snapshot(tmp_path):
+    uri = str(tmp_path / "sales")
+    for continent in ("Europe", "Asia"):
+        data = pa.table({"continent": [continent], "sales": [1]})
+        write_deltalake(uri, data, partition_by=["continent"], mode="append")
+    snapshot = DeltaTableCache(max_tables=1, max_bytes=1 << 30).snapshot(uri, {})
+
+    sizes = snapshot.get_add_actions()["size_bytes"].to_pylist()
+    assert snapshot.size_bytes == sum(sizes)
+    pruned = snapshot.prune(daft.col("continent") == "Europe")
+    assert pruned.get_add_actions().num_rows == 1
+    assert pruned.size_bytes in sizes
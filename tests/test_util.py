@@ -1,8 +1,12 @@
+import time
 from unittest.mock import MagicMock, patch
 
+import pyarrow as pa
 import pytest
+from deltalake import write_deltalake
 
-from deltalink.core.util import table_config
+from deltalink.core.tables import table_cache
+from deltalink.core.util import forget_denied, resolve_tables
 
 # deltalink/core/test_util.py
 
@@ -17,6 +21,14 @@ class DummyTableInfo:
 class DummyUnityCatalogTable:
     def __init__(self, catalog_name, schema_name, name):
         self.table_info = DummyTableInfo(catalog_name, schema_name, name)
+        self.table_uri = f"memory://{catalog_name}/{schema_name}/{name}"
+
+
+@pytest.fixture(autouse=True)
+def mock_snapshot():
+    with patch("deltalink.core.util.load_snapshot") as mock_load:
+        mock_load.return_value = MagicMock(version=0)
+        yield mock_load
 
 
 @pytest.fixture
@@ -30,21 +42,68 @@ def mock_catalog():
     return catalog
 
 
-@patch("deltalink.core.util.daft.read_deltalake")
-def test_table_config_returns_dict(mock_read, mock_catalog):
+@patch("deltalink.core.util.read_deltalake")
+def test_resolve_tables(mock_read, mock_catalog):
     mock_read.return_value = "dummy_df"
     tables = ["table1", "table2"]
-    result = table_config(mock_catalog, tables)
-    assert isinstance(result, dict)
-    assert len(result) == 2
-    for t in tables:
-        key = f"cat.sch.{t}"
-        assert key in result
-        assert result[key] == "dummy_df"
+
+    result = resolve_tables(mock_catalog, tables)
+
+    assert [table.name for table in result] == [f"cat.sch.{t}" for t in tables]
+    assert [table.df for table in result] == ["dummy_df", "dummy_df"]
+    assert all(table.version == 0 for table in result)
+
+
+@patch("deltalink.core.util.read_deltalake")
+def test_resolve_no_tables(mock_read, mock_catalog):
+    assert resolve_tables(mock_catalog, []) == []
 
 
-@patch("deltalink.core.util.daft.read_deltalake")
-def test_table_config_empty_tables(mock_read, mock_catalog):
+@patch("deltalink.core.util.read_deltalake")
+def test_tables_are_resolved_concurrently(mock_read):
+    def load_table(name, operation=None, table_type=None):
+        time.sleep(0.2)
+        return DummyUnityCatalogTable("cat", "sch", name)
+
+    catalog = MagicMock()
+    catalog.load_table.side_effect = load_table
     mock_read.return_value = "dummy_df"
-    result = table_config(mock_catalog, [])
-    assert result == {}
+    tables = [f"concurrent{i}" for i in range(4)]
+
+    start = time.perf_counter()
+    result = resolve_tables(catalog, tables)
+
+    assert time.perf_counter() - start < 0.6
+    assert [table.name for table in result] == [f"cat.sch.{t}" for t in tables]
+    assert all(table.elapsed >= 0.2 for table in result)
+
+
+def test_one_version_per_table(mock_catalog):
+    with pytest.raises(ValueError, match="Expected 2 table versions"):
+        resolve_tables(mock_catalog, ["table1", "table2"], [0])
+
+
+@patch("deltalink.core.util.read_deltalake")
+def test_denied_credentials_are_loaded_again(mock_read, mock_catalog, mock_snapshot):
+    mock_snapshot.side_effect = OSError(
+        "Client error with status 403 Forbidden: AuthorizationFailure"
+    )
+    with pytest.raises(OSError):
+        resolve_tables(mock_catalog, ["denied"])
+
+    mock_snapshot.side_effect = None
+    resolve_tables(mock_catalog, ["denied"])
+
+    names = [call.args[0] for call in mock_catalog.load_table.call_args_list]
+    assert names == ["denied", "denied"]
+
+
+def test_denied_tables_are_loaded_again(tmp_path):
+    uri = str(tmp_path / "denied")
+    write_deltalake(uri, pa.table({"id": [1]}))
+    table_cache.snapshot(uri, {})
+
+    with pytest.raises(OSError), forget_denied("cat.sch.denied", uri):
+        raise OSError("Client error with status 403 Forbidden")
+
+    assert uri not in table_cache._entries
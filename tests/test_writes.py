@@ -0,0 +1,109 @@
+import asyncio
+import threading
+import time
+
+import pyarrow as pa
+import pytest
+from deltalake import DeltaTable, write_deltalake
+from deltalake.exceptions import CommitFailedError
+
+from deltalink.core.executor import BoundedExecutor
+from deltalink.core.writes import TableWriteScheduler
+
+
+@pytest.fixture
+def executor():
+    executor = BoundedExecutor("test-writes", 4)
+    yield executor
+    executor.shutdown()
+
+
+def scheduler(max_attempts: int = 3) -> TableWriteScheduler:
+    return TableWriteScheduler(max_attempts, backoff=0.001, max_backoff=0.01)
+
+
+def test_writes_to_a_table_are_serialized(executor):
+    writes = scheduler()
+    running: dict[str, int] = {"a": 0, "b": 0}
+    overlaps: dict[str, int] = {"a": 0, "b": 0}
+    concurrent = []
+    lock = threading.Lock()
+
+    def write(table: str) -> str:
+        with lock:
+            running[table] += 1
+            overlaps[table] = max(overlaps[table], running[table])
+            concurrent.append(sum(running.values()))
+        time.sleep(0.02)
+        with lock:
+            running[table] -= 1
+        return table
+
+    async def main():
+        return await asyncio.gather(
+            *(
+                writes.run(table, table, "merge", write, table, executor=executor)
+                for table in ("a", "b", "a", "b", "a")
+            )
+        )
+
+    assert asyncio.run(main()) == ["a", "b", "a", "b", "a"]
+    assert overlaps == {"a": 1, "b": 1}
+    # The writes to the other table ran meanwhile
+    assert max(concurrent) == 2
+
+    stats = writes.stats()
+    assert stats["writes"] == 5
+    assert stats["tables"] == 0 and stats["pending"] == 0
+
+
+def test_conflicting_commits_are_retried():
+    writes = scheduler()
+    attempts = []
+
+    def write() -> int:
+        attempts.append(None)
+        if len(attempts) < 3:
+            raise CommitFailedError("a concurrent transactions added new data")
+        return len(attempts)
+
+    assert writes.commit(write, table_name="t", operation="merge") == 3
+    assert writes.stats()["conflicts"] == 2
+    assert writes.stats()["retries"] == 2
+
+    # Once the attempts are used up, the conflict is raised
+    attempts.clear()
+    with pytest.raises(CommitFailedError):
+        scheduler(max_attempts=2).commit(write, table_name="t", operation="merge")
+    assert len(attempts) == 2
+
+
+def test_metadata_conflicts_are_not_retried():
+    writes = scheduler()
+
+    def write() -> None:
+        raise CommitFailedError("Metadata changed since last commit.")
+
+    with pytest.raises(CommitFailedError):
+        writes.commit(write, table_name="t", operation="merge")
+    assert writes.stats()["retries"] == 0
+    assert writes.stats()["failures"] == 1
+
+
+def test_deletes_run_again_on_the_latest_version(tmp_path):
+    uri = str(tmp_path / "sales")
+    write_deltalake(uri, pa.table({"id": [1, 2, 3]}))
+    attempts = []
+
+    def delete() -> None:
+        dt = DeltaTable(uri)
+        if not attempts:
+            # Another process commits after the table was loaded
+            DeltaTable(uri).delete("id = 1")
+        attempts.append(dt.version())
+        dt.delete("id = 2")
+
+    scheduler().commit(delete, table_name="sales", operation="delete")
+
+    assert attempts == [0, 1]
+    assert DeltaTable(uri).to_pyarrow_table()["id"].to_pylist() == [3]